@@ -0,0 +1,47 @@
+"""
+Compare two benchmark reports written by benchmarks.run.
+
+    python -m benchmarks.compare baseline.json candidate.json --threshold 0.10
+
+Exits 1 if any shared result lost more than `threshold` of its throughput or
+grew its p99 by more than `threshold`.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from typing import Any, Dict, List, Tuple
+
+
+def _key(result: Dict[str, Any]) -> Tuple[str, str, str]:
+    return result["suite"], result["variant"], json.dumps(result["params"], sort_keys=True)
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=0.10)
+    args = parser.parse_args(argv)
+
+    with open(args.baseline, encoding="utf-8") as f:
+        base = {_key(r): r for r in json.load(f)["results"]}
+    with open(args.candidate, encoding="utf-8") as f:
+        cand = {_key(r): r for r in json.load(f)["results"]}
+
+    regressions = 0
+    for key in sorted(base.keys() & cand.keys()):
+        b, c = base[key], cand[key]
+        tput = c["ops_per_s"] / b["ops_per_s"] - 1 if b["ops_per_s"] else 0.0
+        p99 = c["p99_us"] / b["p99_us"] - 1 if b["p99_us"] else 0.0
+        flag = tput < -args.threshold or p99 > args.threshold
+        regressions += flag
+        print(f"{'REGRESSION' if flag else 'ok':<10} {key[0]:<12} {key[1]:<26} {key[2]:<70} throughput {tput:+.1%}  p99 {p99:+.1%}")
+
+    print(f"{regressions} regression(s) over {len(base.keys() & cand.keys())} shared result(s)")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
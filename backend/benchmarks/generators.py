@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import random
+from typing import Any, Dict, List
+
+ACTIONS = ["read", "write", "delete", "list", "share", "approve"]
+
+
+def generate_policy(
+    *,
+    rules: int,
+    resource_types: int,
+    predicate_width: int,
+    deny_ratio: float = 0.1,
+    value_cardinality: int = 8,
+    seed: int = 0,
+) -> Dict[str, Any]:
+    """
+    Synthetic policy document (same JSON shape as policies/*.json).
+
+    Each rule constrains `predicate_width` subject claims, and every fourth rule
+    also constrains one resource attribute and one context claim.
+    """
+    rng = random.Random(seed)
+    out: List[Dict[str, Any]] = []
+    for i in range(rules):
+        rule: Dict[str, Any] = {
+            "id": f"r{i}",
+            "effect": "deny" if rng.random() < deny_ratio else "allow",
+            "actions": rng.sample(ACTIONS, k=rng.randint(1, 3)),
+            "resource_type": f"type{i % resource_types}",
+        }
+        if predicate_width:
+            keys = rng.sample(range(max(predicate_width * 2, 1)), k=predicate_width)
+            rule["subject_claims"] = {f"claim{k}": f"v{rng.randrange(value_cardinality)}" for k in keys}
+        if i % 4 == 0:
+            rule["resource_attrs"] = {"classification": rng.choice(["public", "internal", "cui"])}
+            rule["context_claims"] = {"env": rng.choice(["dev", "staging", "prod"])}
+        out.append(rule)
+    return {"id": "bench", "version": f"r{rules}-t{resource_types}-w{predicate_width}", "rules": out}
+
+
+def generate_requests(
+    policy: Dict[str, Any],
+    *,
+    count: int,
+    hit_ratio: float,
+    extra_claims: int = 4,
+    seed: int = 1,
+) -> List[Dict[str, Any]]:
+    """
+    /v1/authorize request bodies. A `hit_ratio` share is built to satisfy a
+    random rule (so at least one rule matches); the rest target the same
+    actions/resource types with claim values no rule uses.
+    """
+    rng = random.Random(seed)
+    rules = policy["rules"]
+    out: List[Dict[str, Any]] = []
+    for i in range(count):
+        rule = rng.choice(rules)
+        hit = rng.random() < hit_ratio
+        claims = {f"noise{k}": f"n{rng.randrange(100)}" for k in range(extra_claims)}
+        attrs: Dict[str, Any] = {"owner": f"team-{rng.randrange(10)}"}
+        context: Dict[str, Any] = {"ip": f"10.0.0.{rng.randrange(255)}"}
+        if hit:
+            claims.update(rule.get("subject_claims") or {})
+            attrs.update(rule.get("resource_attrs") or {})
+            context.update(rule.get("context_claims") or {})
+        else:
+            claims.update({k: "miss" for k in (rule.get("subject_claims") or {})})
+        out.append(
+            {
+                "subject": {"id": f"user:{rng.randrange(10_000)}", "claims": claims},
+                "action": rng.choice(rule["actions"]),
+                "resource": {"type": rule["resource_type"], "id": f"res:{i}", "attrs": attrs},
+                "context": context,
+            }
+        )
+    return out
@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import time
+from typing import Any, Callable, Dict, List, Sequence
+
+
+def summarize(samples_ns: Sequence[int], wall_ns: int) -> Dict[str, Any]:
+    ordered = sorted(samples_ns)
+    n = len(ordered)
+
+    def pct(p: float) -> float:
+        return ordered[min(n - 1, int(p * n))] / 1000.0
+
+    return {
+        "n": n,
+        "ops_per_s": round(n / (wall_ns / 1e9), 1) if wall_ns else None,
+        "mean_us": round(sum(ordered) / n / 1000.0, 3),
+        "p50_us": round(pct(0.50), 3),
+        "p99_us": round(pct(0.99), 3),
+    }
+
+
+def measure(fn: Callable[[Any], Any], inputs: Sequence[Any], *, warmup: int = 100) -> Dict[str, Any]:
+    """Call fn once per input, timing each call."""
+    for x in inputs[:warmup]:
+        fn(x)
+
+    samples: List[int] = []
+    clock = time.perf_counter_ns
+    start = clock()
+    for x in inputs:
+        t0 = clock()
+        fn(x)
+        samples.append(clock() - t0)
+    return summarize(samples, clock() - start)
+
+
+async def measure_async(fn, inputs: Sequence[Any], *, warmup: int = 50) -> Dict[str, Any]:
+    for x in inputs[:warmup]:
+        await fn(x)
+
+    samples: List[int] = []
+    clock = time.perf_counter_ns
+    start = clock()
+    for x in inputs:
+        t0 = clock()
+        await fn(x)
+        samples.append(clock() - t0)
+    return summarize(samples, clock() - start)
+
+
+async def measure_concurrent(fn, inputs: Sequence[Any], *, concurrency: int, warmup: int = 50) -> Dict[str, Any]:
+    """Like measure_async, but with `concurrency` callers sharing the inputs."""
+    import asyncio
+
+    for x in inputs[:warmup]:
+        await fn(x)
+
+    samples: List[int] = []
+    clock = time.perf_counter_ns
+    it = iter(inputs)
+
+    async def worker() -> None:
+        for x in it:
+            t0 = clock()
+            await fn(x)
+            samples.append(clock() - t0)
+
+    start = clock()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(samples, clock() - start)
@@ -0,0 +1,84 @@
+"""
+Run the benchmark suites and write the results as JSON.
+
+    cd backend
+    PYTHONPATH=src python -m benchmarks.run --out bench.json
+    PYTHONPATH=src python -m benchmarks.run --suite evaluate --rules 100,10000
+    python -m benchmarks.compare baseline.json bench.json
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List
+
+from benchmarks.suites import SUITES
+
+
+def _ints(value: str) -> List[int]:
+    return [int(x) for x in value.split(",") if x]
+
+
+def _git_rev() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--suite", action="append", choices=sorted(SUITES), help="default: all")
+    parser.add_argument("--rules", type=_ints, default=[10, 100, 1000, 5000])
+    parser.add_argument("--resource-types", type=int, default=24)
+    parser.add_argument("--predicate-width", type=_ints, default=[1, 4])
+    parser.add_argument("--hit-ratio", type=float, default=0.5)
+    parser.add_argument("--requests", type=int, default=20_000, help="per evaluate() run")
+    parser.add_argument("--http-requests", type=int, default=2_000, help="per ASGI run")
+    parser.add_argument("--concurrency", type=int, default=64, help="in-flight requests (authorize_modes)")
+    parser.add_argument("--out", default="bench.json")
+    args = parser.parse_args(argv)
+
+    cfg: Dict[str, Any] = {
+        "rules": args.rules,
+        "resource_types": args.resource_types,
+        "predicate_width": args.predicate_width,
+        "hit_ratio": args.hit_ratio,
+        "requests": args.requests,
+        "http_requests": args.http_requests,
+        "concurrency": args.concurrency,
+    }
+    results = []
+    for name in args.suite or list(SUITES):
+        for result in SUITES[name](cfg):
+            results.append(result)
+            print(
+                f"{result['suite']:<12} {result['variant']:<26} {json.dumps(result['params'], sort_keys=True):<70} "
+                f"{result['ops_per_s']:>12,.0f}/s  p50 {result['p50_us']:>9.1f}us  p99 {result['p99_us']:>9.1f}us",
+                file=sys.stderr,
+            )
+
+    report = {
+        "meta": {
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "git_rev": _git_rev(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "config": cfg,
+        },
+        "results": results,
+    }
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+    print(f"wrote {args.out}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,374 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import tempfile
+import uuid
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List
+
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from benchmarks.generators import generate_policy, generate_requests
+from benchmarks.harness import measure, measure_async, measure_concurrent
+
+from app.domain.compiled_policy import compile_policy
+from app.domain.evaluator import SHORT_CIRCUIT, evaluate, evaluate_actions, resource_filter
+from app.domain.policy_loader import load_policy_from_str
+from app.domain.types import AuthorizationRequest, Resource, Subject
+from app.services.policy_cache import CompiledPolicyCache, content_digest
+from app.services.rule_profile import RuleProfiler
+
+Result = Dict[str, Any]
+
+
+def _domain_request(body: Dict[str, Any]) -> AuthorizationRequest:
+    return AuthorizationRequest(
+        subject=Subject(id=body["subject"]["id"], claims=body["subject"]["claims"]),
+        action=body["action"],
+        resource=Resource(type=body["resource"]["type"], id=body["resource"]["id"], attrs=body["resource"]["attrs"]),
+        context=body["context"],
+    )
+
+
+def bench_evaluate(cfg: Dict[str, Any]) -> Iterator[Result]:
+    """
+    evaluate() alone, against the plain Policy (linear scan) and the
+    CompiledPolicy; evaluate_actions() (every action at once) for comparison;
+    and evaluate() through a RuleProfiler, for the cost of profiling.
+    """
+    for rules in cfg["rules"]:
+        for width in cfg["predicate_width"]:
+            doc = generate_policy(rules=rules, resource_types=cfg["resource_types"], predicate_width=width)
+            policy = load_policy_from_str(json.dumps(doc))
+            compiled = compile_policy(policy)
+            reqs = [_domain_request(b) for b in generate_requests(doc, count=cfg["requests"], hit_ratio=cfg["hit_ratio"])]
+            params = {
+                "rules": rules,
+                "resource_types": cfg["resource_types"],
+                "predicate_width": width,
+                "hit_ratio": cfg["hit_ratio"],
+            }
+            yield {"suite": "evaluate", "variant": "linear", "params": params, **measure(lambda r: evaluate(r, policy), reqs)}
+            yield {"suite": "evaluate", "variant": "compiled", "params": params, **measure(lambda r: evaluate(r, compiled), reqs)}
+            yield {
+                "suite": "evaluate",
+                "variant": "compiled_short_circuit",
+                "params": params,
+                **measure(lambda r: evaluate(r, compiled, SHORT_CIRCUIT), reqs),
+            }
+            yield {
+                "suite": "evaluate",
+                "variant": "compiled_all_actions",
+                "params": params,
+                **measure(lambda r: evaluate_actions(r.subject, r.resource, r.context, compiled), reqs),
+            }
+            profiler = RuleProfiler()
+            yield {
+                "suite": "evaluate",
+                "variant": "compiled_profiled",
+                "params": params,
+                **measure(lambda r: profiler.evaluate(r, compiled, "full"), reqs),
+            }
+
+
+def bench_filter(cfg: Dict[str, Any]) -> Iterator[Result]:
+    """
+    Deciding one list of resources for one subject/action/context: evaluate()
+    per resource vs. resource_filter() (/v1/authorize:filter).
+    """
+    page = 1000
+    for rules in cfg["rules"]:
+        doc = generate_policy(rules=rules, resource_types=cfg["resource_types"], predicate_width=1)
+        policy = compile_policy(load_policy_from_str(json.dumps(doc)))
+        # Requests satisfying the subject/context side of a resource-constrained rule
+        lists = []
+        for body in generate_requests(doc, count=20, hit_ratio=1.0, seed=7):
+            base = _domain_request(body)
+            resources = [
+                Resource(type=base.resource.type, id=f"res:{j}", attrs={**base.resource.attrs, "owner": f"team-{j % 50}"})
+                for j in range(page)
+            ]
+            lists.append((base, resources))
+        params = {"rules": rules, "resource_types": cfg["resource_types"], "resources": page}
+
+        def each(item):
+            base, resources = item
+            allowed = []
+            for r in resources:
+                req = AuthorizationRequest(subject=base.subject, action=base.action, resource=r, context=base.context)
+                if evaluate(req, policy).decision == "allow":
+                    allowed.append(r.id)
+            return allowed
+
+        def filtered(item):
+            base, resources = item
+            decide = resource_filter(base.subject, base.action, base.resource.type, base.context, policy)
+            return [r.id for r in resources if decide(r.attrs).decision == "allow"]
+
+        yield {"suite": "filter", "variant": "evaluate_each", "params": params, **measure(each, lists, warmup=2)}
+        yield {"suite": "filter", "variant": "resource_filter", "params": params, **measure(filtered, lists, warmup=2)}
+
+
+def bench_policy_load(cfg: Dict[str, Any]) -> Iterator[Result]:
+    """load_policy_from_str() (json + pydantic validation + DTO conversion) and compile_policy()."""
+    for rules in cfg["rules"]:
+        doc = generate_policy(rules=rules, resource_types=cfg["resource_types"], predicate_width=2)
+        raw = json.dumps(doc)
+        reps = max(3, min(200, 200_000 // max(rules, 1)))
+        params = {"rules": rules, "bytes": len(raw)}
+        yield {"suite": "policy_load", "variant": "parse_validate", "params": params, **measure(lambda _: load_policy_from_str(raw), range(reps), warmup=1)}
+        policy = load_policy_from_str(raw)
+        yield {"suite": "policy_load", "variant": "compile", "params": params, **measure(lambda _: compile_policy(policy), range(reps), warmup=1)}
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = CompiledPolicyCache(Path(tmp))
+            digest = content_digest(raw.encode("utf-8"))
+            cache.store(digest, policy, compile_policy(policy))
+            yield {"suite": "policy_load", "variant": "snapshot_cache_hit", "params": params, **measure(lambda _: cache.load(digest), range(reps), warmup=1)}
+
+
+def bench_decode(cfg: Dict[str, Any]) -> Iterator[Result]:
+    """
+    Decoding one /v1/authorize body into domain objects: as FastAPI validates a
+    route's body (json.loads, AuthorizeRequest, then a copy into domain types),
+    and directly.
+    """
+    from app.api.decoding import decode_authorize_request, from_model, loads
+    from app.schemas.authorize import AuthorizeRequest
+
+    doc = generate_policy(rules=100, resource_types=cfg["resource_types"], predicate_width=4)
+    for extra_claims in (4, 32, 128):
+        bodies = generate_requests(doc, count=cfg["requests"], hit_ratio=cfg["hit_ratio"], extra_claims=extra_claims)
+        raws = [json.dumps(b).encode("utf-8") for b in bodies]
+        params = {"claims": extra_claims + 4, "mean_bytes": sum(map(len, raws)) // len(raws)}
+        yield {
+            "suite": "decode",
+            "variant": "pydantic",
+            "params": params,
+            **measure(lambda raw: from_model(AuthorizeRequest.model_validate(json.loads(raw))), raws),
+        }
+        yield {
+            "suite": "decode",
+            "variant": "direct",
+            "params": params,
+            **measure(lambda raw: decode_authorize_request(loads(raw)), raws),
+        }
+
+
+def bench_encode(cfg: Dict[str, Any]) -> Iterator[Result]:
+    """Encoding one /v1/authorize response: through AuthorizeResponse, and straight to bytes."""
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse
+
+    from app.api.authorize import _response_body
+    from app.api.encoding import dumps, dumps_fast, orjson
+    from app.domain.types import AuthorizationDecision
+    from app.schemas.authorize import AuthorizeResponse
+
+    policy = compile_policy(load_policy_from_str(json.dumps(generate_policy(rules=10, resource_types=2, predicate_width=1))))
+    decision = AuthorizationDecision(decision="allow", reason="matched_allow", matched_rule_ids=("r1", "r2"))
+    decision_ids = [str(uuid.uuid4()) for _ in range(cfg["requests"])]
+    params = {"matched_rules": len(decision.matched_rule_ids)}
+
+    def via_response_model(decision_id: str) -> bytes:
+        # What FastAPI does for a route returning the model: build, validate, encode
+        model = AuthorizeResponse(
+            decision=decision.decision,
+            reason=decision.reason,
+            decision_id=decision_id,
+            policy_id=policy.id,
+            policy_version=policy.version,
+            matched_rule_ids=list(decision.matched_rule_ids),
+            evaluation_mode="full",
+        )
+        return JSONResponse(content=jsonable_encoder(AuthorizeResponse.model_validate(model.model_dump()))).body
+
+    yield {"suite": "encode", "variant": "response_model", "params": params, **measure(via_response_model, decision_ids)}
+    yield {
+        "suite": "encode",
+        "variant": "dict_json",
+        "params": params,
+        **measure(lambda d: dumps(_response_body(policy, decision, d, "full")), decision_ids),
+    }
+    if orjson is not None:
+        yield {
+            "suite": "encode",
+            "variant": "dict_orjson",
+            "params": params,
+            **measure(lambda d: dumps_fast(_response_body(policy, decision, d, "full")), decision_ids),
+        }
+
+
+def bench_asgi(cfg: Dict[str, Any]) -> Iterator[Result]:
+    """POST /v1/authorize in-process through the full ASGI stack, with and without audit."""
+    import httpx
+
+    from app.main import app
+
+    for rules in cfg["rules"]:
+        doc = generate_policy(rules=rules, resource_types=cfg["resource_types"], predicate_width=2)
+        bodies = generate_requests(doc, count=cfg["http_requests"], hit_ratio=cfg["hit_ratio"])
+        with tempfile.TemporaryDirectory() as tmp:
+            policy_path = Path(tmp) / "policy.json"
+            policy_path.write_text(json.dumps(doc), encoding="utf-8")
+            for audit in ("off", "sync", "buffered"):
+                env = {"AUTHZ_POLICY_PATH": str(policy_path), "AUTHZ_POLICY_RELOAD": "0"}
+                if audit != "off":
+                    env["AUTHZ_AUDIT_PATH"] = str(Path(tmp) / f"audit-{audit}.jsonl")
+                    env["AUTHZ_AUDIT_MODE"] = audit
+                with _env(env):
+                    result = asyncio.run(_run_asgi(app, httpx, "/v1/authorize", bodies))
+                yield {
+                    "suite": "asgi",
+                    "variant": f"authorize_audit_{audit}",
+                    "params": {"rules": rules, "hit_ratio": cfg["hit_ratio"]},
+                    **result,
+                }
+
+
+def bench_authorize_modes(cfg: Dict[str, Any]) -> Iterator[Result]:
+    """
+    POST /v1/authorize with `concurrency` in-flight requests, comparing
+    AUTHZ_AUTHORIZE_MODE=threadpool and async (audit off and buffered).
+    """
+    import httpx
+
+    from app.main import app
+
+    doc = generate_policy(rules=max(cfg["rules"]), resource_types=cfg["resource_types"], predicate_width=2)
+    bodies = generate_requests(doc, count=cfg["http_requests"], hit_ratio=cfg["hit_ratio"])
+    with tempfile.TemporaryDirectory() as tmp:
+        policy_path = Path(tmp) / "policy.json"
+        policy_path.write_text(json.dumps(doc), encoding="utf-8")
+        for audit in ("off", "buffered"):
+            for mode in ("threadpool", "async"):
+                env = {
+                    "AUTHZ_POLICY_PATH": str(policy_path),
+                    "AUTHZ_POLICY_RELOAD": "0",
+                    "AUTHZ_AUTHORIZE_MODE": mode,
+                }
+                if audit != "off":
+                    env["AUTHZ_AUDIT_PATH"] = str(Path(tmp) / f"audit-{mode}.jsonl")
+                    env["AUTHZ_AUDIT_MODE"] = audit
+                with _env(env):
+                    result = asyncio.run(
+                        _run_asgi(app, httpx, "/v1/authorize", bodies, concurrency=cfg["concurrency"])
+                    )
+                yield {
+                    "suite": "authorize_modes",
+                    "variant": f"{mode}_audit_{audit}",
+                    "params": {"rules": max(cfg["rules"]), "concurrency": cfg["concurrency"]},
+                    **result,
+                }
+
+
+async def _run_asgi(app, httpx, path: str, bodies: List[Dict[str, Any]], concurrency: int = 1) -> Result:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def call(body):
+            r = await client.post(path, json=body)
+            if r.status_code != 200:
+                raise RuntimeError(f"{path} returned {r.status_code}: {r.text}")
+
+        if concurrency > 1:
+            return await measure_concurrent(call, bodies, concurrency=concurrency)
+        return await measure_async(call, bodies)
+
+
+def bench_middleware(cfg: Dict[str, Any]) -> Iterator[Result]:
+    """
+    GET on a trivial route through CorrelationIdMiddleware, against the previous
+    BaseHTTPMiddleware implementation and no middleware at all.
+    """
+    import httpx
+    from fastapi import FastAPI
+
+    from app.api.middleware import CorrelationIdMiddleware
+
+    variants = {
+        "none": None,
+        "base_http_middleware": _LegacyCorrelationIdMiddleware,
+        "pure_asgi": CorrelationIdMiddleware,
+    }
+    for name, middleware in variants.items():
+        app = FastAPI()
+
+        @app.get("/healthz")
+        def healthz() -> dict:
+            return {"ok": True}
+
+        if middleware is not None:
+            app.add_middleware(middleware)
+        reqs = [None] * cfg["http_requests"]
+        result = asyncio.run(_run_get(app, httpx, "/healthz", reqs))
+        yield {"suite": "middleware", "variant": name, "params": {"route": "/healthz"}, **result}
+
+
+async def _run_get(app, httpx, path: str, reqs: List[Any]) -> Result:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def call(_):
+            r = await client.get(path, headers={"X-Correlation-Id": "bench"})
+            if r.status_code != 200:
+                raise RuntimeError(f"{path} returned {r.status_code}")
+
+        return await measure_async(call, reqs)
+
+
+class _LegacyCorrelationIdMiddleware(BaseHTTPMiddleware):
+    """The BaseHTTPMiddleware version CorrelationIdMiddleware replaced, kept as a baseline."""
+
+    def __init__(self, app, max_len: int = 128):
+        super().__init__(app)
+        self.max_len = max_len
+
+    async def dispatch(self, request, call_next):
+        raw = request.headers.get("X-Correlation-Id")
+        cid = raw.strip()[: self.max_len] if raw else str(uuid.uuid4())
+        request.state.correlation_id = cid
+        response = await call_next(request)
+        response.headers["X-Correlation-Id"] = cid
+        return response
+
+
+class _env:
+    """Temporarily set env vars (the service is configured through env)."""
+
+    KEYS = (
+        "AUTHZ_POLICY_PATH",
+        "AUTHZ_POLICY_RELOAD",
+        "AUTHZ_AUDIT_PATH",
+        "AUTHZ_AUDIT_MODE",
+        "AUTHZ_AUTHORIZE_MODE",
+    )
+
+    def __init__(self, values: Dict[str, str]) -> None:
+        self.values = values
+        self.saved: Dict[str, Any] = {}
+
+    def __enter__(self) -> None:
+        for k in set(self.KEYS) | set(self.values):
+            self.saved[k] = os.environ.pop(k, None)
+        os.environ.update(self.values)
+
+    def __exit__(self, *exc: Any) -> None:
+        from app.services.audit_sink import shutdown_audit_sink
+
+        shutdown_audit_sink()
+        for k, v in self.saved.items():
+            os.environ.pop(k, None)
+            if v is not None:
+                os.environ[k] = v
+
+
+SUITES: Dict[str, Callable[[Dict[str, Any]], Iterator[Result]]] = {
+    "evaluate": bench_evaluate,
+    "filter": bench_filter,
+    "policy_load": bench_policy_load,
+    "decode": bench_decode,
+    "encode": bench_encode,
+    "asgi": bench_asgi,
+    "middleware": bench_middleware,
+    "authorize_modes": bench_authorize_modes,
+}
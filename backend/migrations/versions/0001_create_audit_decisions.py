@@ -0,0 +1,52 @@
+"""create audit_decisions
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "audit_decisions",
+        sa.Column("id", sa.BigInteger().with_variant(sa.Integer, "sqlite"), primary_key=True, autoincrement=True),
+        sa.Column("decision_id", sa.String(64), nullable=False, unique=True),
+        sa.Column("correlation_id", sa.String(128), nullable=False),
+        sa.Column("policy_id", sa.String(256), nullable=False),
+        sa.Column("policy_version", sa.String(256), nullable=False),
+        sa.Column("subject_id", sa.String(256), nullable=False),
+        sa.Column("action", sa.String(256), nullable=False),
+        sa.Column("resource_type", sa.String(256), nullable=False),
+        sa.Column("resource_id", sa.String(256), nullable=True),
+        sa.Column("decision", sa.String(16), nullable=False),
+        sa.Column("reason", sa.String(64), nullable=False),
+        sa.Column("matched_rule_ids", sa.JSON, nullable=False),
+        sa.Column("context", sa.JSON, nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+    )
+    op.create_index("ix_audit_decisions_correlation_id", "audit_decisions", ["correlation_id"])
+    op.create_index("ix_audit_decisions_subject_id_created_at", "audit_decisions", ["subject_id", "created_at"])
+    op.create_index(
+        "ix_audit_decisions_policy_created_at",
+        "audit_decisions",
+        ["policy_id", "policy_version", "created_at"],
+    )
+    op.create_index("ix_audit_decisions_created_at", "audit_decisions", ["created_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_audit_decisions_created_at", table_name="audit_decisions")
+    op.drop_index("ix_audit_decisions_policy_created_at", table_name="audit_decisions")
+    op.drop_index("ix_audit_decisions_subject_id_created_at", table_name="audit_decisions")
+    op.drop_index("ix_audit_decisions_correlation_id", table_name="audit_decisions")
+    op.drop_table("audit_decisions")
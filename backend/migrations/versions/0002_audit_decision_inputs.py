@@ -0,0 +1,26 @@
+"""add audit_decisions.subject_claims and resource_attrs
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("audit_decisions", sa.Column("subject_claims", sa.JSON, nullable=True))
+    op.add_column("audit_decisions", sa.Column("resource_attrs", sa.JSON, nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("audit_decisions", "resource_attrs")
+    op.drop_column("audit_decisions", "subject_claims")
@@ -0,0 +1,28 @@
+"""add audit_decisions.evaluation_mode
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Existing rows were all evaluated in full mode
+    op.add_column(
+        "audit_decisions",
+        sa.Column("evaluation_mode", sa.String(16), nullable=False, server_default="full"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("audit_decisions", "evaluation_mode")
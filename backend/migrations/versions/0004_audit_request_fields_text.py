@@ -0,0 +1,37 @@
+"""widen request-supplied audit_decisions columns to text
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+# Taken verbatim from the request: a long value must not make the insert fail
+_COLUMNS = (
+    ("subject_id", False),
+    ("action", False),
+    ("resource_type", False),
+    ("resource_id", True),
+)
+
+
+def upgrade() -> None:
+    # batch mode: SQLite cannot ALTER COLUMN; other backends alter in place
+    with op.batch_alter_table("audit_decisions") as batch:
+        for name, nullable in _COLUMNS:
+            batch.alter_column(name, type_=sa.Text(), existing_type=sa.String(256), existing_nullable=nullable)
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("audit_decisions") as batch:
+        for name, nullable in _COLUMNS:
+            batch.alter_column(name, type_=sa.String(256), existing_type=sa.Text(), existing_nullable=nullable)
@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+from fastapi import APIRouter, Request
+
+from app.api.errors import error_response
+from app.services.decision_cache import get_decision_cache
+from app.services.policy_registry import get_policy_registry
+from app.services.rule_profile import get_rule_profiler
+
+router = APIRouter(tags=["admin"])
+
+
+@router.get("/v1/admin/decision-cache")
+def decision_cache_stats() -> dict:
+    cache = get_decision_cache()
+    if cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **cache.stats()}
+
+
+@router.get("/v1/admin/policies")
+def policy_registry_stats() -> dict:
+    registry = get_policy_registry()
+    if registry is None:
+        return {"enabled": False}
+    return {"enabled": True, **registry.stats()}
+
+
+@router.get("/v1/admin/rule-profile")
+def rule_profile_stats() -> dict:
+    profiler = get_rule_profiler()
+    if profiler is None:
+        return {"enabled": False}
+    return {"enabled": True, **profiler.stats()}
+
+
+@router.delete("/v1/admin/rule-profile")
+def rule_profile_reset() -> dict:
+    profiler = get_rule_profiler()
+    if profiler is None:
+        return {"enabled": False}
+    profiler.reset()
+    return {"enabled": True}
+
+
+@router.post("/v1/admin/rule-profile:dump")
+def rule_profile_dump(request: Request):
+    profiler = get_rule_profiler()
+    if profiler is None or profiler.dump_path is None:
+        return error_response(
+            request,
+            status_code=503,
+            code="rule_profile_unavailable",
+            message="Rule profiling is not enabled with a dump path.",
+            details={"hint": "Set AUTHZ_RULE_PROFILE=1 and AUTHZ_RULE_PROFILE_PATH"},
+        )
+    try:
+        path = profiler.dump()
+    except OSError as e:
+        return error_response(
+            request,
+            status_code=500,
+            code="rule_profile_dump_failed",
+            message="Rule profile could not be written.",
+            details={"hint": str(e)},
+        )
+    return {"enabled": True, "path": str(path)}
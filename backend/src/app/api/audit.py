@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+from typing import Optional
+
+from fastapi import APIRouter, Query, Request
+
+from app.api.errors import error_response
+from app.schemas.audit import AuditRecordOut, AuditRecordPage
+from app.services.audit_query import AuditQuery, AuditQueryError, get_audit_store
+
+router = APIRouter(tags=["audit"])
+
+
+@router.get("/v1/audit/decisions/{decision_id}", response_model=AuditRecordOut)
+def get_decision(request: Request, decision_id: str) -> AuditRecordOut:
+    store = get_audit_store()
+    if store is None:
+        return _audit_unavailable(request)
+
+    obj = store.get(decision_id)
+    if obj is None:
+        return error_response(
+            request,
+            status_code=404,
+            code="audit_record_not_found",
+            message="No audit record for this decision_id.",
+            details={"decision_id": decision_id},
+        )
+    return AuditRecordOut.model_validate(obj)
+
+
+@router.get("/v1/audit/decisions", response_model=AuditRecordPage)
+def list_decisions(
+    request: Request,
+    correlation_id: Optional[str] = None,
+    subject_id: Optional[str] = None,
+    policy_version: Optional[str] = None,
+    since: Optional[str] = Query(default=None, description="ISO-8601, inclusive"),
+    until: Optional[str] = Query(default=None, description="ISO-8601, exclusive"),
+    limit: int = Query(default=100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+) -> AuditRecordPage:
+    """
+    Audit records in write order. At least one of correlation_id, subject_id or
+    policy_version is required; pass next_cursor back as cursor for the next page.
+    """
+    store = get_audit_store()
+    if store is None:
+        return _audit_unavailable(request)
+
+    try:
+        page = store.query(
+            AuditQuery(
+                correlation_id=correlation_id,
+                subject_id=subject_id,
+                policy_version=policy_version,
+                since=since,
+                until=until,
+                limit=limit,
+                cursor=cursor,
+            )
+        )
+    except AuditQueryError as e:
+        return error_response(
+            request,
+            status_code=400,
+            code="invalid_query",
+            message="Audit query is invalid.",
+            details={"hint": str(e)},
+        )
+    return AuditRecordPage(
+        items=[AuditRecordOut.model_validate(obj) for obj in page.items],
+        next_cursor=page.next_cursor,
+    )
+
+
+def _audit_unavailable(request: Request):
+    return error_response(
+        request,
+        status_code=503,
+        code="audit_unavailable",
+        message="Audit storage is not configured for querying.",
+        details={"hint": "Set AUTHZ_AUDIT_PATH with AUTHZ_AUDIT_BACKEND=jsonl or segments"},
+    )
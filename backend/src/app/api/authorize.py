@@ -1,78 +1,637 @@
 from __future__ import annotations
 
+import json
+import os
+import time
 import uuid
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Tuple
 
 from fastapi import APIRouter, HTTPException, Request
+from starlette.responses import Response, StreamingResponse
+from pydantic import ValidationError
+from starlette.concurrency import run_in_threadpool
 
-from app.domain.evaluator import evaluate
-from app.domain.types import AuthorizationRequest, Resource, Subject
+from app.domain.compiled_policy import CompiledPolicy
+from app.domain.evaluator import ALLOW, FULL, evaluate, evaluate_actions, resource_filter
+from app.domain.types import AuthorizationDecision, AuthorizationRequest, Resource, Subject
 from app.domain.audit import AuditRecord
-from app.schemas.authorize import AuthorizeRequest, AuthorizeResponse
-from app.services.policy_provider import PolicyProviderError, policy_provider_from_env
-from app.services.audit_sink import AuditSinkError, audit_sink_from_env, utc_now_iso
-from app.api.errors import error_response
+from app.schemas.authorize import (
+    AuthorizeActionsRequest,
+    AuthorizeActionsResponse,
+    AuthorizeBatchItem,
+    AuthorizeBatchRequest,
+    AuthorizeBatchResponse,
+    AuthorizeFilterRequest,
+    AuthorizeFilterResponse,
+    AuthorizeRequest,
+    AuthorizeResponse,
+    BatchItemError,
+    MAX_STREAM_LINE_BYTES,
+    STREAM_GROUP_SIZE,
+    StreamAuditMode,
+)
+from app.services.decision_cache import decision_cache_key, get_decision_cache
+from app.services.policy_provider import PolicyProviderError, PolicySnapshot, get_policy_provider
+from app.services.policy_registry import PolicySelectionError, UnknownPolicyError, get_policy_registry
+from app.services.audit_sink import AuditSink, AuditSinkError, get_audit_sink, utc_now_iso
+from app.services.metrics import (
+    DECISIONS_TOTAL,
+    STAGE_AUDIT,
+    STAGE_DECODE,
+    STAGE_ENCODE,
+    STAGE_EVALUATE,
+    STAGE_POLICY,
+)
+from app.services.rule_profile import RuleProfiler, get_rule_profiler
+from app.settings import resolved_once
+from app.api.decoding import (
+    DecodedAuthorizeRequest,
+    decode_authorize_request,
+    direct_decode_route,
+    from_model,
+    loads,
+    validate_authorize_request,
+    validate_authorize_request_json,
+)
+from app.api.encoding import JSONBytesResponse, dumps, dumps_fast
+from app.api.errors import error_payload, error_response
+from app.api.ndjson import NDJSON_MEDIA_TYPE, Line, LineTooLong, NdjsonStreamingResponse, iter_line_groups
 
 router = APIRouter(tags=["authz"])
 
 
-@router.post("/v1/authorize", response_model=AuthorizeResponse)
-def authorize(request: Request, body: AuthorizeRequest) -> AuthorizeResponse:
+async def _authorize_direct(request: Request, raw: bytes) -> Optional[Response]:
+    # Every well-formed body is decoded here, straight into domain objects. The
+    # rest (returns None) go through FastAPI's validation into `authorize`
+    # below, which produces the usual 422 errors.
+    t0 = time.perf_counter_ns()
     try:
-        provider = policy_provider_from_env()
-        policy = provider.get()
+        decoded = decode_authorize_request(loads(raw))
+    except ValueError:
+        return None
+    if decoded is None:
+        return None
+    STAGE_DECODE.observe_ns(time.perf_counter_ns() - t0)
+    return await _authorize(request, decoded)
+
+
+async def authorize(request: Request, body: AuthorizeRequest) -> AuthorizeResponse:
+    t0 = time.perf_counter_ns()
+    decoded = from_model(body)
+    STAGE_DECODE.observe_ns(time.perf_counter_ns() - t0)
+    return await _authorize(request, decoded)
+
+
+router.add_api_route(
+    "/v1/authorize",
+    authorize,
+    methods=["POST"],
+    response_model=AuthorizeResponse,
+    route_class_override=direct_decode_route(_authorize_direct),
+)
+
+
+async def _authorize(request: Request, body: DecodedAuthorizeRequest) -> Response:
+    # AUTHZ_AUTHORIZE_MODE=async (default) evaluates on the event loop: the
+    # policy is a snapshot read and evaluation is pure CPU work. Only blocking I/O
+    # leaves the loop: the first policy load, and audit writes the sink cannot
+    # accept without waiting (see AuditSink.write_nowait).
+    # AUTHZ_AUTHORIZE_MODE=threadpool runs the whole handler in the worker
+    # threadpool, as a sync route would.
+    if _authorize_mode() == "threadpool":
+        return await run_in_threadpool(_authorize_blocking, request, body)
+
+    clock = time.perf_counter_ns
+    t0 = clock()
+    try:
+        # One snapshot per request: a concurrent reload cannot change the policy
+        # between evaluation and audit.
+        policy_id = _policy_id(request, body)
+        snapshot = _published_snapshot(policy_id)
+        if snapshot is None:
+            snapshot = await run_in_threadpool(_load_snapshot, policy_id)
     except PolicyProviderError as e:
-        return error_response(
-            request,
-            status_code=500,
-            code="policy_unavailable",
-            message="Active policy could not be loaded.",
-            details={"hint": str(e)},
-        )
+        return _policy_error(request, e)
+    t1 = clock()
+    STAGE_POLICY.observe_ns(t1 - t0)
 
-    req = AuthorizationRequest(
-        subject=Subject(id=body.subject.id, claims=body.subject.claims),
-        action=body.action,
-        resource=Resource(type=body.resource.type, id=body.resource.id, attrs=body.resource.attrs),
-        context=body.context,
-    )
+    policy = snapshot.compiled
+    req, mode, decision, decision_id = _evaluate_stages(body, snapshot, t1)
+    t3 = clock()
+
+    try:
+        sink = get_audit_sink()
+        if sink is not None:
+            record = _audit_record(request, policy, req, decision, decision_id, mode)
+            if not sink.write_nowait(record):
+                await run_in_threadpool(sink.write, record)
+    except AuditSinkError as e:
+        return _audit_write_failed(request, e)
+    t4 = clock()
+    STAGE_AUDIT.observe_ns(t4 - t3)
+
+    return _render(policy, decision, decision_id, mode, t4)
 
-    decision = evaluate(req, policy)
-    decision_id = str(uuid.uuid4())
+
+def _authorize_blocking(request: Request, body: DecodedAuthorizeRequest):
+    clock = time.perf_counter_ns
+    t0 = clock()
+    try:
+        snapshot = _load_snapshot(_policy_id(request, body))
+    except PolicyProviderError as e:
+        return _policy_error(request, e)
+    t1 = clock()
+    STAGE_POLICY.observe_ns(t1 - t0)
+
+    policy = snapshot.compiled
+    req, mode, decision, decision_id = _evaluate_stages(body, snapshot, t1)
+    t3 = clock()
 
     # Audit (best-effort, but explicit failure mode)
-    sink = audit_sink_from_env()
-    if sink is not None:
-        record = AuditRecord(
-            correlation_id=request.state.correlation_id,
-            decision_id=decision_id,
-            policy_id=policy.id,
-            policy_version=policy.version,
-            subject_id=req.subject.id,
-            action=req.action,
-            resource_type=req.resource.type,
-            resource_id=req.resource.id,
-            decision=decision.decision,
-            reason=decision.reason,
-            matched_rule_ids=list(decision.matched_rule_ids),
-            context=req.context,
-            created_at=utc_now_iso(),
-        )
+    try:
+        sink = get_audit_sink()
+        if sink is not None:
+            sink.write(_audit_record(request, policy, req, decision, decision_id, mode))
+    except AuditSinkError as e:
+        return _audit_write_failed(request, e)
+    t4 = clock()
+    STAGE_AUDIT.observe_ns(t4 - t3)
+
+    return _render(policy, decision, decision_id, mode, t4)
+
+
+@router.post(
+    "/v1/authorize:batch",
+    response_model=AuthorizeBatchResponse,
+    response_model_exclude_none=True,
+)
+def authorize_batch(request: Request, body: AuthorizeBatchRequest) -> AuthorizeBatchResponse:
+    """
+    Evaluate many requests in one round trip.
+
+    - All items are evaluated against the same policy snapshot, selected by
+      the `X-Policy-Id` header (or the default policy). An item naming another
+      `policy_id` gets a per-item error.
+    - Results are returned in input order; an invalid item gets a per-item
+      error instead of failing the batch.
+    - Audit records for the whole batch are written in one grouped write. If
+      that write fails, the batch fails (no decision is returned unaudited).
+    """
+    # Results are built as the dicts AuthorizeBatchResponse serializes to and
+    # encoded here; response_model only documents the shape.
+    try:
+        snapshot = _load_snapshot(_policy_id(request, None))
+    except PolicyProviderError as e:
+        return _policy_error(request, e)
+
+    policy = snapshot.compiled
+    try:
+        sink = get_audit_sink()
+    except AuditSinkError as e:
+        return _audit_write_failed(request, e)
+
+    results: List[Dict[str, Any]] = []
+    records: List[AuditRecord] = []
+    for index, raw in enumerate(body.items):
         try:
-            sink.write(record)
-        except AuditSinkError as e:
-            return error_response(
-                request,
-                status_code=500,
-                code="audit_write_failed",
-                message="Audit write failed.",
-                details={"hint": str(e)},
+            item = validate_authorize_request(raw)
+        except ValidationError as e:
+            results.append(
+                AuthorizeBatchItem(
+                    index=index,
+                    error=BatchItemError(
+                        code="invalid_request",
+                        message="Request item failed validation.",
+                        details={"errors": e.errors(include_url=False, include_context=False)},
+                    ),
+                ).model_dump(mode="json", exclude_none=True)
             )
+            continue
+        mismatch = _policy_mismatch(index, item, policy)
+        if mismatch is not None:
+            results.append(mismatch.model_dump(mode="json", exclude_none=True))
+            continue
 
-    return AuthorizeResponse(
-        decision=decision.decision,
-        reason=decision.reason,
+        req = item.request
+        mode = _evaluation_mode(item)
+        decision = _decide(req, snapshot, mode)
+        decision_id = str(uuid.uuid4())
+        DECISIONS_TOTAL.labels(decision.decision, decision.reason).inc()
+        if sink is not None:
+            records.append(_audit_record(request, policy, req, decision, decision_id, mode))
+        results.append({"index": index, "result": _response_body(policy, decision, decision_id, mode)})
+
+    if sink is not None and records:
+        try:
+            sink.write_many(records)
+        except AuditSinkError as e:
+            return _audit_write_failed(request, e)
+
+    return JSONBytesResponse(dumps({"results": results}))
+
+
+@router.post("/v1/authorize:stream", response_class=NdjsonStreamingResponse)
+async def authorize_stream(request: Request, audit: StreamAuditMode = "bulk"):
+    """
+    Bulk evaluation over NDJSON, for offline and backfill jobs.
+
+    - Request body: one `/v1/authorize` request object per line.
+    - Response: one line per non-empty input line, in input order, shaped like a
+      batch item (`index` and either `result` or `error`). Results are sent as
+      input arrives; memory does not grow with the input size.
+    - The whole stream is evaluated against the policy snapshot that was active
+      when it started, selected by the `X-Policy-Id` header (or the default
+      policy). A line naming another `policy_id` gets a per-line error.
+    - `audit=bulk` (default) writes the audit records of each group of results
+      before sending them; `audit=none` skips auditing for this stream. If an
+      audit write fails, a final `{"error": ...}` line is sent and the stream
+      ends.
+    """
+    try:
+        policy_id = _policy_id(request, None)
+        snapshot = _published_snapshot(policy_id) or await run_in_threadpool(_load_snapshot, policy_id)
+    except PolicyProviderError as e:
+        return _policy_error(request, e)
+
+    sink = None
+    if audit == "bulk":
+        try:
+            sink = get_audit_sink()
+        except AuditSinkError as e:
+            return _audit_write_failed(request, e)
+
+    return NdjsonStreamingResponse(_stream_decisions(request, snapshot, sink))
+
+
+@router.post("/v1/authorize:actions", response_model=AuthorizeActionsResponse)
+async def authorize_actions(request: Request, body: AuthorizeActionsRequest) -> AuthorizeActionsResponse:
+    """
+    Every action the subject may perform on the resource, in one evaluation.
+
+    - Each returned action is one `/v1/authorize` would allow, with the same
+      `matched_rule_ids` (full mode); a deny rule still overrides the allows of
+      the actions it lists. Actions not returned are denied.
+    - Meant for UIs deciding what to show: nothing is audited and no
+      decision_id is issued. Enforce with `/v1/authorize`.
+    """
+    try:
+        policy_id = _policy_id(request, body)
+        snapshot = _published_snapshot(policy_id) or await run_in_threadpool(_load_snapshot, policy_id)
+    except PolicyProviderError as e:
+        return _policy_error(request, e)
+
+    policy = snapshot.compiled
+    decisions = evaluate_actions(
+        Subject(id=body.subject.id, claims=body.subject.claims),
+        Resource(type=body.resource.type, id=body.resource.id, attrs=body.resource.attrs),
+        body.context,
+        policy,
+    )
+    profiler = get_rule_profiler()
+    if profiler is not None:
+        profiler.count_decisions(policy, decisions.values())
+    actions = [
+        {"action": action, "matched_rule_ids": list(decision.matched_rule_ids)}
+        for action, decision in decisions.items()
+        if decision.decision == ALLOW
+    ]
+    return JSONBytesResponse(dumps_fast({"policy_id": policy.id, "policy_version": policy.version, "actions": actions}))
+
+
+@router.post("/v1/authorize:filter", response_model=AuthorizeFilterResponse)
+def authorize_filter(request: Request, body: AuthorizeFilterRequest, stream: bool = False) -> AuthorizeFilterResponse:
+    """
+    The resources (of one type) the subject may perform `action` on.
+
+    - Each resource is decided as `/v1/authorize` would decide it (full mode),
+      but the subject and context side of the rules is checked once per call,
+      and resources whose attrs agree on every attr the remaining rules test
+      are decided once.
+    - `allowed` lists the allowed resource ids in input order.
+    - `?stream=true` answers with NDJSON instead: a first line with `policy_id`
+      and `policy_version`, then one `{"allowed": [...]}` line per group of
+      resources, sent as each group is decided.
+    - Like `/v1/authorize:actions`, a filter for display: not audited and no
+      `decision_id`.
+    """
+    try:
+        snapshot = _load_snapshot(_policy_id(request, body))
+    except PolicyProviderError as e:
+        return _policy_error(request, e)
+
+    policy = snapshot.compiled
+    decide = resource_filter(
+        Subject(id=body.subject.id, claims=body.subject.claims),
+        body.action,
+        body.resource_type,
+        body.context,
+        policy,
+    )
+    profiler = get_rule_profiler()
+    if profiler is not None:
+        decide = profiler.counting(policy, decide)
+    if stream:
+        return StreamingResponse(_stream_filter(policy, body, decide), media_type=NDJSON_MEDIA_TYPE)
+
+    allowed = [r.id for r in body.resources if decide(r.attrs).decision == ALLOW]
+    return JSONBytesResponse(dumps_fast({"policy_id": policy.id, "policy_version": policy.version, "allowed": allowed}))
+
+
+# ----------------------------
+# Internals
+# ----------------------------
+
+def _policy_id(request: Request, body: Optional[Any]) -> Optional[str]:
+    # The body's policy_id (any request model with one), else the X-Policy-Id
+    # header; None selects the default
+    if body is not None and body.policy_id is not None:
+        return body.policy_id
+    return request.headers.get("x-policy-id")
+
+
+def _published_snapshot(policy_id: Optional[str]) -> Optional[PolicySnapshot]:
+    """The selected policy's snapshot if it is already loaded (never blocks)."""
+    registry = get_policy_registry()
+    if registry is not None:
+        return registry.published(policy_id)
+    return _check_selected(get_policy_provider().published(), policy_id)
+
+
+def _load_snapshot(policy_id: Optional[str]) -> PolicySnapshot:
+    """The selected policy's snapshot, loading it if needed (may block)."""
+    registry = get_policy_registry()
+    if registry is not None:
+        return registry.snapshot(policy_id)
+    return _check_selected(get_policy_provider().snapshot(), policy_id)
+
+
+def _check_selected(snapshot: Optional[PolicySnapshot], policy_id: Optional[str]) -> Optional[PolicySnapshot]:
+    # Single-policy mode: a request may only name the active policy
+    if snapshot is not None and policy_id is not None and snapshot.policy.id != policy_id:
+        raise UnknownPolicyError(f"Unknown policy: {policy_id}")
+    return snapshot
+
+
+def _policy_mismatch(index: int, item: DecodedAuthorizeRequest, policy: CompiledPolicy) -> Optional[AuthorizeBatchItem]:
+    if item.policy_id is None or item.policy_id == policy.id:
+        return None
+    return AuthorizeBatchItem(
+        index=index,
+        error=BatchItemError(
+            code="policy_mismatch",
+            message="Item names a different policy than the one selected for this call.",
+            details={"policy_id": item.policy_id, "selected_policy_id": policy.id},
+        ),
+    )
+
+
+@resolved_once
+def _settings_from_env() -> Tuple[str, str, bool]:
+    # (AUTHZ_AUTHORIZE_MODE, AUTHZ_EVALUATION_MODE, AUTHZ_AUDIT_CAPTURE_INPUTS=1)
+    return (
+        os.getenv("AUTHZ_AUTHORIZE_MODE", "async").strip(),
+        os.getenv("AUTHZ_EVALUATION_MODE", FULL).strip(),
+        os.getenv("AUTHZ_AUDIT_CAPTURE_INPUTS", "0").strip() == "1",
+    )
+
+
+def _authorize_mode() -> str:
+    return _settings_from_env()[0]
+
+
+def _evaluate_stages(
+    body: DecodedAuthorizeRequest, snapshot: PolicySnapshot, t1: int
+) -> Tuple[AuthorizationRequest, str, AuthorizationDecision, str]:
+    """Evaluate stage of /v1/authorize; t1 is when the policy stage ended."""
+    req = body.request
+    mode = _evaluation_mode(body)
+    decision = _decide(req, snapshot, mode)
+    decision_id = str(uuid.uuid4())
+    STAGE_EVALUATE.observe_ns(time.perf_counter_ns() - t1)
+    DECISIONS_TOTAL.labels(decision.decision, decision.reason).inc()
+    return req, mode, decision, decision_id
+
+
+def _render(
+    policy: CompiledPolicy, decision: AuthorizationDecision, decision_id: str, mode: str, t4: int
+) -> JSONBytesResponse:
+    # Encoded here rather than by FastAPI: no AuthorizeResponse is built,
+    # validated or run through jsonable_encoder, and the encode stage is measured.
+    response = JSONBytesResponse(dumps_fast(_response_body(policy, decision, decision_id, mode)))
+    STAGE_ENCODE.observe_ns(time.perf_counter_ns() - t4)
+    return response
+
+
+def _evaluation_mode(body: DecodedAuthorizeRequest) -> str:
+    # Per request, else AUTHZ_EVALUATION_MODE (full unless configured)
+    return body.evaluation_mode or _settings_from_env()[1]
+
+
+def _decide(req: AuthorizationRequest, snapshot: PolicySnapshot, mode: str) -> AuthorizationDecision:
+    profiler = get_rule_profiler()
+    cache = get_decision_cache()
+    if cache is None:
+        return _evaluate(req, snapshot.compiled, mode, profiler)
+
+    key = decision_cache_key(req, snapshot.compiled, mode)
+    if key is None:
+        return _evaluate(req, snapshot.compiled, mode, profiler)
+
+    scope = snapshot.compiled.id
+    decision = cache.get(snapshot.generation, key, scope)
+    if decision is None:
+        decision = _evaluate(req, snapshot.compiled, mode, profiler)
+        cache.put(snapshot.generation, key, decision, scope)
+    elif profiler is not None:
+        profiler.count_cached(snapshot.compiled, decision)
+    return decision
+
+
+def _evaluate(
+    req: AuthorizationRequest, policy: CompiledPolicy, mode: str, profiler: Optional[RuleProfiler]
+) -> AuthorizationDecision:
+    if profiler is None:
+        return evaluate(req, policy, mode)
+    return profiler.evaluate(req, policy, mode)
+
+
+def _audit_record(
+    request: Request,
+    policy: CompiledPolicy,
+    req: AuthorizationRequest,
+    decision: AuthorizationDecision,
+    decision_id: str,
+    mode: str,
+) -> AuditRecord:
+    # Claims and attrs make records replayable (app.cli.replay), but often hold
+    # personal data or token claims: only persisted with AUTHZ_AUDIT_CAPTURE_INPUTS=1.
+    capture = _settings_from_env()[2]
+    return AuditRecord(
+        correlation_id=request.state.correlation_id,
         decision_id=decision_id,
         policy_id=policy.id,
         policy_version=policy.version,
+        subject_id=req.subject.id,
+        action=req.action,
+        resource_type=req.resource.type,
+        resource_id=req.resource.id,
+        decision=decision.decision,
+        reason=decision.reason,
         matched_rule_ids=list(decision.matched_rule_ids),
+        context=req.context,
+        created_at=utc_now_iso(),
+        subject_claims=req.subject.claims if capture else None,
+        resource_attrs=(req.resource.attrs or {}) if capture else None,
+        evaluation_mode=mode,
+    )
+
+
+def _response_body(
+    policy: CompiledPolicy, decision: AuthorizationDecision, decision_id: str, mode: str
+) -> Dict[str, Any]:
+    # Exactly what AuthorizeResponse serializes to: same keys in the same order,
+    # all strings (matched_rule_ids may be a tuple; it encodes as an array).
+    return {
+        "decision": decision.decision,
+        "reason": decision.reason,
+        "decision_id": decision_id,
+        "policy_id": policy.id,
+        "policy_version": policy.version,
+        "matched_rule_ids": decision.matched_rule_ids,
+        "evaluation_mode": mode,
+    }
+
+
+async def _stream_decisions(
+    request: Request, snapshot: PolicySnapshot, sink: Optional[AuditSink]
+) -> AsyncIterator[bytes]:
+    policy = snapshot.compiled
+    profiler = get_rule_profiler()
+    index = 0
+    async for lines in iter_line_groups(request.stream(), MAX_STREAM_LINE_BYTES):
+        for start in range(0, len(lines), STREAM_GROUP_SIZE):
+            out: List[bytes] = []
+            records: List[AuditRecord] = []
+            for line in lines[start : start + STREAM_GROUP_SIZE]:
+                if not isinstance(line, LineTooLong) and not line.strip():
+                    continue
+                item = _stream_item(request, policy, profiler, index, line, records if sink is not None else None)
+                out.append(item + b"\n")
+                index += 1
+
+            if records:
+                try:
+                    await run_in_threadpool(sink.write_many, records)
+                except AuditSinkError as e:
+                    payload = error_payload(
+                        request, code="audit_write_failed", message="Audit write failed.", details={"hint": str(e)}
+                    )
+                    yield json.dumps(payload).encode("utf-8") + b"\n"
+                    return
+            if out:
+                yield b"".join(out)
+
+
+def _stream_filter(
+    policy: CompiledPolicy,
+    body: AuthorizeFilterRequest,
+    decide: Callable[[Dict[str, Any]], AuthorizationDecision],
+) -> Iterator[bytes]:
+    # A sync generator: StreamingResponse runs it in the threadpool
+    yield dumps_fast({"policy_id": policy.id, "policy_version": policy.version}) + b"\n"
+    resources = body.resources
+    for start in range(0, len(resources), STREAM_GROUP_SIZE):
+        group = resources[start : start + STREAM_GROUP_SIZE]
+        yield dumps_fast({"allowed": [r.id for r in group if decide(r.attrs).decision == ALLOW]}) + b"\n"
+
+
+def _stream_item(
+    request: Request,
+    policy: CompiledPolicy,
+    profiler: Optional[RuleProfiler],
+    index: int,
+    line: Line,
+    records: Optional[List[AuditRecord]],
+) -> bytes:
+    """One NDJSON line (without the newline) for one input line."""
+    if isinstance(line, LineTooLong):
+        return _error_line(
+            AuthorizeBatchItem(
+                index=index,
+                error=BatchItemError(
+                    code="invalid_request",
+                    message=f"Line exceeds {MAX_STREAM_LINE_BYTES} bytes.",
+                    details={"size": line.size},
+                ),
+            )
+        )
+    try:
+        item = validate_authorize_request_json(line)
+    except ValidationError as e:
+        return _error_line(
+            AuthorizeBatchItem(
+                index=index,
+                error=BatchItemError(
+                    code="invalid_request",
+                    message="Request item failed validation.",
+                    details={"errors": e.errors(include_url=False, include_context=False)},
+                ),
+            )
+        )
+    mismatch = _policy_mismatch(index, item, policy)
+    if mismatch is not None:
+        return _error_line(mismatch)
+
+    # Straight to evaluate(): a bulk job would only churn the decision cache
+    req = item.request
+    mode = _evaluation_mode(item)
+    decision = _evaluate(req, policy, mode, profiler)
+    decision_id = str(uuid.uuid4())
+    DECISIONS_TOTAL.labels(decision.decision, decision.reason).inc()
+    if records is not None:
+        records.append(_audit_record(request, policy, req, decision, decision_id, mode))
+    return dumps_fast({"index": index, "result": _response_body(policy, decision, decision_id, mode)})
+
+
+def _error_line(item: AuthorizeBatchItem) -> bytes:
+    return item.model_dump_json(exclude_none=True).encode("utf-8")
+
+
+def _policy_error(request: Request, e: PolicyProviderError):
+    if isinstance(e, PolicySelectionError):
+        return error_response(
+            request,
+            status_code=400,
+            code="invalid_policy_selection",
+            message="Request does not select a usable policy.",
+            details={"hint": str(e)},
+        )
+    if isinstance(e, UnknownPolicyError):
+        return error_response(
+            request,
+            status_code=404,
+            code="policy_not_found",
+            message="Selected policy does not exist.",
+            details={"hint": str(e)},
+        )
+    return _policy_unavailable(request, e)
+
+
+def _policy_unavailable(request: Request, e: PolicyProviderError):
+    return error_response(
+        request,
+        status_code=500,
+        code="policy_unavailable",
+        message="Active policy could not be loaded.",
+        details={"hint": str(e)},
+    )
+
+
+def _audit_write_failed(request: Request, e: AuditSinkError):
+    return error_response(
+        request,
+        status_code=500,
+        code="audit_write_failed",
+        message="Audit write failed.",
+        details={"hint": str(e)},
     )
@@ -0,0 +1,180 @@
+from __future__ import annotations
+
+import email.message
+import json
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Optional, Type, get_args
+
+from fastapi.routing import APIRoute
+from pydantic import ValidationError
+from starlette.requests import Request
+from starlette.responses import Response
+
+from app.domain.types import AuthorizationRequest, Resource, Subject
+from app.schemas.authorize import AuthorizeRequest, EvaluationMode
+
+try:
+    import orjson
+except ImportError:  # optional: pip install 'authz-service[fast]'
+    orjson = None
+
+
+@dataclass(frozen=True, slots=True)
+class DecodedAuthorizeRequest:
+    """An /v1/authorize request body as domain objects, plus its routing fields."""
+    request: AuthorizationRequest
+    evaluation_mode: Optional[str] = None
+    policy_id: Optional[str] = None
+
+
+_REQUEST_KEYS = frozenset(AuthorizeRequest.model_fields)
+_SUBJECT_KEYS = frozenset(AuthorizeRequest.model_fields["subject"].annotation.model_fields)
+_RESOURCE_KEYS = frozenset(AuthorizeRequest.model_fields["resource"].annotation.model_fields)
+_EVALUATION_MODES = frozenset(get_args(EvaluationMode))
+
+
+def decode_authorize_request(obj: Any) -> Optional[DecodedAuthorizeRequest]:
+    """
+    Build the domain request straight from a parsed JSON body.
+
+    Accepts exactly the bodies AuthorizeRequest accepts with no coercion
+    needed, and returns None for anything else; callers then validate with
+    AuthorizeRequest to get its errors. Claims, attrs and context are used as
+    parsed, not copied.
+    """
+    if type(obj) is not dict or not obj.keys() <= _REQUEST_KEYS:
+        return None
+    subject = obj.get("subject")
+    resource = obj.get("resource")
+    action = obj.get("action")
+    if type(subject) is not dict or type(resource) is not dict or type(action) is not str:
+        return None
+    if not subject.keys() <= _SUBJECT_KEYS or not resource.keys() <= _RESOURCE_KEYS:
+        return None
+
+    subject_id = subject.get("id")
+    claims = subject.get("claims")
+    resource_type = resource.get("type")
+    resource_id = resource.get("id")
+    attrs = resource.get("attrs")
+    context = obj.get("context")
+    mode = obj.get("evaluation_mode")
+    policy_id = obj.get("policy_id")
+    if (
+        type(subject_id) is not str
+        or type(resource_type) is not str
+        or (resource_id is not None and type(resource_id) is not str)
+        or (mode is not None and mode not in _EVALUATION_MODES)
+        or (policy_id is not None and type(policy_id) is not str)
+    ):
+        return None
+    # Absent dicts default to {}; present ones must be objects (not null)
+    if claims is None:
+        if "claims" in subject:
+            return None
+        claims = {}
+    if attrs is None:
+        if "attrs" in resource:
+            return None
+        attrs = {}
+    if context is None:
+        if "context" in obj:
+            return None
+        context = {}
+    if type(claims) is not dict or type(attrs) is not dict or type(context) is not dict:
+        return None
+
+    return DecodedAuthorizeRequest(
+        request=AuthorizationRequest(
+            subject=Subject(id=subject_id, claims=claims),
+            action=action,
+            resource=Resource(type=resource_type, id=resource_id, attrs=attrs),
+            context=context,
+        ),
+        evaluation_mode=mode,
+        policy_id=policy_id,
+    )
+
+
+def from_model(body: AuthorizeRequest) -> DecodedAuthorizeRequest:
+    """The same result for a body that was validated into AuthorizeRequest."""
+    return DecodedAuthorizeRequest(
+        request=AuthorizationRequest(
+            subject=Subject(id=body.subject.id, claims=body.subject.claims),
+            action=body.action,
+            resource=Resource(type=body.resource.type, id=body.resource.id, attrs=body.resource.attrs),
+            context=body.context,
+        ),
+        evaluation_mode=body.evaluation_mode,
+        policy_id=body.policy_id,
+    )
+
+
+def validate_authorize_request(obj: Any) -> DecodedAuthorizeRequest:
+    """decode_authorize_request(), falling back to AuthorizeRequest (raises ValidationError)."""
+    decoded = decode_authorize_request(obj)
+    if decoded is None:
+        decoded = from_model(AuthorizeRequest.model_validate(obj))
+    return decoded
+
+
+def validate_authorize_request_json(raw: bytes) -> DecodedAuthorizeRequest:
+    """validate_authorize_request() for raw JSON (raises ValidationError)."""
+    try:
+        obj = loads(raw)
+    except ValueError:
+        obj = None
+    decoded = decode_authorize_request(obj)
+    if decoded is None:
+        decoded = from_model(AuthorizeRequest.model_validate_json(raw))
+    return decoded
+
+
+def loads(raw: bytes) -> Any:
+    """json.loads, with orjson when it is installed; raises ValueError."""
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+# Handles an already decoded body; returning None sends the request down the
+# regular (validated) route path instead.
+DirectHandler = Callable[[Request, bytes], Awaitable[Optional[Response]]]
+
+
+def direct_decode_route(handler: DirectHandler) -> Type[APIRoute]:
+    """
+    An APIRoute class that offers each JSON request body to handler first.
+
+    The route is declared as usual (its body parameter still defines OpenAPI);
+    only requests the handler declines go through FastAPI's body parsing and
+    validation, so those get FastAPI's usual 422 errors.
+    """
+
+    class DirectDecodeRoute(APIRoute):
+        def get_route_handler(self):
+            validated = super().get_route_handler()
+
+            async def route_handler(request: Request) -> Response:
+                if _is_json(request):
+                    response = await handler(request, await request.body())
+                    if response is not None:
+                        return response
+                return await validated(request)
+
+            return route_handler
+
+    return DirectDecodeRoute
+
+
+def _is_json(request: Request) -> bool:
+    # The content types FastAPI parses as JSON
+    content_type = request.headers.get("content-type")
+    if not content_type:
+        return False
+    if content_type == "application/json":
+        return True
+    message = email.message.Message()
+    message["content-type"] = content_type
+    subtype = message.get_content_subtype()
+    return message.get_content_maintype() == "application" and (subtype == "json" or subtype.endswith("+json"))
@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+import json
+from typing import Any
+
+from starlette.responses import Response
+
+try:
+    import orjson
+except ImportError:  # optional: pip install 'authz-service[fast]'
+    orjson = None
+
+
+# The encoder Starlette's JSONResponse uses, built once
+_encode = json.JSONEncoder(ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode
+
+
+def dumps(obj: Any) -> bytes:
+    """The exact bytes JSONResponse(content=obj) sends."""
+    return _encode(obj).encode("utf-8")
+
+
+def dumps_fast(obj: Any) -> bytes:
+    """
+    dumps(), with orjson when it is installed.
+
+    Only for payloads of strings, ints, lists, tuples and dicts, for which both
+    encoders produce the same bytes (they differ on floats). Anything orjson
+    rejects (e.g. ints over 64 bits) goes through dumps().
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj)
+        except TypeError:
+            pass
+    return dumps(obj)
+
+
+class JSONBytesResponse(Response):
+    """A JSON response whose body was already encoded."""
+
+    media_type = "application/json"
@@ -15,6 +15,11 @@ class ErrorBody:
 
 
 def error_response(request: Request, *, status_code: int, code: str, message: str, details=None) -> JSONResponse:
+    return JSONResponse(status_code=status_code, content=error_payload(request, code=code, message=message, details=details))
+
+
+def error_payload(request: Request, *, code: str, message: str, details=None) -> Dict[str, Any]:
+    """The structured error body (also sent as the last line of a failed stream)."""
     cid = getattr(request.state, "correlation_id", None)
     payload: Dict[str, Any] = {
         "error": {
@@ -26,4 +31,4 @@ def error_response(request: Request, *, status_code: int, code: str, message: st
         payload["error"]["details"] = details
     if cid:
         payload["error"]["correlation_id"] = cid
-    return JSONResponse(status_code=status_code, content=payload)
+    return payload
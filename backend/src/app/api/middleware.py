@@ -1,35 +1,54 @@
 from __future__ import annotations
 
 import uuid
-from typing import Callable
 
-from fastapi import Request, Response
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 
 CORRELATION_HEADER = "X-Correlation-Id"
+_HEADER_KEY = CORRELATION_HEADER.lower().encode("latin-1")
 
 
-class CorrelationIdMiddleware(BaseHTTPMiddleware):
+class CorrelationIdMiddleware:
     """
     - If client provides X-Correlation-Id, trust it as an opaque string (bounded length).
     - Otherwise generate a UUID4.
     - Store on request.state.correlation_id
     - Echo back on response header.
+
+    Plain ASGI (no BaseHTTPMiddleware): the id is read from the raw request
+    headers and appended to the raw headers of http.response.start, without
+    wrapping the request or response streams.
     """
 
-    def __init__(self, app, max_len: int = 128):
-        super().__init__(app)
+    def __init__(self, app: ASGIApp, max_len: int = 128) -> None:
+        self.app = app
         self.max_len = max_len
 
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
-        raw = request.headers.get(CORRELATION_HEADER)
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        raw = None
+        for key, value in scope["headers"]:
+            if key == _HEADER_KEY:
+                raw = value
+                break
         if raw:
-            cid = raw.strip()[: self.max_len]
+            cid = raw.decode("latin-1").strip()[: self.max_len]
         else:
             cid = str(uuid.uuid4())
 
-        request.state.correlation_id = cid
-        response = await call_next(request)
-        response.headers[CORRELATION_HEADER] = cid
-        return response
+        # request.state is a view over scope["state"]
+        scope.setdefault("state", {})["correlation_id"] = cid
+        header = (_HEADER_KEY, cid.encode("latin-1"))
+
+        async def send_with_correlation_id(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = [h for h in message.get("headers", ()) if h[0].lower() != _HEADER_KEY]
+                headers.append(header)
+                message["headers"] = headers
+            await send(message)
+
+        await self.app(scope, receive, send_with_correlation_id)
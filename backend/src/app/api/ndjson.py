@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+from typing import AsyncIterator, List, Union
+
+from starlette.responses import StreamingResponse
+from starlette.types import Receive, Scope, Send
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+class LineTooLong:
+    """Placeholder yielded for an input line longer than the limit (its bytes are discarded)."""
+
+    def __init__(self, size: int) -> None:
+        self.size = size
+
+
+Line = Union[bytes, LineTooLong]
+
+
+async def iter_line_groups(chunks: AsyncIterator[bytes], max_line_bytes: int) -> AsyncIterator[List[Line]]:
+    """
+    Complete lines (without the newline) from a byte stream, grouped per
+    received chunk so results can be sent as soon as their input arrives.
+
+    At most one partial line (capped at max_line_bytes) is buffered.
+    """
+    buf = bytearray()
+    skipped = 0  # > 0 while discarding the rest of an over-long line
+    async for chunk in chunks:
+        lines: List[Line] = []
+        start = 0
+        while True:
+            nl = chunk.find(b"\n", start)
+            end = len(chunk) if nl == -1 else nl
+            if skipped:
+                skipped += end - start
+            else:
+                buf += chunk[start:end]
+                if len(buf) > max_line_bytes:
+                    skipped = len(buf)
+                    buf.clear()
+            if nl == -1:
+                break
+            if skipped:
+                lines.append(LineTooLong(skipped))
+                skipped = 0
+            else:
+                lines.append(bytes(buf))
+                buf.clear()
+            start = nl + 1
+        if lines:
+            yield lines
+
+    if skipped:
+        yield [LineTooLong(skipped)]
+    elif buf:
+        yield [bytes(buf)]
+
+
+class NdjsonStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse for bodies produced while the request body is still
+    being read.
+
+    StreamingResponse may listen for http.disconnect on receive() concurrently,
+    which would consume request body messages; here the body iterator is the
+    only reader, and a client disconnect surfaces through request.stream().
+    """
+
+    media_type = NDJSON_MEDIA_TYPE
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        async for chunk in self.body_iterator:
+            if not isinstance(chunk, (bytes, memoryview)):
+                chunk = chunk.encode(self.charset)
+            await send({"type": "http.response.body", "body": chunk, "more_body": True})
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
+        if self.background is not None:
+            await self.background()
@@ -0,0 +1,298 @@
+"""
+Replay recorded decisions against a candidate policy and report what would change.
+
+    cd backend
+    PYTHONPATH=src python -m app.cli.replay --audit ../audit.jsonl --policy candidate.json
+    PYTHONPATH=src python -m app.cli.replay --audit /var/lib/authz/audit --policy candidate.json \\
+        --workers 8 --out impact.json
+
+--audit is a JSONL file or a segments directory (AUTHZ_AUDIT_BACKEND=segments).
+Records without subject_claims/resource_attrs (written before they were
+captured, or without AUTHZ_AUDIT_CAPTURE_INPUTS=1) are inexact: their decision
+cannot be reproduced, so they are counted but not replayed. --include-inexact
+replays them with empty claims and attrs; their changes are reported apart
+(inexact_changes) and never added to the allow_to_deny / deny_to_allow /
+rules_changed counts. An aggregate record (AUTHZ_AUDIT_AGGREGATE_WINDOW_S) is
+evaluated once and counted once per decision it stands for.
+"""
+from __future__ import annotations
+
+import argparse
+import gzip
+import json
+import os
+import sys
+from collections import Counter, deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import IO, Any, Deque, Dict, Iterator, List, Optional
+
+from app.domain.compiled_policy import CompiledPolicy, compile_policy
+from app.domain.evaluator import EVALUATION_MODES, FULL, evaluate
+from app.domain.policy_loader import PolicyLoadError, load_policy_from_file
+from app.domain.types import AuthorizationRequest, Resource, Subject
+from app.services.audit_aggregate import expand_aggregate, is_aggregate
+from app.services.audit_segments import list_segments
+
+CHANGE_KINDS = ("allow_to_deny", "deny_to_allow", "rules_changed")
+
+
+@dataclass
+class ReplayReport:
+    records: int = 0
+    replayed: int = 0
+    invalid: int = 0  # unparseable lines or records missing required fields
+    inexact: int = 0  # without recorded claims/attrs: skipped unless include_inexact
+    # Exact records only
+    unchanged: int = 0
+    allow_to_deny: int = 0
+    deny_to_allow: int = 0
+    rules_changed: int = 0  # same decision, different matched rules
+    # Inexact records replayed with empty claims/attrs (include_inexact): mostly
+    # differences in the missing inputs, not in the policy
+    inexact_changes: Counter = field(default_factory=Counter)
+    rules_gained: Counter = field(default_factory=Counter)
+    rules_lost: Counter = field(default_factory=Counter)
+    samples: Dict[str, List[Dict[str, Any]]] = field(default_factory=lambda: {k: [] for k in CHANGE_KINDS})
+
+    def merge(self, other: "ReplayReport", max_samples: int) -> None:
+        for name in ("records", "replayed", "invalid", "inexact", "unchanged", *CHANGE_KINDS):
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        self.inexact_changes.update(other.inexact_changes)
+        self.rules_gained.update(other.rules_gained)
+        self.rules_lost.update(other.rules_lost)
+        for kind in CHANGE_KINDS:
+            room = max_samples - len(self.samples[kind])
+            if room > 0:
+                self.samples[kind].extend(other.samples[kind][:room])
+
+    def to_dict(self) -> Dict[str, Any]:
+        out = asdict(self)
+        out["rules_gained"] = dict(self.rules_gained.most_common())
+        out["rules_lost"] = dict(self.rules_lost.most_common())
+        out["inexact_changes"] = {k: self.inexact_changes[k] for k in ("unchanged", *CHANGE_KINDS)}
+        return out
+
+
+def replay_chunk(
+    data: bytes, policy: CompiledPolicy, max_samples: int, include_inexact: bool = False
+) -> ReplayReport:
+    """Replay every complete JSONL line in `data`."""
+    report = ReplayReport()
+    for line in data.splitlines():
+        if not line.strip():
+            continue
+        weight = 1  # decisions the line stands for
+        try:
+            rec = json.loads(line)
+            if is_aggregate(rec):
+                weight = int(rec["count"])
+            req = _request_from_record(rec)
+            before_decision = rec["decision"]
+            before_rules = list(rec["matched_rule_ids"])
+            mode = rec.get("evaluation_mode") or FULL
+            if mode not in EVALUATION_MODES:
+                raise ValueError(mode)
+        except (ValueError, KeyError, TypeError, AttributeError):
+            report.records += weight
+            report.invalid += weight
+            continue
+
+        report.records += weight
+        exact = rec.get("subject_claims") is not None and rec.get("resource_attrs") is not None
+        if not exact:
+            report.inexact += weight
+            if not include_inexact:
+                continue
+        report.replayed += weight
+
+        # Same mode as recorded, so rule ids are comparable
+        after = evaluate(req, policy, mode)
+        after_rules = list(after.matched_rule_ids)
+        if after.decision != before_decision:
+            kind = "allow_to_deny" if before_decision == "allow" else "deny_to_allow"
+        elif after_rules != before_rules:
+            kind = "rules_changed"
+        else:
+            kind = "unchanged"
+        if not exact:
+            report.inexact_changes[kind] += weight
+            continue
+        if kind == "unchanged":
+            report.unchanged += weight
+            continue
+
+        setattr(report, kind, getattr(report, kind) + weight)
+        report.rules_gained.update(dict.fromkeys(set(after_rules) - set(before_rules), weight))
+        report.rules_lost.update(dict.fromkeys(set(before_rules) - set(after_rules), weight))
+        if len(report.samples[kind]) < max_samples:
+            first = expand_aggregate(rec)[0]  # an aggregate is sampled by its first decision
+            report.samples[kind].append(
+                {
+                    "decision_id": first.get("decision_id"),
+                    "correlation_id": first.get("correlation_id"),
+                    "created_at": first.get("created_at"),
+                    "policy_version": rec.get("policy_version"),
+                    "subject_id": req.subject.id,
+                    "action": req.action,
+                    "resource_type": req.resource.type,
+                    "resource_id": req.resource.id,
+                    "before": {"decision": before_decision, "reason": rec.get("reason"), "matched_rule_ids": before_rules},
+                    "after": {"decision": after.decision, "reason": after.reason, "matched_rule_ids": after_rules},
+                }
+            )
+    return report
+
+
+def iter_chunks(path: Path, chunk_bytes: int) -> Iterator[bytes]:
+    """
+    The audit log as blobs of whole lines, about chunk_bytes each, in write
+    order. A torn final line (write in progress) is left out.
+    """
+    if path.is_dir():
+        sources = [(s.data_path, s.compressed) for s in list_segments(path)]
+    else:
+        sources = [(path, path.suffix == ".gz")]
+
+    for data_path, compressed in sources:
+        with (gzip.open(data_path, "rb") if compressed else data_path.open("rb")) as f:
+            yield from _whole_line_blocks(f, chunk_bytes)
+
+
+def run_replay(
+    audit_path: Path,
+    policy_path: Path,
+    *,
+    workers: int,
+    chunk_bytes: int = 4 * 1024 * 1024,
+    max_samples: int = 20,
+    include_inexact: bool = False,
+) -> ReplayReport:
+    """
+    Replay a whole audit log. Chunks are evaluated by `workers` processes (inline
+    when workers == 1); at most 2 * workers chunks are in flight, so memory is
+    bounded by chunk size whatever the log size. Inexact records are only
+    replayed with include_inexact (see the module docstring).
+    """
+    total = ReplayReport()
+    chunks = iter_chunks(audit_path, chunk_bytes)
+
+    if workers <= 1:
+        policy = compile_policy(load_policy_from_file(policy_path))
+        for data in chunks:
+            total.merge(replay_chunk(data, policy, max_samples, include_inexact), max_samples)
+        return total
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(str(policy_path),)) as pool:
+        pending: Deque[Future] = deque()
+        for data in chunks:
+            pending.append(pool.submit(_replay_in_worker, data, max_samples, include_inexact))
+            if len(pending) >= 2 * workers:
+                total.merge(pending.popleft().result(), max_samples)
+        while pending:
+            total.merge(pending.popleft().result(), max_samples)
+    return total
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--audit", required=True, type=Path, help="audit.jsonl or segments directory")
+    parser.add_argument("--policy", required=True, type=Path, help="candidate policy file")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunk-mib", type=float, default=4.0, help="input per work unit")
+    parser.add_argument("--samples", type=int, default=20, help="sample records kept per change kind")
+    parser.add_argument("--out", type=Path, help="write the JSON report here (default: stdout)")
+    parser.add_argument(
+        "--include-inexact",
+        action="store_true",
+        help="also replay records without captured claims/attrs (reported apart, as inexact_changes)",
+    )
+    args = parser.parse_args(argv)
+
+    if not args.audit.exists():
+        parser.error(f"audit log not found: {args.audit}")
+    try:
+        candidate = load_policy_from_file(args.policy)
+    except PolicyLoadError as e:
+        parser.error(f"invalid candidate policy {args.policy}: {e}")
+
+    report = run_replay(
+        args.audit,
+        args.policy,
+        workers=args.workers,
+        chunk_bytes=max(int(args.chunk_mib * 1024 * 1024), 1),
+        max_samples=args.samples,
+        include_inexact=args.include_inexact,
+    )
+    out = {"candidate": {"policy_id": candidate.id, "policy_version": candidate.version}, **report.to_dict()}
+    text = json.dumps(out, indent=2, sort_keys=True)
+    if args.out is not None:
+        args.out.write_text(text + "\n", encoding="utf-8")
+    else:
+        print(text)
+
+    exact = report.records - report.invalid - report.inexact
+    summary = (
+        f"{report.records} records ({report.invalid} invalid, {report.inexact} inexact); "
+        f"{exact} exact replayed: {report.allow_to_deny} allow->deny, "
+        f"{report.deny_to_allow} deny->allow, {report.rules_changed} rule-id changes"
+    )
+    if args.include_inexact:
+        changes = report.inexact_changes
+        summary += (
+            f"; inexact, replayed without claims/attrs (not reliable): {changes['allow_to_deny']} allow->deny, "
+            f"{changes['deny_to_allow']} deny->allow, {changes['rules_changed']} rule-id changes"
+        )
+    elif report.inexact:
+        summary += "; inexact records skipped (--include-inexact to replay them)"
+    print(summary, file=sys.stderr)
+    return 0
+
+
+# ----------------------------
+# Internals
+# ----------------------------
+
+_worker_policy: Optional[CompiledPolicy] = None
+
+
+def _init_worker(policy_path: str) -> None:
+    global _worker_policy
+    _worker_policy = compile_policy(load_policy_from_file(Path(policy_path)))
+
+
+def _replay_in_worker(data: bytes, max_samples: int, include_inexact: bool) -> ReplayReport:
+    return replay_chunk(data, _worker_policy, max_samples, include_inexact)
+
+
+def _request_from_record(rec: Dict[str, Any]) -> AuthorizationRequest:
+    return AuthorizationRequest(
+        subject=Subject(id=rec["subject_id"], claims=rec.get("subject_claims") or {}),
+        action=rec["action"],
+        resource=Resource(
+            type=rec["resource_type"],
+            id=rec.get("resource_id"),
+            attrs=rec.get("resource_attrs") or {},
+        ),
+        context=rec.get("context") or {},
+    )
+
+
+def _whole_line_blocks(f: IO[bytes], chunk_bytes: int) -> Iterator[bytes]:
+    carry = b""
+    while True:
+        block = f.read(chunk_bytes)
+        if not block:
+            return  # anything left in carry has no newline: not a record yet
+        block = carry + block
+        cut = block.rfind(b"\n") + 1
+        if cut:
+            carry = block[cut:]
+            yield block[:cut]
+        else:
+            carry = block
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
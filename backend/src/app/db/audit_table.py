@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+from sqlalchemy import (
+    JSON,
+    BigInteger,
+    Column,
+    DateTime,
+    Index,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    Text,
+)
+
+
+metadata = MetaData()
+
+# One row per decision; mirrors app.domain.audit.AuditRecord.
+# Schema changes go through alembic (backend/migrations), not create_all().
+audit_decisions = Table(
+    "audit_decisions",
+    metadata,
+    # BIGINT identity on Postgres; SQLite only auto-increments INTEGER PRIMARY KEY
+    Column("id", BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True),
+    Column("decision_id", String(64), nullable=False, unique=True),
+    Column("correlation_id", String(128), nullable=False),
+    Column("policy_id", String(256), nullable=False),
+    Column("policy_version", String(256), nullable=False),
+    # Request-supplied values, stored whatever their length
+    Column("subject_id", Text, nullable=False),
+    Column("action", Text, nullable=False),
+    Column("resource_type", Text, nullable=False),
+    Column("resource_id", Text, nullable=True),
+    Column("decision", String(16), nullable=False),
+    Column("reason", String(64), nullable=False),
+    Column("matched_rule_ids", JSON, nullable=False),
+    Column("context", JSON, nullable=False),
+    Column("created_at", DateTime(timezone=True), nullable=False),
+    Column("subject_claims", JSON, nullable=True),
+    Column("resource_attrs", JSON, nullable=True),
+    Column("evaluation_mode", String(16), nullable=False, server_default="full"),
+    Index("ix_audit_decisions_correlation_id", "correlation_id"),
+    Index("ix_audit_decisions_subject_id_created_at", "subject_id", "created_at"),
+    Index("ix_audit_decisions_policy_created_at", "policy_id", "policy_version", "created_at"),
+    Index("ix_audit_decisions_created_at", "created_at"),
+)
@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Any, Mapping, Optional, Sequence
+from typing import Any, Mapping, Optional, Sequence, Tuple
 
 
 @dataclass(frozen=True, slots=True)
@@ -23,3 +23,47 @@ class AuditRecord:
     created_at: str  # RFC3339/ISO timestamp (UTC)
 
     correlation_id: str
+
+    # Evaluation inputs not covered above, so a decision can be replayed exactly.
+    # None unless capture is enabled (AUTHZ_AUDIT_CAPTURE_INPUTS=1), and for records
+    # written before these fields existed.
+    subject_claims: Optional[Mapping[str, Any]] = None
+    resource_attrs: Optional[Mapping[str, Any]] = None
+
+    evaluation_mode: str = "full"  # full|short_circuit (short_circuit: deciding rule only)
+
+
+@dataclass(frozen=True, slots=True)
+class AuditAggregate:
+    """
+    Allow decisions identical to an AuditRecord already written, collapsed into
+    one line (AUTHZ_AUDIT_AGGREGATE_WINDOW_S).
+
+    Every AuditRecord field but decision_id, correlation_id and created_at is
+    shared; those three are kept per decision in `occurrences` as
+    [decision_id, correlation_id, microseconds after first_at].
+    """
+    policy_id: str
+    policy_version: str
+
+    subject_id: str
+    action: str
+    resource_type: str
+    resource_id: Optional[str]
+
+    decision: str
+    reason: str
+    matched_rule_ids: Sequence[str]
+
+    context: Mapping[str, Any]
+
+    count: int
+    first_at: str  # created_at of the first and last collapsed decisions
+    last_at: str
+    occurrences: Sequence[Tuple[str, str, int]]
+
+    subject_claims: Optional[Mapping[str, Any]] = None
+    resource_attrs: Optional[Mapping[str, Any]] = None
+
+    evaluation_mode: str = "full"
+    kind: str = "aggregate"
@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+from app.domain.policy import Policy, PolicyRule
+
+
+RuleKey = Tuple[str, str]  # (action, resource_type)
+
+# Predicate namespaces, one per constrained rule field
+SUBJECT = "subject"
+RESOURCE = "resource"
+CONTEXT = "context"
+
+
+@dataclass(frozen=True, slots=True)
+class RuleBucket:
+    """
+    Rules sharing one (action, resource_type), in original policy order.
+
+    Bit i of every mask below refers to rules[i]. Predicates are indexed as:
+    - required: per (namespace, key), the rules that constrain that key
+    - by_value: per (namespace, key, value), the rules that require exactly that value
+
+    A rule survives a key if it does not constrain it, or if the request's value
+    for that key is the one it requires. Matching is therefore one dict probe and
+    two integer ops per distinct key in the bucket, instead of a dict walk per rule.
+
+    Predicate values that cannot be hashed (lists/objects in JSON) cannot be
+    indexed; rules using them are flagged in residual_mask and must be confirmed
+    with a plain subset match.
+    """
+    rules: Tuple[PolicyRule, ...]
+    all_mask: int
+    required: Tuple[Tuple[str, str, int], ...]
+    by_value: Mapping[Tuple[str, str, Any], int]
+    residual_mask: int
+    deny_mask: int  # rules with effect "deny"
+
+    def match_mask(
+        self,
+        subject_claims: Mapping[str, Any],
+        resource_attrs: Mapping[str, Any],
+        context: Mapping[str, Any],
+    ) -> int:
+        mask = self.all_mask
+        by_value = self.by_value
+        for ns, key, requiring in self.required:
+            actual = subject_claims if ns == SUBJECT else resource_attrs if ns == RESOURCE else context
+            satisfied = 0
+            if key in actual:
+                try:
+                    satisfied = by_value.get((ns, key, actual[key]), 0)
+                except TypeError:
+                    # Unhashable request value: it cannot equal any indexed value
+                    satisfied = 0
+            mask &= ~requiring | satisfied
+            if not mask:
+                break
+        return mask
+
+    def subject_context_mask(self, subject_claims: Mapping[str, Any], context: Mapping[str, Any]) -> int:
+        """
+        match_mask() with resource_attrs predicates ignored: the rules that can
+        still match, depending on the resource's attrs alone.
+        """
+        mask = self.all_mask
+        by_value = self.by_value
+        for ns, key, requiring in self.required:
+            if ns == RESOURCE:
+                continue
+            actual = subject_claims if ns == SUBJECT else context
+            satisfied = 0
+            if key in actual:
+                try:
+                    satisfied = by_value.get((ns, key, actual[key]), 0)
+                except TypeError:
+                    satisfied = 0
+            mask &= ~requiring | satisfied
+            if not mask:
+                break
+        return mask
+
+
+@dataclass(frozen=True, slots=True)
+class CompiledPolicy:
+    """
+    Evaluation-ready form of a Policy.
+
+    Rules are bucketed by (action, resource_type), the two exact checks that rule
+    out almost every rule. Each bucket keeps the rules in their original policy
+    order, so evaluation semantics (deny overrides, matched rule ordering) are
+    unchanged.
+
+    type_buckets holds the same rules bucketed by resource_type alone, for
+    questions about every action at once (see evaluator.evaluate_actions).
+
+    id/version/rules mirror Policy so callers can use either interchangeably.
+    """
+    id: str
+    version: str
+    rules: Sequence[PolicyRule]
+    buckets: Mapping[RuleKey, RuleBucket]
+    type_buckets: Mapping[str, RuleBucket]
+
+    def bucket_for(self, action: str, resource_type: str) -> Optional[RuleBucket]:
+        return self.buckets.get((action, resource_type))
+
+    def type_bucket_for(self, resource_type: str) -> Optional[RuleBucket]:
+        return self.type_buckets.get(resource_type)
+
+    def candidates_for(self, action: str, resource_type: str) -> Sequence[PolicyRule]:
+        bucket = self.buckets.get((action, resource_type))
+        return bucket.rules if bucket is not None else ()
+
+
+def compile_policy(policy: Policy) -> CompiledPolicy:
+    grouped: Dict[RuleKey, List[PolicyRule]] = {}
+    by_type: Dict[str, List[PolicyRule]] = {}
+    for rule in policy.rules:
+        if rule.effect not in ("allow", "deny"):
+            # Never matches (see evaluator._matches); leave it out of the index.
+            continue
+        # dict.fromkeys: a rule listing the same action twice is indexed once
+        for action in dict.fromkeys(rule.actions):
+            grouped.setdefault((action, rule.resource_type), []).append(rule)
+        if rule.actions:
+            by_type.setdefault(rule.resource_type, []).append(rule)
+
+    return CompiledPolicy(
+        id=policy.id,
+        version=policy.version,
+        rules=policy.rules,
+        buckets={key: _build_bucket(rules) for key, rules in grouped.items()},
+        type_buckets={key: _build_bucket(rules) for key, rules in by_type.items()},
+    )
+
+
+def _build_bucket(rules: Sequence[PolicyRule]) -> RuleBucket:
+    required: Dict[Tuple[str, str], int] = {}
+    by_value: Dict[Tuple[str, str, Any], int] = {}
+    residual_mask = 0
+    deny_mask = 0
+
+    for i, rule in enumerate(rules):
+        bit = 1 << i
+        if rule.effect == "deny":
+            deny_mask |= bit
+        for ns, predicates in (
+            (SUBJECT, rule.subject_claims),
+            (RESOURCE, rule.resource_attrs),
+            (CONTEXT, rule.context_claims),
+        ):
+            for key, value in (predicates or {}).items():
+                try:
+                    hash(value)
+                except TypeError:
+                    residual_mask |= bit
+                    continue
+                required[(ns, key)] = required.get((ns, key), 0) | bit
+                by_value[(ns, key, value)] = by_value.get((ns, key, value), 0) | bit
+
+    return RuleBucket(
+        rules=tuple(rules),
+        all_mask=(1 << len(rules)) - 1,
+        required=tuple((ns, key, mask) for (ns, key), mask in required.items()),
+        by_value=by_value,
+        residual_mask=residual_mask,
+        deny_mask=deny_mask,
+    )
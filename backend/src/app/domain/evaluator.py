@@ -1,16 +1,26 @@
 from __future__ import annotations
 
-from typing import Any, Iterable, Mapping, Tuple
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Tuple, Union
 
+from app.domain.compiled_policy import CompiledPolicy
 from app.domain.policy import Policy, PolicyRule
-from app.domain.types import AuthorizationDecision, AuthorizationRequest
+from app.domain.types import AuthorizationDecision, AuthorizationRequest, Resource, Subject
 
 
 ALLOW = "allow"
 DENY = "deny"
 
+# Evaluation modes
+FULL = "full"
+SHORT_CIRCUIT = "short_circuit"
+EVALUATION_MODES = (FULL, SHORT_CIRCUIT)
 
-def evaluate(req: AuthorizationRequest, policy: Policy) -> AuthorizationDecision:
+
+def evaluate(
+    req: AuthorizationRequest,
+    policy: Union[Policy, CompiledPolicy],
+    mode: str = FULL,
+) -> AuthorizationDecision:
     """
     Deterministic authorization evaluation.
 
@@ -20,13 +30,156 @@ def evaluate(req: AuthorizationRequest, policy: Policy) -> AuthorizationDecision
     - if any matching DENY rule exists, decision is DENY (deny overrides allow)
     - otherwise, if at least one matching ALLOW rule exists, decision is ALLOW
     - auditability: return matched rule ids (all matches; deterministic order)
+
+    With a CompiledPolicy only the rules indexed under (action, resource.type)
+    are considered and their predicates are resolved through the bucket's
+    bitset index; a plain Policy is scanned rule by rule. Both give the same
+    decision.
+
+    mode=SHORT_CIRCUIT gives the same decision and reason but stops as soon as
+    the outcome is fixed, and matched_rule_ids holds only the deciding rule: the
+    first matching deny, else the first matching allow (policy order).
     """
+    if mode == SHORT_CIRCUIT:
+        return _evaluate_short_circuit(req, policy)
+    if mode != FULL:
+        raise ValueError(f"Unknown evaluation mode: {mode!r}")
+
     matched: list[Tuple[str, str]] = []  # (effect, rule_id)
 
-    for rule in policy.rules:
-        if _matches(rule, req):
-            matched.append((rule.effect, rule.id))
+    if isinstance(policy, CompiledPolicy):
+        bucket = policy.bucket_for(req.action, req.resource.type)
+        if bucket is not None:
+            mask = bucket.match_mask(req.subject.claims, req.resource.attrs or {}, req.context)
+            residual = bucket.residual_mask
+            while mask:
+                low = mask & -mask
+                mask ^= low
+                rule = bucket.rules[low.bit_length() - 1]
+                if low & residual and not _predicates_match(rule, req):
+                    continue
+                matched.append((rule.effect, rule.id))
+    else:
+        for rule in policy.rules:
+            if _matches(rule, req):
+                matched.append((rule.effect, rule.id))
+
+    return _decision(matched)
+
+
+def evaluate_actions(
+    subject: Subject,
+    resource: Resource,
+    context: Mapping[str, Any],
+    policy: Union[Policy, CompiledPolicy],
+) -> Dict[str, AuthorizationDecision]:
+    """
+    What this subject may do to this resource: the FULL-mode decision for every
+    action that a rule matching everything but the action mentions, keyed by
+    action in policy order.
+
+    Rules are checked once for all actions (the predicates do not depend on
+    the action), then split per action, keeping deny-overrides per action. Any
+    action not in the result is denied by default.
+    """
+    req = AuthorizationRequest(subject=subject, action="", resource=resource, context=context)
+    rules: List[PolicyRule] = []
+
+    if isinstance(policy, CompiledPolicy):
+        bucket = policy.type_bucket_for(resource.type)
+        if bucket is not None:
+            mask = bucket.match_mask(subject.claims, resource.attrs or {}, context)
+            residual = bucket.residual_mask
+            while mask:
+                low = mask & -mask
+                mask ^= low
+                rule = bucket.rules[low.bit_length() - 1]
+                if low & residual and not _predicates_match(rule, req):
+                    continue
+                rules.append(rule)
+    else:
+        for rule in policy.rules:
+            if rule.effect in (ALLOW, DENY) and rule.resource_type == resource.type and _predicates_match(rule, req):
+                rules.append(rule)
+
+    matched: Dict[str, List[Tuple[str, str]]] = {}
+    for rule in rules:
+        for action in dict.fromkeys(rule.actions):
+            matched.setdefault(action, []).append((rule.effect, rule.id))
+    return {action: _decision(m) for action, m in matched.items()}
+
+
+def resource_filter(
+    subject: Subject,
+    action: str,
+    resource_type: str,
+    context: Mapping[str, Any],
+    policy: Union[Policy, CompiledPolicy],
+) -> Callable[[Optional[Mapping[str, Any]]], AuthorizationDecision]:
+    """
+    evaluate() (FULL mode) for one subject, action, resource type and context,
+    as a function of the resource's attrs alone, for deciding many resources.
+
+    The subject and context predicates of every candidate rule are checked
+    once, here; each call only checks the resource_attrs predicates of the
+    rules left. Decisions are memoized on the values of the attrs those rules
+    test, so resources that only differ elsewhere are decided once.
+    """
+    candidates: List[PolicyRule] = []
+    if isinstance(policy, CompiledPolicy):
+        bucket = policy.bucket_for(action, resource_type)
+        if bucket is not None:
+            mask = bucket.subject_context_mask(subject.claims, context)
+            while mask:
+                low = mask & -mask
+                mask ^= low
+                rule = bucket.rules[low.bit_length() - 1]
+                # Unhashable predicate values are not in the index
+                if low & bucket.residual_mask and not _subject_context_match(rule, subject, context):
+                    continue
+                candidates.append(rule)
+    else:
+        for rule in policy.rules:
+            if (
+                rule.effect in (ALLOW, DENY)
+                and action in rule.actions
+                and rule.resource_type == resource_type
+                and _subject_context_match(rule, subject, context)
+            ):
+                candidates.append(rule)
+
+    unconditional = [(r.effect, r.id) for r in candidates if not r.resource_attrs]
+    if len(unconditional) == len(candidates):
+        decision = _decision(unconditional)
+        return lambda attrs: decision
 
+    keys = tuple(dict.fromkeys(k for r in candidates for k in (r.resource_attrs or {})))
+    memo: Dict[Tuple[Any, ...], AuthorizationDecision] = {}
+
+    def decide(attrs: Optional[Mapping[str, Any]]) -> AuthorizationDecision:
+        attrs = attrs or {}
+        memo_key = tuple(attrs.get(k, _ABSENT) for k in keys)
+        try:
+            return memo[memo_key]
+        except KeyError:
+            pass
+        except TypeError:  # unhashable attr value: decide without memoizing
+            memo_key = None
+        matched = [(r.effect, r.id) for r in candidates if not r.resource_attrs or _subset_match(r.resource_attrs, attrs)]
+        decision = _decision(matched)
+        if memo_key is not None:
+            memo[memo_key] = decision
+        return decision
+
+    return decide
+
+
+# Stands for a missing attr in resource_filter() memo keys (None is a valid value)
+_ABSENT = object()
+
+
+def _decision(matched: List[Tuple[str, str]]) -> AuthorizationDecision:
+    # FULL-mode outcome of the matching rules, as (effect, rule_id) in policy order
     matched_rule_ids = [rid for _, rid in matched]
 
     # Explicit deny wins
@@ -39,6 +192,43 @@ def evaluate(req: AuthorizationRequest, policy: Policy) -> AuthorizationDecision
     return AuthorizationDecision(decision=DENY, reason="deny_by_default", matched_rule_ids=[])
 
 
+def _evaluate_short_circuit(req: AuthorizationRequest, policy: Union[Policy, CompiledPolicy]) -> AuthorizationDecision:
+    first_allow = None
+
+    if isinstance(policy, CompiledPolicy):
+        bucket = policy.bucket_for(req.action, req.resource.type)
+        if bucket is None:
+            return AuthorizationDecision(decision=DENY, reason="deny_by_default", matched_rule_ids=[])
+        mask = bucket.match_mask(req.subject.claims, req.resource.attrs or {}, req.context)
+        residual = bucket.residual_mask
+        # Deny candidates first: any one of them settles the outcome
+        for candidates in (mask & bucket.deny_mask, mask & ~bucket.deny_mask):
+            while candidates:
+                low = candidates & -candidates
+                candidates ^= low
+                rule = bucket.rules[low.bit_length() - 1]
+                if low & residual and not _predicates_match(rule, req):
+                    continue
+                if rule.effect == DENY:
+                    return AuthorizationDecision(decision=DENY, reason="explicit_deny", matched_rule_ids=[rule.id])
+                first_allow = rule
+                break
+            if first_allow is not None:
+                break
+    else:
+        for rule in policy.rules:
+            if rule.effect == ALLOW and first_allow is not None:
+                continue  # cannot change the outcome; only a deny can
+            if _matches(rule, req):
+                if rule.effect == DENY:
+                    return AuthorizationDecision(decision=DENY, reason="explicit_deny", matched_rule_ids=[rule.id])
+                first_allow = rule
+
+    if first_allow is not None:
+        return AuthorizationDecision(decision=ALLOW, reason="matched_allow", matched_rule_ids=[first_allow.id])
+    return AuthorizationDecision(decision=DENY, reason="deny_by_default", matched_rule_ids=[])
+
+
 def _matches(rule: PolicyRule, req: AuthorizationRequest) -> bool:
     if rule.effect not in (ALLOW, DENY):
         return False
@@ -49,6 +239,10 @@ def _matches(rule: PolicyRule, req: AuthorizationRequest) -> bool:
     if req.resource.type != rule.resource_type:
         return False
 
+    return _predicates_match(rule, req)
+
+
+def _predicates_match(rule: PolicyRule, req: AuthorizationRequest) -> bool:
     if rule.subject_claims and not _subset_match(rule.subject_claims, req.subject.claims):
         return False
 
@@ -63,6 +257,14 @@ def _matches(rule: PolicyRule, req: AuthorizationRequest) -> bool:
     return True
 
 
+def _subject_context_match(rule: PolicyRule, subject: Subject, context: Mapping[str, Any]) -> bool:
+    if rule.subject_claims and not _subset_match(rule.subject_claims, subject.claims):
+        return False
+    if rule.context_claims and not _subset_match(rule.context_claims, context):
+        return False
+    return True
+
+
 def _subset_match(expected: Mapping[str, Any], actual: Mapping[str, Any]) -> bool:
     """
     True if all (k,v) in expected are present in actual with equality.
@@ -1,9 +1,49 @@
+import logging
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 
+from app.api.admin import router as admin_router
+from app.api.audit import router as audit_router
 from app.api.authorize import router as authorize_router
+from app.api.metrics import router as metrics_router
 from app.api.middleware import CorrelationIdMiddleware
+from app.services.audit_sink import shutdown_audit_sink
+from app.services.policy_provider import (
+    PolicyProviderError,
+    get_policy_provider,
+    shutdown_policy_provider,
+)
+from app.services.policy_registry import get_policy_registry, shutdown_policy_registry
+from app.services.rule_profile import shutdown_rule_profiler
+from app.settings import reload_settings
+
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Env is read here, once; request handlers only look up what was resolved
+    reload_settings()
+    # Load the active policy (or, with a policy registry, the pinned policies)
+    # once at startup so the first request does not pay for it. A failure here is
+    # not fatal: requests report policy_unavailable and the background reload
+    # keeps retrying.
+    try:
+        if get_policy_registry() is None:
+            get_policy_provider().snapshot()
+    except PolicyProviderError as e:
+        logger.warning("Active policy not loaded at startup: %s", e)
+    yield
+    shutdown_policy_provider()
+    shutdown_policy_registry()
+    # Drains buffered audit records before the process exits
+    shutdown_audit_sink()
+    # Writes the rule profile to AUTHZ_RULE_PROFILE_PATH, if configured
+    shutdown_rule_profiler()
+
 
-app = FastAPI(title="AuthZ Service", version="0.1.0")
+app = FastAPI(title="AuthZ Service", version="0.1.0", lifespan=lifespan)
 app.add_middleware(CorrelationIdMiddleware)
 
 @app.get("/healthz")
@@ -11,3 +51,6 @@ def healthz() -> dict:
     return {"ok": True}
 
 app.include_router(authorize_router)
+app.include_router(audit_router)
+app.include_router(admin_router)
+app.include_router(metrics_router)
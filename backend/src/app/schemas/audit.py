@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel
+
+
+class AuditRecordOut(BaseModel):
+    """Same shape as the JSONL lines written for app.domain.audit.AuditRecord."""
+    decision_id: str
+    policy_id: str
+    policy_version: str
+
+    subject_id: str
+    action: str
+    resource_type: str
+    resource_id: Optional[str] = None
+
+    decision: str  # allow|deny
+    reason: str
+    matched_rule_ids: List[str]
+
+    context: Dict[str, Any]
+    created_at: str
+
+    correlation_id: str
+
+    subject_claims: Optional[Dict[str, Any]] = None
+    resource_attrs: Optional[Dict[str, Any]] = None
+
+    evaluation_mode: str = "full"
+
+
+class AuditRecordPage(BaseModel):
+    items: List[AuditRecordOut]
+    next_cursor: Optional[str] = None
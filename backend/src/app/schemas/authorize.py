@@ -1,10 +1,13 @@
 from __future__ import annotations
 
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Literal, Optional
 
 from pydantic import BaseModel, ConfigDict, Field
 
 
+EvaluationMode = Literal["full", "short_circuit"]
+
+
 class SubjectIn(BaseModel):
     model_config = ConfigDict(extra="forbid")
     id: str
@@ -24,6 +27,13 @@ class AuthorizeRequest(BaseModel):
     action: str
     resource: ResourceIn
     context: Dict[str, Any] = Field(default_factory=dict)
+    # full: every matching rule is reported (default, unless AUTHZ_EVALUATION_MODE
+    # says otherwise); short_circuit: stop once the outcome is fixed and report
+    # only the deciding rule.
+    evaluation_mode: Optional[EvaluationMode] = None
+    # Policy to evaluate against; overrides the X-Policy-Id header. Unset uses
+    # the default policy (AUTHZ_DEFAULT_POLICY_ID, or the single active policy).
+    policy_id: Optional[str] = None
 
 
 class AuthorizeResponse(BaseModel):
@@ -33,3 +43,88 @@ class AuthorizeResponse(BaseModel):
     policy_id: str
     policy_version: str
     matched_rule_ids: list[str]
+    evaluation_mode: EvaluationMode
+
+
+class AuthorizeActionsRequest(BaseModel):
+    """An AuthorizeRequest without the action: every action is evaluated."""
+    model_config = ConfigDict(extra="forbid")
+    subject: SubjectIn
+    resource: ResourceIn
+    context: Dict[str, Any] = Field(default_factory=dict)
+    policy_id: Optional[str] = None
+
+
+class AllowedAction(BaseModel):
+    action: str
+    matched_rule_ids: List[str]
+
+
+class AuthorizeActionsResponse(BaseModel):
+    policy_id: str
+    policy_version: str
+    actions: List[AllowedAction]  # allowed actions only, in policy order
+
+
+# Upper bound on resources per filter call; larger lists should page.
+MAX_FILTER_RESOURCES = 10_000
+
+
+class FilterResourceIn(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+    id: str
+    attrs: Dict[str, Any] = Field(default_factory=dict)
+
+
+class AuthorizeFilterRequest(BaseModel):
+    """One subject, action and context against many resources of one type."""
+    model_config = ConfigDict(extra="forbid")
+    subject: SubjectIn
+    action: str
+    resource_type: str
+    resources: List[FilterResourceIn] = Field(max_length=MAX_FILTER_RESOURCES)
+    context: Dict[str, Any] = Field(default_factory=dict)
+    policy_id: Optional[str] = None
+
+
+class AuthorizeFilterResponse(BaseModel):
+    policy_id: str
+    policy_version: str
+    allowed: List[str]  # ids of the allowed resources, in input order
+
+
+# Upper bound on items per batch call; larger jobs should page.
+MAX_BATCH_ITEMS = 1000
+
+
+class AuthorizeBatchRequest(BaseModel):
+    """
+    Items are AuthorizeRequest objects. They are validated one by one by the
+    route so a malformed item yields a per-item error, not a failed batch.
+    """
+    model_config = ConfigDict(extra="forbid")
+    items: List[Any] = Field(min_length=1, max_length=MAX_BATCH_ITEMS)
+
+
+class BatchItemError(BaseModel):
+    code: str
+    message: str
+    details: Optional[Dict[str, Any]] = None
+
+
+class AuthorizeBatchItem(BaseModel):
+    index: int
+    result: Optional[AuthorizeResponse] = None
+    error: Optional[BatchItemError] = None
+
+
+class AuthorizeBatchResponse(BaseModel):
+    results: List[AuthorizeBatchItem]
+
+
+# /v1/authorize:stream: input lines longer than this get a per-line error
+MAX_STREAM_LINE_BYTES = 64 * 1024
+# Decisions evaluated, audited and sent together (bounds per-stream memory)
+STREAM_GROUP_SIZE = 512
+
+StreamAuditMode = Literal["none", "bulk"]
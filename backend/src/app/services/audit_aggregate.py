@@ -0,0 +1,321 @@
+from __future__ import annotations
+
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from app.domain.audit import AuditAggregate, AuditRecord
+from app.services.audit_sink import AuditSink, AuditSinkError
+from app.services.metrics import AUDIT_AGGREGATED_TOTAL
+
+
+logger = logging.getLogger(__name__)
+
+AGGREGATE_KIND = "aggregate"
+
+# Keys of an aggregate line that are not AuditRecord fields
+_AGGREGATE_ONLY = frozenset(("kind", "count", "first_at", "last_at", "occurrences"))
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_ONE_US = timedelta(microseconds=1)
+
+
+class _Window:
+    __slots__ = ("deadline", "opener", "template", "first_us", "last_us", "first_at", "last_at", "occurrences")
+
+    def __init__(self, deadline: float, opener: str) -> None:
+        self.deadline = deadline
+        self.opener = opener  # decision_id of the record written verbatim
+        self.template: Optional[AuditRecord] = None
+        self.first_us = self.last_us = 0
+        self.first_at = self.last_at = ""
+        self.occurrences: List[Tuple[str, str, int]] = []
+
+    def add(self, record: AuditRecord, us: int) -> None:
+        if self.template is None:
+            self.template = record
+            self.first_us, self.first_at = us, record.created_at
+        if us >= self.last_us:
+            self.last_us, self.last_at = us, record.created_at
+        self.occurrences.append((record.decision_id, record.correlation_id, us - self.first_us))
+
+    def aggregate(self) -> AuditAggregate:
+        r = self.template
+        return AuditAggregate(
+            policy_id=r.policy_id,
+            policy_version=r.policy_version,
+            subject_id=r.subject_id,
+            action=r.action,
+            resource_type=r.resource_type,
+            resource_id=r.resource_id,
+            decision=r.decision,
+            reason=r.reason,
+            matched_rule_ids=r.matched_rule_ids,
+            context=r.context,
+            count=len(self.occurrences),
+            first_at=self.first_at,
+            last_at=self.last_at,
+            occurrences=self.occurrences,
+            subject_claims=r.subject_claims,
+            resource_attrs=r.resource_attrs,
+            evaluation_mode=r.evaluation_mode,
+        )
+
+
+class AggregatingAuditSink:
+    """
+    Audit sink that collapses repeated identical allow decisions.
+
+    Design notes:
+    - Two records are identical when every field but decision_id,
+      correlation_id and created_at is equal (claims, attrs and context
+      included, so replay stays exact).
+    - Denies, and the first allow of each window, go to the inner sink as
+      usual. Identical allows within window_s of that first one are only kept
+      in memory; when the window ends they are written as one AuditAggregate
+      holding each decision's id, correlation id and timestamp, so every
+      decision stays traceable (the readers expand aggregates back into
+      records).
+    - At most max_keys windows are open; opening one more ends the oldest
+      early. An aggregate is also written once it holds max_occurrences.
+    - Aggregates are written by a background thread. A failed write is kept
+      and retried after retry_s.
+    - At most max_pending collapsed decisions are held in memory. Past that,
+      and while a failed aggregate write awaits its retry, records are not
+      collapsed: they go to the inner sink as is, so a storage outage fails
+      them visibly instead of piling decisions up in memory.
+    - Collapsed decisions not yet written are lost if the process dies (at most
+      max_pending); close() writes them.
+    """
+
+    def __init__(
+        self,
+        inner: AuditSink,
+        *,
+        window_s: float = 10.0,
+        max_keys: int = 10_000,
+        max_occurrences: int = 10_000,
+        max_pending: int = 100_000,
+        retry_s: float = 1.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if window_s <= 0:
+            raise ValueError("window_s must be positive")
+        self.inner = inner
+        self.window_s = window_s
+        self.max_keys = max(max_keys, 1)
+        self.max_occurrences = max(max_occurrences, 1)
+        self.max_pending = max(max_pending, 1)
+        self.retry_s = retry_s
+        self._clock = clock
+
+        # Opened in order, and all windows are the same length, so the first
+        # one always ends first.
+        self._windows: "OrderedDict[str, _Window]" = OrderedDict()
+        self._ready: List[_Window] = []  # ended early, or failed to write
+        self._retry_at = 0.0
+        self._retrying = False  # an aggregate write failed and is not retried yet
+        self._pending = 0
+        self._cond = threading.Condition()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="authz-audit-aggregator", daemon=True)
+        self._thread.start()
+
+    def write(self, record: AuditRecord) -> None:
+        self._raise_if_closed()
+        if not self._absorb(record):
+            self.inner.write(record)
+
+    def write_nowait(self, record: AuditRecord) -> bool:
+        self._raise_if_closed()
+        return self._absorb(record) or self.inner.write_nowait(record)
+
+    def write_many(self, records: Sequence[AuditRecord]) -> None:
+        self._raise_if_closed()
+        verbatim = [r for r in records if not self._absorb(r)]
+        if verbatim:
+            self.inner.write_many(verbatim)
+
+    def pending(self) -> int:
+        """Collapsed decisions not written yet."""
+        with self._cond:
+            return self._pending
+
+    def close(self) -> None:
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify()
+        self._thread.join(timeout=10)
+        self.inner.close()
+
+    # ----------------------------
+    # Internals
+    # ----------------------------
+
+    def _raise_if_closed(self) -> None:
+        if self._closed:
+            raise AuditSinkError("Audit sink is closed")
+
+    def _absorb(self, record: AuditRecord) -> bool:
+        """True if the record was collapsed; False if it must be written as is."""
+        if record.decision != "allow":
+            return False
+        us = _timestamp_us(record.created_at)
+        if us is None or _timestamp_iso(us) != record.created_at:
+            return False  # expansion could not reproduce created_at
+        key = _key(record)
+
+        with self._cond:
+            now = self._clock()
+            window = self._windows.get(key)
+            if window is not None and window.opener == record.decision_id:
+                return False  # write() after write_nowait() declined the opener
+            if window is None or now >= window.deadline:
+                if window is not None:
+                    del self._windows[key]
+                    self._end(window)
+                self._windows[key] = _Window(now + self.window_s, record.decision_id)
+                if len(self._windows) > self.max_keys:
+                    self._end(self._windows.popitem(last=False)[1])
+                if len(self._windows) == 1:
+                    self._cond.notify()  # the writer sleeps until a window exists
+                return False  # first occurrence: written verbatim
+
+            if self._retrying or self._pending >= self.max_pending:
+                return False
+            window.add(record, us)
+            self._pending += 1
+            if len(window.occurrences) >= self.max_occurrences:
+                del self._windows[key]
+                self._end(window)
+            return True
+
+    def _end(self, window: _Window) -> None:
+        # Caller holds self._cond
+        if window.occurrences:
+            self._ready.append(window)
+            self._cond.notify()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while True:
+                    now = self._clock()
+                    while self._windows:
+                        window = next(iter(self._windows.values()))
+                        if not self._closed and window.deadline > now:
+                            break
+                        self._windows.popitem(last=False)
+                        if window.occurrences:
+                            self._ready.append(window)
+                    if self._closed or (self._ready and now >= self._retry_at):
+                        break
+                    deadlines = [next(iter(self._windows.values())).deadline] if self._windows else []
+                    if self._ready:
+                        deadlines.append(self._retry_at)
+                    self._cond.wait(min(deadlines) - now if deadlines else None)
+                due, self._ready = self._ready, []
+                closing = self._closed
+            if due and not self._write(due):
+                if closing:
+                    self._write(due, final=True)  # one more try before giving up
+                    self._written(due)
+                else:
+                    with self._cond:
+                        self._ready[:0] = due  # keep write order
+                        self._retry_at = self._clock() + self.retry_s
+                        self._retrying = True
+            elif due:
+                self._written(due)
+            if closing:
+                return
+
+    def _written(self, due: List[_Window]) -> None:
+        # Written, or given up on at close: no longer pending
+        with self._cond:
+            self._pending -= sum(len(w.occurrences) for w in due)
+            self._retrying = False
+
+    def _write(self, due: List[_Window], *, final: bool = False) -> bool:
+        aggregates = [w.aggregate() for w in due]
+        count = sum(a.count for a in aggregates)
+        try:
+            self.inner.write_many(aggregates)
+        except Exception:
+            if final:
+                logger.exception("Audit aggregate write failed; %d decision(s) not written", count)
+            else:
+                logger.exception("Audit aggregate write failed; %d decision(s) kept for retry", count)
+            return False
+        AUDIT_AGGREGATED_TOTAL.inc(count)
+        return True
+
+
+def is_aggregate(obj: Dict[str, Any]) -> bool:
+    return obj.get("kind") == AGGREGATE_KIND
+
+
+def expand_aggregate(obj: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    The records an aggregate line stands for, as the JSONL lines they would
+    have been written as; any other record is returned as is.
+    """
+    if not is_aggregate(obj):
+        return [obj]
+    first_us = _timestamp_us(obj["first_at"])
+    if first_us is None:
+        raise ValueError(f"Invalid first_at in audit aggregate: {obj['first_at']!r}")
+    shared = {k: v for k, v in obj.items() if k not in _AGGREGATE_ONLY}
+    return [
+        {
+            **shared,
+            "decision_id": decision_id,
+            "correlation_id": correlation_id,
+            "created_at": _timestamp_iso(first_us + offset_us),
+        }
+        for decision_id, correlation_id, offset_us in obj["occurrences"]
+    ]
+
+
+def _key(record: AuditRecord) -> str:
+    return json.dumps(
+        [
+            record.policy_id,
+            record.policy_version,
+            record.subject_id,
+            record.action,
+            record.resource_type,
+            record.resource_id,
+            record.reason,
+            record.matched_rule_ids,
+            record.context,
+            record.subject_claims,
+            record.resource_attrs,
+            record.evaluation_mode,
+        ],
+        separators=(",", ":"),
+        sort_keys=True,
+    )
+
+
+# Exact microsecond arithmetic (datetime.timestamp() goes through a float), in
+# the format utc_now_iso() writes.
+
+def _timestamp_us(value: str) -> Optional[int]:
+    try:
+        dt = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if dt.tzinfo is None:
+        return None
+    return (dt - _EPOCH) // _ONE_US
+
+
+def _timestamp_iso(us: int) -> str:
+    return (_EPOCH + timedelta(microseconds=us)).isoformat().replace("+00:00", "Z")
@@ -0,0 +1,385 @@
+from __future__ import annotations
+
+import base64
+import binascii
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+from app.services.audit_segments import (
+    Position,
+    Segment,
+    SegmentIndex,
+    epoch_us,
+    index_plain_file,
+    list_segments,
+    segment_matches,
+)
+from app.settings import resolved_once
+
+
+logger = logging.getLogger(__name__)
+
+
+class AuditQueryError(RuntimeError):
+    pass
+
+
+# Fields a listing can be driven by, most selective first
+QUERY_KEYS = ("correlation_id", "subject_id", "policy_version")
+
+
+@dataclass(frozen=True, slots=True)
+class AuditQuery:
+    correlation_id: Optional[str] = None
+    subject_id: Optional[str] = None
+    policy_version: Optional[str] = None
+    since: Optional[str] = None  # ISO timestamp, inclusive
+    until: Optional[str] = None  # ISO timestamp, exclusive
+    limit: int = 100
+    cursor: Optional[str] = None
+
+
+@dataclass(frozen=True, slots=True)
+class AuditPage:
+    items: List[Dict[str, Any]]
+    next_cursor: Optional[str]
+
+
+class AuditStore:
+    """
+    Read side of the JSONL audit trail (segmented directory or single file).
+
+    Design notes:
+    - Lookups go through memory-mapped sidecar indexes: a binary search per
+      segment, then only the blocks holding hits are read. The log itself is
+      never loaded into memory.
+    - Segments without an index yet (the active one) are scanned; for a single
+      growing audit.jsonl only the bytes appended since the index was built are
+      scanned. Once that tail exceeds reindex_bytes the index is rebuilt by a
+      background thread; queries keep using the old one meanwhile.
+    - Results are returned in write order; an aggregate line yields the
+      records it stands for. A cursor holds the position of the last record
+      returned, so the next page starts with one index search (or a seek),
+      whatever the page number. If the segment was compressed since, the
+      cursor falls back to the last decision_id returned.
+    - A segment sealed (or removed) between listing and reading is not an
+      error: the segments are listed again and reading resumes at it.
+    - At most max_open_indexes indexes stay mapped (least recently used first
+      out), and those of segments no longer listed are dropped. An index is
+      only unmapped once no query holds it.
+    """
+
+    def __init__(
+        self, path: Path, *, reindex_bytes: int = 16 * 1024 * 1024, max_open_indexes: int = 64
+    ) -> None:
+        self.path = path
+        self.reindex_bytes = reindex_bytes
+        self.max_open_indexes = max(max_open_indexes, 1)
+        self._lock = threading.Lock()
+        self._indexes: "OrderedDict[Path, _OpenIndex]" = OrderedDict()
+        self._indexer: Optional[threading.Thread] = None
+
+    def get(self, decision_id: str) -> Optional[Dict[str, Any]]:
+        held: List[_OpenIndex] = []
+        try:
+            segments = self._segments(held)[::-1]
+            retried: Set[int] = set()
+            i = 0
+            while i < len(segments):
+                segment = segments[i]
+                i += 1
+                try:
+                    for _, obj in self._matches(segment, "decision_id", decision_id, held):
+                        return obj
+                except FileNotFoundError:
+                    # Sealed or removed since listed: list again, resume here
+                    if segment.seq in retried:
+                        raise
+                    retried.add(segment.seq)
+                    segments = [s for s in self._segments(held)[::-1] if s.seq <= segment.seq]
+                    i = 0
+            return None
+        finally:
+            self._release(held)
+
+    def query(self, q: AuditQuery) -> AuditPage:
+        key = next((k for k in QUERY_KEYS if getattr(q, k) is not None), None)
+        if key is None:
+            raise AuditQueryError(f"At least one of {', '.join(QUERY_KEYS)} is required")
+        if q.limit < 1:
+            raise AuditQueryError("limit must be positive")
+
+        since_us = _parse_bound(q.since, "since")
+        until_us = _parse_bound(q.until, "until")
+        after = _decode_cursor(q.cursor) if q.cursor else None
+        filters = [(k, getattr(q, k)) for k in QUERY_KEYS if k != key and getattr(q, k) is not None]
+
+        held: List[_OpenIndex] = []
+        try:
+            return self._query(q, key, after, filters, since_us, until_us, held)
+        finally:
+            self._release(held)
+
+    def wait_for_index(self, timeout: Optional[float] = None) -> None:
+        """Wait for a background index rebuild, if one is running."""
+        indexer = self._indexer
+        if indexer is not None:
+            indexer.join(timeout)
+
+    def close(self) -> None:
+        self.wait_for_index()
+        with self._lock:
+            for entry in self._indexes.values():
+                entry.index.close()
+            self._indexes.clear()
+
+    # ----------------------------
+    # Internals
+    # ----------------------------
+
+    def _query(
+        self,
+        q: AuditQuery,
+        key: str,
+        after: Optional[_Cursor],
+        filters: List[Tuple[str, str]],
+        since_us: Optional[int],
+        until_us: Optional[int],
+        held: List[_OpenIndex],
+    ) -> AuditPage:
+        items: List[Dict[str, Any]] = []
+        last: Optional[_Cursor] = None
+        segments = self._segments(held)
+        retried: Set[int] = set()
+        i = 0
+        while i < len(segments):
+            segment = segments[i]
+            i += 1
+            if after is not None and segment.seq < after.seq:
+                continue
+            try:
+                index = self._index(segment, held)
+                if index is not None and segment.sealed and index.first_us and not _overlaps(index, since_us, until_us):
+                    continue
+
+                resume = after if after is not None and segment.seq == after.seq else None
+                position = resume.position if resume is not None and resume.compressed == segment.compressed else None
+                skipping = resume is not None and position is None  # compressed since: find the decision_id
+                for at, obj in self._matches(segment, key, getattr(q, key), held, after=position):
+                    if skipping:
+                        if obj.get("decision_id") == resume.decision_id:
+                            skipping = False
+                        continue
+                    if any(obj.get(k) != v for k, v in filters):
+                        continue
+                    if since_us is not None or until_us is not None:
+                        ts = epoch_us(obj.get("created_at"))
+                        if ts is None or (since_us is not None and ts < since_us) or (until_us is not None and ts >= until_us):
+                            continue
+                    if len(items) == q.limit:
+                        return AuditPage(items=items, next_cursor=_encode_cursor(last))
+                    items.append(obj)
+                    last = _Cursor(segment.seq, segment.compressed, at, obj["decision_id"])
+            except FileNotFoundError:
+                # Sealed (replaced by its .gz) or removed since it was listed:
+                # list again and resume at this segment, after the last record
+                # returned, as a cursor would.
+                if segment.seq in retried:
+                    raise
+                retried.add(segment.seq)
+                after = last or after
+                segments = [s for s in self._segments(held) if s.seq >= segment.seq]
+                i = 0
+
+        return AuditPage(items=items, next_cursor=None)
+
+    def _segments(self, held: List[_OpenIndex]) -> List[Segment]:
+        if self.path.is_dir():
+            segments = list_segments(self.path)
+            self._forget_except({s.index_path for s in segments if s.index_path is not None})
+            return segments
+        if not self.path.exists():
+            return []
+        # A single JSONL file behaves like one open-ended (never sealed) segment
+        # whose index is refreshed as the file grows; see _index().
+        self._refresh_plain_index(self._plain_index_path(), held)
+        return [Segment(seq=0, data_path=self.path, index_path=None)]
+
+    def _plain_index_path(self) -> Path:
+        return self.path.with_name(self.path.name + ".idx")
+
+    def _refresh_plain_index(self, index_path: Path, held: List[_OpenIndex]) -> None:
+        size = self.path.stat().st_size
+        index = self._open_index(index_path, held) if index_path.exists() else None
+        covered = index.data_bytes if index is not None else 0
+        if index is None or covered > size or size - covered > self.reindex_bytes:
+            # Missing, truncated/replaced, or the unindexed tail grew too large
+            self._reindex_in_background(index_path)
+
+    def _reindex_in_background(self, index_path: Path) -> None:
+        with self._lock:
+            if self._indexer is not None and self._indexer.is_alive():
+                return
+            self._indexer = threading.Thread(
+                target=self._reindex, args=(index_path,), name="authz-audit-indexer", daemon=True
+            )
+            self._indexer.start()
+
+    def _reindex(self, index_path: Path) -> None:
+        try:
+            index_plain_file(self.path, index_path)  # replaces the old index atomically
+        except OSError:
+            logger.exception("Failed to index %s; queries keep scanning it", self.path)
+
+    def _index(self, segment: Segment, held: List[_OpenIndex]) -> Optional[SegmentIndex]:
+        if segment.index_path is not None:
+            return self._open_index(segment.index_path, held)
+        if segment.data_path == self.path:
+            index_path = self._plain_index_path()
+            if not index_path.exists():
+                return None
+            index = self._open_index(index_path, held)
+            # Built for a file since truncated or replaced: scan until rebuilt
+            return index if index.data_bytes <= self.path.stat().st_size else None
+        return None
+
+    def _open_index(self, index_path: Path, held: List[_OpenIndex]) -> SegmentIndex:
+        """The index at index_path, held (not unmapped) until _release(held)."""
+        st = index_path.stat()
+        stamp = (st.st_mtime_ns, st.st_size)
+        with self._lock:
+            entry = self._indexes.get(index_path)
+            if entry is None or entry.stamp != stamp:
+                if entry is not None:
+                    self._retire(entry)  # replaced on disk
+                entry = self._indexes[index_path] = _OpenIndex(stamp, SegmentIndex(index_path))
+                while len(self._indexes) > self.max_open_indexes:
+                    self._retire(self._indexes.popitem(last=False)[1])
+            else:
+                self._indexes.move_to_end(index_path)
+            entry.holders += 1
+            held.append(entry)
+            return entry.index
+
+    def _release(self, held: List[_OpenIndex]) -> None:
+        with self._lock:
+            for entry in held:
+                entry.holders -= 1
+                if entry.retired and not entry.holders:
+                    entry.index.close()
+        held.clear()
+
+    def _forget_except(self, index_paths: Set[Path]) -> None:
+        # Indexes of segments that are gone (retention, or a crashed one resealed)
+        with self._lock:
+            for path in [p for p in self._indexes if p not in index_paths]:
+                self._retire(self._indexes.pop(path))
+
+    def _retire(self, entry: _OpenIndex) -> None:
+        # Caller holds self._lock and has removed entry from self._indexes
+        entry.retired = True
+        if not entry.holders:
+            entry.index.close()
+
+    def _matches(
+        self,
+        segment: Segment,
+        field: str,
+        value: str,
+        held: List[_OpenIndex],
+        *,
+        after: Optional[Position] = None,
+    ) -> Iterator[Tuple[Position, Dict[str, Any]]]:
+        """Records of one segment with obj[field] == value, in write order."""
+        return segment_matches(segment, self._index(segment, held), field, value, after=after)
+
+
+class _OpenIndex:
+    """A mapped index and the number of queries holding it."""
+
+    __slots__ = ("stamp", "index", "holders", "retired")
+
+    def __init__(self, stamp: Tuple[int, int], index: SegmentIndex) -> None:
+        self.stamp = stamp
+        self.index = index
+        self.holders = 0
+        self.retired = False  # out of the cache: unmapped when holders reaches 0
+
+
+def _overlaps(index: SegmentIndex, since_us: Optional[int], until_us: Optional[int]) -> bool:
+    if since_us is not None and index.last_us < since_us:
+        return False
+    if until_us is not None and index.first_us >= until_us:
+        return False
+    return True
+
+
+def _parse_bound(value: Optional[str], name: str) -> Optional[int]:
+    if value is None:
+        return None
+    ts = epoch_us(value)
+    if ts is None:
+        raise AuditQueryError(f"{name} must be an ISO-8601 timestamp")
+    return ts
+
+
+@dataclass(frozen=True, slots=True)
+class _Cursor:
+    seq: int
+    compressed: bool  # positions change when a segment is compressed
+    position: Position
+    decision_id: str
+
+
+def _encode_cursor(cursor: _Cursor) -> str:
+    obj = {"s": cursor.seq, "z": int(cursor.compressed), "p": list(cursor.position), "d": cursor.decision_id}
+    raw = json.dumps(obj, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> _Cursor:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        obj = json.loads(raw)
+        block_offset, line_offset, n = (int(x) for x in obj["p"])
+        return _Cursor(int(obj["s"]), bool(obj["z"]), (block_offset, line_offset, n), str(obj["d"]))
+    except (binascii.Error, ValueError, KeyError, TypeError) as e:
+        raise AuditQueryError("Invalid cursor") from e
+
+
+_store: Optional[AuditStore] = None
+_store_settings: Optional[Path] = None
+_store_lock = threading.Lock()
+
+
+def get_audit_store() -> Optional[AuditStore]:
+    """
+    Process-wide reader for the configured JSONL audit storage, or None when
+    auditing is disabled or stored elsewhere (AUTHZ_AUDIT_BACKEND=sql).
+    """
+    global _store, _store_settings
+    path = _settings_from_env()
+    if path is _store_settings:
+        return _store
+    with _store_lock:
+        if path != _store_settings:
+            if _store is not None:
+                _store.close()
+            _store = AuditStore(path) if path is not None else None
+        _store_settings = path
+        return _store
+
+
+@resolved_once
+def _settings_from_env() -> Optional[Path]:
+    path = os.getenv("AUTHZ_AUDIT_PATH", "").strip()
+    backend = os.getenv("AUTHZ_AUDIT_BACKEND", "jsonl").strip()
+    if not path or backend not in ("jsonl", "segments"):
+        return None
+    return Path(path)
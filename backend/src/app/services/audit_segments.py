@@ -0,0 +1,478 @@
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import logging
+import mmap
+import os
+import queue
+import re
+import struct
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import IO, Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from app.domain.audit import AuditRecord
+from app.services.audit_aggregate import expand_aggregate
+from app.services.audit_sink import encode_record
+
+
+logger = logging.getLogger(__name__)
+
+# Fields resolvable through the sidecar index of a sealed segment
+INDEXED_FIELDS = ("correlation_id", "decision_id", "subject_id", "policy_version")
+
+# Sidecar index layout (little endian):
+#   header: magic, entry count, first/last created_at (epoch microseconds),
+#           bytes of (uncompressed) data covered
+#   entries: key hash, block offset in the data file, byte offset of the line
+#            within the (decompressed) block; sorted by (hash, block, offset)
+INDEX_MAGIC = b"AZAIDX02"
+_HEADER = struct.Struct("<8sQqqQ")
+_ENTRY = struct.Struct("<QQI")
+
+_SEGMENT_RE = re.compile(r"^audit-(\d{8})\.jsonl(\.gz)?$")
+
+
+@dataclass(frozen=True, slots=True)
+class Segment:
+    seq: int
+    data_path: Path
+    index_path: Optional[Path]  # None until the segment is sealed
+
+    @property
+    def sealed(self) -> bool:
+        return self.index_path is not None
+
+    @property
+    def compressed(self) -> bool:
+        return self.data_path.suffix == ".gz"
+
+
+def key_hash(field: str, value: str) -> int:
+    digest = hashlib.blake2b(f"{field}\x00{value}".encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+def list_segments(directory: Path) -> List[Segment]:
+    """Segments in write order. A sealed segment prefers its compressed data file."""
+    found: Dict[int, Dict[str, Path]] = {}
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return []
+    for name in names:
+        if name.endswith(".idx"):
+            seq = _seq_from_stem(name[: -len(".idx")])
+            if seq is not None:
+                found.setdefault(seq, {})["idx"] = directory / name
+            continue
+        m = _SEGMENT_RE.match(name)
+        if m:
+            found.setdefault(int(m.group(1)), {})["gz" if m.group(2) else "jsonl"] = directory / name
+
+    segments = []
+    for seq in sorted(found):
+        files = found[seq]
+        idx = files.get("idx")
+        data = files.get("gz") if idx is not None and "gz" in files else files.get("jsonl")
+        if data is None:
+            data = files.get("gz")
+        if data is None:
+            continue
+        segments.append(Segment(seq=seq, data_path=data, index_path=idx))
+    return segments
+
+
+class SegmentedJsonlWriter:
+    """
+    AuditBatchWriter that writes JSONL into rotating segments.
+
+    Design notes:
+    - The active segment is plain JSONL, appended through an open file.
+    - It is rotated once it exceeds max_bytes or is older than max_age_s.
+    - Closed segments are sealed by a background thread: optionally compressed as
+      a series of independent gzip members of ~block_bytes each (still a valid
+      .gz file), and given a sidecar index from correlation_id / decision_id /
+      subject_id / policy_version to (block offset, offset in block). A lookup binary-searches the
+      index and decompresses a single block instead of scanning the log.
+    - Segments left unsealed by a crash are sealed on startup.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        *,
+        max_bytes: int = 64 * 1024 * 1024,
+        max_age_s: float = 3600.0,
+        compress: bool = True,
+        block_bytes: int = 64 * 1024,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age_s = max_age_s
+        self.compress = compress
+        self.block_bytes = block_bytes
+        self._clock = clock
+
+        self._file: Optional[IO[bytes]] = None
+        self._active: Optional[Path] = None
+        self._opened_at = 0.0
+        self._size = 0
+        self._next_seq: Optional[int] = None
+
+        self._seal_queue: "queue.Queue[Optional[Path]]" = queue.Queue()
+        self._sealer = threading.Thread(target=self._seal_loop, name="authz-audit-sealer", daemon=True)
+        self._sealer.start()
+
+    def write_batch(self, records: Sequence[AuditRecord]) -> None:
+        f = self._open()
+        data = "".join(encode_record(r) + "\n" for r in records).encode("utf-8")
+        f.write(data)
+        f.flush()
+        self._size += len(data)
+        if self._size >= self.max_bytes or (self._clock() - self._opened_at) >= self.max_age_s:
+            self.rotate()
+
+    def sync(self) -> None:
+        if self._file is not None:
+            os.fsync(self._file.fileno())
+
+    def rotate(self) -> None:
+        """Close the active segment (if any) and queue it for sealing."""
+        if self._file is None:
+            return
+        self._file.close()
+        self._file = None
+        if self._size:
+            self._seal_queue.put(self._active)
+        else:
+            self._active.unlink(missing_ok=True)
+        self._active = None
+
+    def close(self) -> None:
+        self.rotate()
+        self._seal_queue.put(None)
+        self._sealer.join(timeout=60)
+
+    # ----------------------------
+    # Internals
+    # ----------------------------
+
+    def _open(self) -> IO[bytes]:
+        if self._file is not None:
+            return self._file
+
+        if self._next_seq is None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            existing = list_segments(self.directory)
+            for seg in existing:
+                if not seg.sealed:
+                    self._seal_queue.put(seg.data_path)
+                elif seg.compressed:
+                    # Crash between compressing and removing the plain file
+                    seg.data_path.with_suffix("").unlink(missing_ok=True)
+            self._next_seq = existing[-1].seq + 1 if existing else 1
+
+        self._active = self.directory / f"audit-{self._next_seq:08d}.jsonl"
+        self._next_seq += 1
+        self._file = self._active.open("ab")
+        self._size = 0
+        self._opened_at = self._clock()
+        return self._file
+
+    def _seal_loop(self) -> None:
+        while True:
+            path = self._seal_queue.get()
+            if path is None:
+                return
+            try:
+                seal_segment(path, compress=self.compress, block_bytes=self.block_bytes)
+            except Exception:
+                # Unsealed segments stay readable (linear scan) and are retried on restart
+                logger.exception("Failed to seal audit segment %s", path)
+
+
+def seal_segment(path: Path, *, compress: bool = True, block_bytes: int = 64 * 1024) -> Path:
+    """
+    Write the sidecar index for a closed plain segment, compressing it first if
+    requested. Returns the final data path. Safe to re-run after a crash.
+    """
+    index_path = path.with_name(path.name[: -len(".jsonl")] + ".idx")
+
+    if not compress:
+        index_plain_file(path, index_path)
+        return path
+
+    builder = _IndexBuilder(path)
+    data_path = path.with_name(path.name + ".gz")
+    tmp = data_path.with_name(data_path.name + ".tmp")
+    with path.open("rb") as src, tmp.open("wb") as dst:
+        for block in _blocks(src, block_bytes):
+            block_offset = dst.tell()
+            line_offset = 0
+            for line in block.splitlines(keepends=True):
+                builder.track(line, block_offset, line_offset)
+                line_offset += len(line)
+            builder.data_bytes += len(block)
+            # wbits=31: each block is a standalone gzip member
+            c = zlib.compressobj(6, zlib.DEFLATED, 31)
+            dst.write(c.compress(block) + c.flush())
+        dst.flush()
+        os.fsync(dst.fileno())
+    os.replace(tmp, data_path)
+
+    builder.write(index_path)
+    path.unlink(missing_ok=True)
+    return data_path
+
+
+def index_plain_file(path: Path, index_path: Path) -> None:
+    """
+    Index an uncompressed JSONL file in place (block offset = line offset).
+
+    Also used for a growing, non-segmented audit.jsonl: the header records how
+    many bytes were covered, so readers only scan what was appended since.
+    """
+    builder = _IndexBuilder(path)
+    with path.open("rb") as src:
+        for line in src:
+            if not line.endswith(b"\n"):
+                break  # torn or in-progress final write; not a record yet
+            builder.track(line, builder.data_bytes, 0)
+            builder.data_bytes += len(line)
+    builder.write(index_path)
+
+
+class _IndexBuilder:
+    def __init__(self, source: Path) -> None:
+        self.source = source
+        self.entries: List[Tuple[int, int, int]] = []
+        self.first_us: Optional[int] = None
+        self.last_us: Optional[int] = None
+        self.data_bytes = 0
+
+    def track(self, line: bytes, block_offset: int, line_offset: int) -> None:
+        try:
+            # An aggregate line is indexed under each decision it stands for
+            records = expand_aggregate(json.loads(line))
+        except (ValueError, KeyError, TypeError):
+            logger.warning("Unparseable audit line in %s; not indexed", self.source)
+            return
+        hashes = {
+            key_hash(field, rec[field]) for rec in records for field in INDEXED_FIELDS if rec.get(field) is not None
+        }
+        self.entries.extend((h, block_offset, line_offset) for h in hashes)
+        for rec in records:
+            ts = epoch_us(rec.get("created_at"))
+            if ts is not None:
+                self.first_us = ts if self.first_us is None else min(self.first_us, ts)
+                self.last_us = ts if self.last_us is None else max(self.last_us, ts)
+
+    def write(self, index_path: Path) -> None:
+        self.entries.sort()
+        tmp = index_path.with_name(index_path.name + ".tmp")
+        with tmp.open("wb") as f:
+            f.write(_HEADER.pack(INDEX_MAGIC, len(self.entries), self.first_us or 0, self.last_us or 0, self.data_bytes))
+            f.write(b"".join(_ENTRY.pack(*entry) for entry in self.entries))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, index_path)
+
+
+class SegmentIndex:
+    """Read-only, memory-mapped view of a segment's sidecar index."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        with path.open("rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.count, self.first_us, self.last_us, self.data_bytes = _HEADER.unpack_from(self._mm, 0)
+        if magic != INDEX_MAGIC:
+            self._mm.close()
+            raise ValueError(f"Not an audit segment index: {path}")
+
+    def find(self, field: str, value: str, after: Optional[Tuple[int, int]] = None) -> Iterator[Tuple[int, int]]:
+        """
+        (block offset, line offset) of candidate records, in write order,
+        starting at `after` (inclusive) if given. O(log n) to the first one.
+        """
+        h = key_hash(field, value)
+        i = self._lower_bound((h, *after) if after is not None else (h,))
+        while i < self.count:
+            entry_hash, block_offset, line_offset = _ENTRY.unpack_from(self._mm, _HEADER.size + i * _ENTRY.size)
+            if entry_hash != h:
+                return
+            yield block_offset, line_offset
+            i += 1
+
+    def close(self) -> None:
+        self._mm.close()
+
+    def _lower_bound(self, key: Tuple[int, ...]) -> int:
+        # Entries are sorted by (hash, block offset, line offset)
+        lo, hi = 0, self.count
+        mm = self._mm
+        n = len(key)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if _ENTRY.unpack_from(mm, _HEADER.size + mid * _ENTRY.size)[:n] < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+
+# Where a record is in a segment: (block offset, line offset in the block, n-th
+# record of the line). Plain data has one line per "block" (offset, 0, n), in
+# the index and when scanned alike. Compressing a segment changes its positions.
+Position = Tuple[int, int, int]
+
+
+class BlockReader:
+    """Reads lines by index position, keeping the last decompressed block."""
+
+    def __init__(self, segment: Segment) -> None:
+        self.segment = segment
+        self._file: Optional[IO[bytes]] = None
+        self._block_offset = -1
+        self._block = b""
+
+    def __enter__(self) -> "BlockReader":
+        self._file = self.segment.data_path.open("rb")
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        if self._file is not None:
+            self._file.close()
+
+    def line_at(self, block_offset: int, line_offset: int) -> bytes:
+        f = self._file
+        if not self.segment.compressed:
+            f.seek(block_offset)
+            return f.readline()
+
+        if block_offset != self._block_offset:
+            f.seek(block_offset)
+            d = zlib.decompressobj(31)
+            out = []
+            while not d.eof:
+                chunk = f.read(64 * 1024)
+                if not chunk:
+                    break
+                out.append(d.decompress(chunk))
+            self._block = b"".join(out)
+            self._block_offset = block_offset
+        end = self._block.find(b"\n", line_offset)
+        return self._block[line_offset : end + 1 if end != -1 else len(self._block)]
+
+
+def segment_matches(
+    segment: Segment,
+    index: Optional[SegmentIndex],
+    field: str,
+    value: str,
+    *,
+    after: Optional[Position] = None,
+) -> Iterator[Tuple[Position, Dict[str, Any]]]:
+    """
+    Records of one segment with rec[field] == value, in write order, with
+    their positions; only those after `after` if given. Aggregate lines are
+    expanded into the records they stand for.
+
+    Records covered by `index` are found through it; the rest of the segment
+    (all of it without an index, or what a growing plain file appended since
+    its index was built) is scanned.
+    """
+    covered = 0
+    if index is not None:
+        covered = index.data_bytes
+        with BlockReader(segment) as reader:
+            for block_offset, line_offset in index.find(field, value, after[:2] if after is not None else None):
+                line = reader.line_at(block_offset, line_offset)
+                yield from _line_matches(line, (block_offset, line_offset), field, value, after)
+        if segment.sealed:
+            return
+
+    # Pre-filter on the value as encode_record() writes it before parsing
+    needle = json.dumps(value)[1:-1].encode("ascii")
+    start = max(covered, after[0]) if after is not None else covered
+    opener = gzip.open if segment.compressed else open  # compressed but unsealed after a crash
+    with opener(segment.data_path, "rb") as f:
+        f.seek(start)
+        offset = start
+        for line in f:
+            if not line.endswith(b"\n"):
+                break  # write in progress
+            if needle in line:
+                yield from _line_matches(line, (offset, 0), field, value, after)
+            offset += len(line)
+
+
+def _line_matches(
+    line: bytes, at: Tuple[int, int], field: str, value: str, after: Optional[Position]
+) -> Iterator[Tuple[Position, Dict[str, Any]]]:
+    skip = after[2] if after is not None and after[:2] == at else -1
+    for n, rec in enumerate(expand_aggregate(json.loads(line))):
+        # The index holds 64-bit hashes: confirm the match
+        if n > skip and rec.get(field) == value:
+            yield (*at, n), rec
+
+
+def lookup(directory: Path, field: str, value: str) -> List[Dict[str, Any]]:
+    """
+    All audit records in `directory` whose `field` equals `value`, in write order.
+    Aggregate lines are expanded into the records they stand for.
+
+    Sealed segments are resolved through their index (only blocks holding a hit
+    are read); unsealed segments (the active one) are scanned.
+    """
+    if field not in INDEXED_FIELDS:
+        raise ValueError(f"field must be one of {INDEXED_FIELDS}")
+
+    results: List[Dict[str, Any]] = []
+    for segment in list_segments(directory):
+        index = SegmentIndex(segment.index_path) if segment.sealed else None
+        try:
+            results.extend(rec for _, rec in segment_matches(segment, index, field, value))
+        finally:
+            if index is not None:
+                index.close()
+    return results
+
+
+def _blocks(src: IO[bytes], block_bytes: int) -> Iterator[bytes]:
+    """Consecutive runs of whole lines, each roughly block_bytes long."""
+    buf: List[bytes] = []
+    size = 0
+    for line in src:
+        if not line.endswith(b"\n"):
+            break  # torn final write from a crash; not a record
+        buf.append(line)
+        size += len(line)
+        if size >= block_bytes:
+            yield b"".join(buf)
+            buf, size = [], 0
+    if buf:
+        yield b"".join(buf)
+
+
+def _seq_from_stem(stem: str) -> Optional[int]:
+    m = re.match(r"^audit-(\d{8})$", stem)
+    return int(m.group(1)) if m else None
+
+
+def epoch_us(value: Any) -> Optional[int]:
+    if not isinstance(value, str):
+        return None
+    try:
+        dt = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return int(dt.timestamp() * 1_000_000)
@@ -1,19 +1,54 @@
 from __future__ import annotations
 
 import json
+import logging
 import os
+import queue
+import threading
+import time
 from dataclasses import asdict
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Optional
+from typing import IO, Callable, List, Optional, Protocol, Sequence, Tuple
 
 from app.domain.audit import AuditRecord
+from app.services.metrics import AUDIT_WRITE_SECONDS, REGISTRY
+from app.settings import resolved_once
+
+
+logger = logging.getLogger(__name__)
 
 
 class AuditSinkError(RuntimeError):
     pass
 
 
+class AuditSink(Protocol):
+    def write(self, record: AuditRecord) -> None: ...
+
+    def write_many(self, records: Sequence[AuditRecord]) -> None: ...
+
+    def write_nowait(self, record: AuditRecord) -> bool:
+        """
+        Accept the record only if that needs no I/O and no waiting. Returns False
+        when the caller must use write() instead (async callers run it in a
+        worker thread).
+        """
+        ...
+
+    def close(self) -> None: ...
+
+
+class AuditBatchWriter(Protocol):
+    """Storage backend for BufferedAuditSink. Called from the writer thread only."""
+
+    def write_batch(self, records: Sequence[AuditRecord]) -> None: ...
+
+    def sync(self) -> None: ...
+
+    def close(self) -> None: ...
+
+
 class JsonlAuditSink:
     """
     Append-only audit sink that writes one JSON object per line.
@@ -28,24 +63,537 @@ class JsonlAuditSink:
         self.path = path
 
     def write(self, record: AuditRecord) -> None:
+        self.write_many([record])
+
+    def write_nowait(self, record: AuditRecord) -> bool:
+        return False  # every write is file I/O
+
+    def write_many(self, records: Sequence[AuditRecord]) -> None:
+        """Append several records with a single open/write (one line each)."""
         try:
             self.path.parent.mkdir(parents=True, exist_ok=True)
-            line = json.dumps(asdict(record), separators=(",", ":"), sort_keys=True)
+            data = "".join(encode_record(r) + "\n" for r in records)
+            t0 = time.perf_counter_ns()
             with self.path.open("a", encoding="utf-8") as f:
-                f.write(line + "\n")
+                f.write(data)
+            AUDIT_WRITE_SECONDS.observe_ns(time.perf_counter_ns() - t0)
         except OSError as e:
             raise AuditSinkError(f"Failed to write audit record to {self.path}") from e
 
+    def close(self) -> None:
+        pass
+
+
+class DirectAuditSink:
+    """
+    Synchronous sink over an AuditBatchWriter: each write is on storage (or has
+    failed) before it returns.
+    """
+
+    def __init__(self, writer: AuditBatchWriter) -> None:
+        self.writer = writer
+        self._lock = threading.Lock()
+
+    def write(self, record: AuditRecord) -> None:
+        self.write_many([record])
+
+    def write_nowait(self, record: AuditRecord) -> bool:
+        return False  # every write is storage I/O
+
+    def write_many(self, records: Sequence[AuditRecord]) -> None:
+        try:
+            with self._lock:
+                t0 = time.perf_counter_ns()
+                self.writer.write_batch(records)
+                AUDIT_WRITE_SECONDS.observe_ns(time.perf_counter_ns() - t0)
+        except OSError as e:
+            raise AuditSinkError(f"Failed to write audit records: {e}") from e
+
+    def close(self) -> None:
+        with self._lock:
+            self.writer.close()
+
+
+class JsonlFileWriter:
+    """
+    AuditBatchWriter appending JSONL to a file that stays open between batches.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._file: Optional[IO[str]] = None
+
+    def write_batch(self, records: Sequence[AuditRecord]) -> None:
+        f = self._open()
+        f.write("".join(encode_record(r) + "\n" for r in records))
+        f.flush()
+
+    def sync(self) -> None:
+        if self._file is not None:
+            os.fsync(self._file.fileno())
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _open(self) -> IO[str]:
+        if self._file is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = self.path.open("a", encoding="utf-8")
+        return self._file
+
+
+DURABILITY_MODES = ("none", "batch", "record")
+BACKPRESSURE_POLICIES = ("block", "fail", "drop")
+
+_STOP = object()
+
+
+class BufferedAuditSink:
+    """
+    Audit sink that queues records and writes them in groups from a writer thread.
+
+    Design notes:
+    - write() only enqueues; encoding and I/O happen on the writer thread.
+    - A group is flushed when it reaches batch_size or flush_interval_s after its
+      first record, whichever comes first.
+    - durability: "none" (write + flush to the OS), "batch" (fsync per group),
+      "record" (fsync after every record).
+    - backpressure when the queue is full: "block" the caller, "fail" with
+      AuditSinkError (the request fails with audit_write_failed), or "drop" the
+      record and count it in `dropped`. write_many() is all or nothing: room for
+      the whole group is reserved before any of it is queued.
+    - A failed group write is retried max_attempts times with exponential
+      backoff (from retry_backoff_s), so transient storage errors cost latency,
+      not records.
+    - If the group still fails, its records are written one by one: when some
+      succeed, storage is up and the ones it refuses are bad records; they are
+      logged and counted in `rejected` instead of failing everything else.
+    - If nothing could be written, the group is counted in `lost` and write()
+      raises AuditSinkError for cooldown_s, rather than accepting records while
+      storage is known to be down. After that, writes are accepted again, and
+      the first successful write clears the error.
+
+    Unlike JsonlAuditSink, a successful write() means "accepted", not "on disk".
+    """
+
+    def __init__(
+        self,
+        writer: AuditBatchWriter,
+        *,
+        queue_size: int = 10_000,
+        batch_size: int = 256,
+        flush_interval_s: float = 0.01,
+        durability: str = "none",
+        backpressure: str = "block",
+        max_attempts: int = 3,
+        retry_backoff_s: float = 0.05,
+        cooldown_s: float = 1.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if durability not in DURABILITY_MODES:
+            raise ValueError(f"durability must be one of {DURABILITY_MODES}")
+        if backpressure not in BACKPRESSURE_POLICIES:
+            raise ValueError(f"backpressure must be one of {BACKPRESSURE_POLICIES}")
+
+        self.writer = writer
+        self.batch_size = max(batch_size, 1)
+        self.flush_interval_s = flush_interval_s
+        self.durability = durability
+        self.backpressure = backpressure
+        self.max_attempts = max(max_attempts, 1)
+        self.retry_backoff_s = retry_backoff_s
+        self.cooldown_s = cooldown_s
+        self.dropped = 0
+        self.rejected = 0
+        self.lost = 0
+        self._clock = clock
+
+        # Capacity is accounted here rather than by the queue, so a group can
+        # reserve room for all its records at once
+        self.queue_size = max(queue_size, 1)
+        self._queue: "queue.Queue[object]" = queue.Queue()
+        self._queued = 0
+        self._pending = 0
+        lock = threading.Lock()
+        self._idle = threading.Condition(lock)  # _pending reached 0
+        self._room = threading.Condition(lock)  # _queued went down
+        self._error: Optional[BaseException] = None
+        self._error_until = 0.0
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="authz-audit-writer", daemon=True)
+        self._thread.start()
+
+    def write(self, record: AuditRecord) -> None:
+        self._raise_if_failed()
+        self._enqueue((record,))
+
+    def write_nowait(self, record: AuditRecord) -> bool:
+        # Only a full queue under backpressure="block" would make write() wait
+        self._raise_if_failed()
+        return self._enqueue((record,), wait=False)
+
+    def write_many(self, records: Sequence[AuditRecord]) -> None:
+        self._raise_if_failed()
+        if records:
+            self._enqueue(records)
+
+    def queue_depth(self) -> int:
+        return self._queued
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every accepted record has been handed to the writer."""
+        with self._idle:
+            return self._idle.wait_for(lambda: self._pending == 0, timeout=timeout)
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join(timeout=10)
+        try:
+            self.writer.close()
+        except Exception:
+            logger.exception("Failed to close audit writer")
+
+    # ----------------------------
+    # Internals
+    # ----------------------------
+
+    def _raise_if_failed(self) -> None:
+        if self._closed:
+            raise AuditSinkError("Audit sink is closed")
+        error = self._error
+        if error is not None and self._clock() < self._error_until:
+            raise AuditSinkError(f"Audit writer failed: {error}") from error
+
+    def _enqueue(self, records: Sequence[AuditRecord], *, wait: bool = True) -> bool:
+        n = len(records)
+        with self._room:
+            if not self._has_room(n):
+                if self.backpressure == "block":
+                    if not wait:
+                        return False  # caller retries with a blocking write
+                    self._room.wait_for(lambda: self._has_room(n))
+                elif self.backpressure == "drop":
+                    self.dropped += n
+                    return True
+                else:
+                    raise AuditSinkError("Audit queue is full")
+            self._queued += n
+            self._pending += n
+        for record in records:
+            self._queue.put(record)
+        return True
+
+    def _has_room(self, n: int) -> bool:
+        # Caller holds the lock. A group larger than the queue fits an empty one.
+        return self._queued == 0 or self._queued + n <= self.queue_size
+
+    def _taken(self) -> None:
+        with self._room:
+            self._queued -= 1
+            self._room.notify_all()
+
+    def _done(self, n: int) -> None:
+        with self._idle:
+            self._pending -= n
+            if self._pending == 0:
+                self._idle.notify_all()
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            batch, stopping = self._next_batch()
+            if not batch:
+                continue
+            try:
+                self._write(batch)
+            except Exception:
+                # A bug here must not end the writer thread: nothing would
+                # drain the queue again, and blocked writers would hang.
+                logger.exception("Audit writer failed unexpectedly; %d record(s) not written", len(batch))
+                self.lost += len(batch)
+            finally:
+                self._done(len(batch))
+
+    def _next_batch(self) -> Tuple[List[AuditRecord], bool]:
+        first = self._queue.get()
+        if first is _STOP:
+            return [], True
+
+        self._taken()
+        batch: List[AuditRecord] = [first]
+        deadline = time.monotonic() + self.flush_interval_s
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            self._taken()
+            batch.append(item)
+        return batch, False
+
+    def _write(self, batch: List[AuditRecord]) -> None:
+        if self.durability == "record":
+            for record in batch:
+                self._write_group([record])
+        else:
+            self._write_group(batch)
+
+    def _write_group(self, records: List[AuditRecord]) -> None:
+        delay = self.retry_backoff_s
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                self._write_records(records)
+            except Exception as e:
+                error = e
+                if attempt < self.max_attempts and not self._closed:
+                    logger.warning("Audit write failed (attempt %d of %d): %s", attempt, self.max_attempts, e)
+                    time.sleep(delay)
+                    delay *= 2
+                continue
+            self._error = None
+            return
+
+        # Storage is down, or refuses some record of the group: tell them apart
+        # by writing the records one at a time.
+        rejected: List[AuditRecord] = []
+        if len(records) > 1:
+            for record in records:
+                try:
+                    self._write_records([record])
+                except Exception:
+                    rejected.append(record)
+        if len(records) > 1 and len(rejected) < len(records):
+            if rejected:
+                logger.error(
+                    "Audit storage rejected %d record(s): %s (decision_ids: %s)",
+                    len(rejected),
+                    error,
+                    ", ".join(_record_id(r) for r in rejected),
+                )
+                self.rejected += len(rejected)
+            self._error = None
+            return
+
+        logger.error("Audit writer failed; %d record(s) not written: %s", len(records), error, exc_info=error)
+        self.lost += len(records)
+        self._error = error
+        self._error_until = self._clock() + self.cooldown_s
+
+    def _write_records(self, records: List[AuditRecord]) -> None:
+        t0 = time.perf_counter_ns()
+        self.writer.write_batch(records)
+        if self.durability != "none":
+            self.writer.sync()
+        AUDIT_WRITE_SECONDS.observe_ns(time.perf_counter_ns() - t0)
+
+
+def _record_id(item: AuditRecord) -> str:
+    # AuditAggregates (from AggregatingAuditSink) share the queue but have no
+    # decision_id: name them by their first occurrence
+    decision_id = getattr(item, "decision_id", None)
+    if decision_id is not None:
+        return decision_id
+    occurrences = getattr(item, "occurrences", None)
+    return f"aggregate:{occurrences[0][0]}" if occurrences else "aggregate"
+
+
+def encode_record(record: AuditRecord) -> str:
+    return json.dumps(asdict(record), separators=(",", ":"), sort_keys=True)
+
 
 def utc_now_iso() -> str:
     return datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
 
 
-def audit_sink_from_env() -> Optional[JsonlAuditSink]:
+@resolved_once
+def _settings_from_env() -> Tuple[str, ...]:
+    return tuple(
+        os.getenv(name, default).strip()
+        for name, default in (
+            ("AUTHZ_AUDIT_PATH", ""),
+            ("AUTHZ_AUDIT_MODE", "sync"),
+            ("AUTHZ_AUDIT_QUEUE_SIZE", "10000"),
+            ("AUTHZ_AUDIT_BATCH_SIZE", "256"),
+            ("AUTHZ_AUDIT_FLUSH_MS", "10"),
+            ("AUTHZ_AUDIT_FSYNC", "none"),
+            ("AUTHZ_AUDIT_BACKPRESSURE", "block"),
+            ("AUTHZ_AUDIT_BACKEND", "jsonl"),
+            ("AUTHZ_AUDIT_DB_URL", ""),
+            ("AUTHZ_AUDIT_SEGMENT_MAX_BYTES", str(64 * 1024 * 1024)),
+            ("AUTHZ_AUDIT_SEGMENT_MAX_AGE_S", "3600"),
+            ("AUTHZ_AUDIT_SEGMENT_COMPRESS", "1"),
+            ("AUTHZ_AUDIT_AGGREGATE_WINDOW_S", "0"),
+            ("AUTHZ_AUDIT_AGGREGATE_MAX_KEYS", "10000"),
+            ("AUTHZ_AUDIT_AGGREGATE_MAX_PENDING", "100000"),
+        )
+    )
+
+
+def audit_sink_from_env() -> Optional[AuditSink]:
     """
     If AUTHZ_AUDIT_PATH is unset, auditing is disabled (v0 default is explicit via env).
+
+    AUTHZ_AUDIT_MODE=sync (default) writes each decision before responding.
+    AUTHZ_AUDIT_MODE=buffered uses BufferedAuditSink, tuned by AUTHZ_AUDIT_QUEUE_SIZE,
+    AUTHZ_AUDIT_BATCH_SIZE, AUTHZ_AUDIT_FLUSH_MS, AUTHZ_AUDIT_FSYNC (none|batch|record)
+    and AUTHZ_AUDIT_BACKPRESSURE (block|fail|drop).
+
+    AUTHZ_AUDIT_BACKEND=sql writes to the audit_decisions table at
+    AUTHZ_AUDIT_DB_URL instead (always buffered, one multi-row insert per group).
+
+    AUTHZ_AUDIT_BACKEND=segments treats AUTHZ_AUDIT_PATH as a directory of
+    rotating, indexed segments (AUTHZ_AUDIT_SEGMENT_MAX_BYTES,
+    AUTHZ_AUDIT_SEGMENT_MAX_AGE_S, AUTHZ_AUDIT_SEGMENT_COMPRESS=0|1).
+
+    AUTHZ_AUDIT_AGGREGATE_WINDOW_S > 0 (jsonl and segments only) collapses
+    identical allow decisions within that window into aggregate records (see
+    AggregatingAuditSink), keeping at most AUTHZ_AUDIT_AGGREGATE_MAX_KEYS
+    windows open and AUTHZ_AUDIT_AGGREGATE_MAX_PENDING decisions unwritten.
     """
-    path = os.getenv("AUTHZ_AUDIT_PATH", "").strip()
+    return _build_sink(_settings_from_env())
+
+
+def _build_sink(settings: Tuple[str, ...]) -> Optional[AuditSink]:
+    backend = settings[7]
+    aggregate_window_s, aggregate_max_keys, aggregate_max_pending = settings[-3:]
+    aggregate = float(aggregate_window_s) > 0
+    if aggregate and backend == "sql":
+        raise AuditSinkError("AUTHZ_AUDIT_AGGREGATE_WINDOW_S requires AUTHZ_AUDIT_BACKEND=jsonl or segments")
+    sink = _build_storage_sink(settings)
+    if sink is None or not aggregate:
+        return sink
+    from app.services.audit_aggregate import AggregatingAuditSink
+
+    return AggregatingAuditSink(
+        sink,
+        window_s=float(aggregate_window_s),
+        max_keys=int(aggregate_max_keys),
+        max_pending=int(aggregate_max_pending),
+    )
+
+
+def _build_storage_sink(settings: Tuple[str, ...]) -> Optional[AuditSink]:
+    (
+        path, mode, queue_size, batch_size, flush_ms, fsync, backpressure,
+        backend, db_url, segment_max_bytes, segment_max_age_s, segment_compress, *_,
+    ) = settings
+
+    def buffered(writer: AuditBatchWriter) -> BufferedAuditSink:
+        return BufferedAuditSink(
+            writer,
+            queue_size=int(queue_size),
+            batch_size=int(batch_size),
+            flush_interval_s=float(flush_ms) / 1000.0,
+            durability=fsync,
+            backpressure=backpressure,
+        )
+
+    if backend == "sql":
+        if not db_url:
+            raise AuditSinkError("AUTHZ_AUDIT_DB_URL must be set when AUTHZ_AUDIT_BACKEND=sql")
+        from app.services.sql_audit_sink import SqlAuditWriter
+
+        return buffered(SqlAuditWriter(db_url))
+    if backend not in ("jsonl", "segments"):
+        raise AuditSinkError(f"Unknown AUTHZ_AUDIT_BACKEND: {backend!r}")
+
     if not path:
         return None
-    return JsonlAuditSink(Path(path))
+    if mode not in ("sync", "buffered"):
+        raise AuditSinkError(f"Unknown AUTHZ_AUDIT_MODE: {mode!r}")
+
+    if backend == "segments":
+        from app.services.audit_segments import SegmentedJsonlWriter
+
+        writer = SegmentedJsonlWriter(
+            Path(path),
+            max_bytes=int(segment_max_bytes),
+            max_age_s=float(segment_max_age_s),
+            compress=segment_compress != "0",
+        )
+        return DirectAuditSink(writer) if mode == "sync" else buffered(writer)
+
+    if mode == "sync":
+        return JsonlAuditSink(Path(path))
+    return buffered(JsonlFileWriter(Path(path)))
+
+
+_sink: Optional[AuditSink] = None
+_sink_settings: Optional[Tuple[str, ...]] = None
+_sink_lock = threading.Lock()
+
+
+def get_audit_sink() -> Optional[AuditSink]:
+    """
+    Process-wide audit sink (None when auditing is disabled).
+
+    Reused across requests so buffered sinks keep their queue, writer thread and
+    open file. Env is read once (see app.settings); the sink is rebuilt (closing
+    the old one) only after reload_settings() picks up a different configuration.
+    """
+    global _sink, _sink_settings
+    settings = _settings_from_env()
+    if settings is _sink_settings:
+        return _sink
+
+    with _sink_lock:
+        if settings != _sink_settings:
+            if _sink is not None:
+                _sink.close()
+            _sink = _build_sink(settings)
+        _sink_settings = settings
+        return _sink
+
+
+def _buffered() -> Optional[BufferedAuditSink]:
+    sink = getattr(_sink, "inner", _sink)  # beneath an AggregatingAuditSink
+    return sink if isinstance(sink, BufferedAuditSink) else None
+
+
+def _queue_depth() -> int:
+    sink = _buffered()
+    return sink.queue_depth() if sink is not None else 0
+
+
+def _buffered_attr(name: str) -> int:
+    sink = _buffered()
+    return getattr(sink, name) if sink is not None else 0
+
+
+REGISTRY.gauge_func(
+    "authz_audit_queue_depth",
+    "Audit records queued and not yet written (buffered mode).",
+    _queue_depth,
+)
+REGISTRY.gauge_func(
+    "authz_audit_dropped_records",
+    "Audit records dropped because the queue was full, for the current sink.",
+    lambda: _buffered_attr("dropped"),
+)
+REGISTRY.gauge_func(
+    "authz_audit_rejected_records",
+    "Audit records storage refused while accepting the rest of their group, for the current sink.",
+    lambda: _buffered_attr("rejected"),
+)
+REGISTRY.gauge_func(
+    "authz_audit_lost_records",
+    "Audit records not written because storage kept failing, for the current sink.",
+    lambda: _buffered_attr("lost"),
+)
+
+
+def shutdown_audit_sink() -> None:
+    global _sink, _sink_settings
+    with _sink_lock:
+        if _sink is not None:
+            _sink.close()
+        _sink = None
+        _sink_settings = None
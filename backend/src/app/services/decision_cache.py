@@ -0,0 +1,179 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+
+from app.domain.compiled_policy import CompiledPolicy
+from app.domain.types import AuthorizationDecision, AuthorizationRequest
+from app.settings import resolved_once
+
+
+class DecisionCache:
+    """
+    Bounded LRU + TTL cache of evaluation results.
+
+    Design notes:
+    - evaluate() is a pure function of (request inputs, policy), so a cached
+      decision is exactly what evaluate() would return. Only the decision is
+      cached; decision ids and audit records are still produced per request.
+    - Entries belong to one policy snapshot generation per scope (the policy
+      id, so tenants of a PolicyRegistry do not invalidate each other). Seeing
+      a newer generation drops that scope's entries; requests still holding an
+      older snapshot bypass the cache rather than mixing versions.
+    """
+
+    def __init__(
+        self,
+        max_entries: int,
+        ttl_s: float,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if max_entries <= 0:
+            raise ValueError("max_entries must be positive")
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[bytes, Tuple[float, AuthorizationDecision, str]]" = OrderedDict()
+        self._generations: Dict[str, int] = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, generation: int, key: bytes, scope: str = "") -> Optional[AuthorizationDecision]:
+        with self._lock:
+            if not self._sync(scope, generation):
+                self.misses += 1
+                return None
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, decision, _ = entry
+            if expires_at <= self._clock():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return decision
+
+    def put(self, generation: int, key: bytes, decision: AuthorizationDecision, scope: str = "") -> None:
+        # Stored with a tuple of rule ids so cached decisions are never mutated
+        frozen = AuthorizationDecision(
+            decision=decision.decision,
+            reason=decision.reason,
+            matched_rule_ids=tuple(decision.matched_rule_ids),
+        )
+        with self._lock:
+            if not self._sync(scope, generation):
+                return
+            self._entries[key] = (self._clock() + self.ttl_s, frozen, scope)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.invalidations += 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
+
+    def _sync(self, scope: str, generation: int) -> bool:
+        # Caller holds self._lock
+        current = self._generations.get(scope, 0)
+        if generation == current:
+            return True
+        if generation > current:
+            if current:
+                # Policy reloads are rare; a scan keeps get/put free of bookkeeping
+                stale = [k for k, entry in self._entries.items() if entry[2] == scope]
+                for k in stale:
+                    del self._entries[k]
+                self.invalidations += 1
+            self._generations[scope] = generation
+            return True
+        return False
+
+
+def decision_cache_key(req: AuthorizationRequest, policy: CompiledPolicy, mode: str = "full") -> Optional[bytes]:
+    """
+    Canonical key over every input evaluate() reads, plus the policy identity
+    and evaluation mode (modes differ in the matched rule ids they report).
+
+    Subject id and resource id are deliberately excluded: rules cannot match on
+    them, so requests differing only there share a decision. Returns None if the
+    inputs are not JSON-serializable (such requests are simply not cached).
+    """
+    try:
+        canonical = json.dumps(
+            [
+                policy.id,
+                policy.version,
+                mode,
+                req.action,
+                req.resource.type,
+                req.subject.claims,
+                req.resource.attrs or {},
+                req.context,
+            ],
+            sort_keys=True,
+            separators=(",", ":"),
+        )
+    except (TypeError, ValueError):
+        return None
+    return hashlib.blake2b(canonical.encode("utf-8"), digest_size=16).digest()
+
+
+@resolved_once
+def _settings_from_env() -> Tuple[int, float]:
+    max_entries = int(os.getenv("AUTHZ_DECISION_CACHE_SIZE", "0"))
+    ttl_s = float(os.getenv("AUTHZ_DECISION_CACHE_TTL_S", "60"))
+    return max_entries, ttl_s
+
+
+_cache: Optional[DecisionCache] = None
+_cache_settings: Optional[Tuple[int, float]] = None
+_cache_lock = threading.Lock()
+
+
+def get_decision_cache() -> Optional[DecisionCache]:
+    """
+    Process-wide decision cache, or None if disabled.
+
+    Disabled unless AUTHZ_DECISION_CACHE_SIZE is a positive entry count.
+    AUTHZ_DECISION_CACHE_TTL_S bounds how long an entry may be served (default 60).
+    Env is read once (see app.settings); afterwards this is a lookup.
+    """
+    global _cache, _cache_settings
+    settings = _settings_from_env()
+    if settings is _cache_settings:
+        return _cache
+
+    with _cache_lock:
+        if settings != _cache_settings:
+            max_entries, ttl_s = settings
+            _cache = DecisionCache(max_entries=max_entries, ttl_s=ttl_s) if max_entries > 0 else None
+        _cache_settings = settings
+        return _cache
@@ -0,0 +1,272 @@
+from __future__ import annotations
+
+import bisect
+import math
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Latency bucket upper bounds in nanoseconds (1us .. 10s, roughly 1-2.5-5 steps)
+LATENCY_BUCKETS_NS: Tuple[int, ...] = tuple(
+    int(m * 10**e) for e in range(3, 10) for m in (1, 2.5, 5)
+) + (10**10,)
+
+
+class Sharded:
+    """
+    Per-thread arrays of integers.
+
+    Each thread only ever writes its own shard, so the hot path is a dict lookup
+    and an in-place integer add: no lock and no allocation after the thread's
+    first observation. Readers sum all shards; a scrape racing an increment sees
+    the value either before or after it.
+    """
+
+    __slots__ = ("_width", "_shards", "_lock")
+
+    def __init__(self, width: int) -> None:
+        self._width = width
+        self._shards: Dict[int, List[int]] = {}
+        self._lock = threading.Lock()
+
+    def shard(self) -> List[int]:
+        ident = threading.get_ident()
+        shard = self._shards.get(ident)
+        if shard is None:
+            with self._lock:
+                shard = self._shards.setdefault(ident, [0] * self._width)
+        return shard
+
+    def totals(self) -> List[int]:
+        with self._lock:
+            shards = list(self._shards.values())
+        out = [0] * self._width
+        for shard in shards:
+            for i, v in enumerate(shard):
+                out[i] += v
+        return out
+
+
+class CounterChild:
+    __slots__ = ("_cells",)
+
+    def __init__(self) -> None:
+        self._cells = Sharded(1)
+
+    def inc(self, n: int = 1) -> None:
+        self._cells.shard()[0] += n
+
+    def value(self) -> int:
+        return self._cells.totals()[0]
+
+
+class HistogramChild:
+    """Latency histogram; observations are integer nanoseconds."""
+
+    __slots__ = ("_bounds", "_cells")
+
+    def __init__(self, bounds: Tuple[int, ...]) -> None:
+        self._bounds = bounds
+        # [bucket_0 .. bucket_n-1, +Inf bucket, sum_ns]
+        self._cells = Sharded(len(bounds) + 2)
+
+    def observe_ns(self, ns: int) -> None:
+        shard = self._cells.shard()
+        shard[bisect.bisect_left(self._bounds, ns)] += 1
+        shard[-1] += ns
+
+    def snapshot(self) -> Tuple[List[int], int]:
+        """(per-bucket counts incl. +Inf, sum_ns); counts are not cumulative."""
+        totals = self._cells.totals()
+        return totals[:-1], totals[-1]
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str]) -> None:
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            self.labels()  # unlabeled metrics render as 0 before first use
+
+    def labels(self, *values: str):
+        """Child for one label combination. Hot paths should bind children once."""
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            with self._lock:
+                child = self._children.get(values)
+                if child is None:
+                    child = self._children[values] = self._new_child()
+        return child
+
+    def children(self) -> List[Tuple[Tuple[str, ...], object]]:
+        with self._lock:
+            return sorted(self._children.items())
+
+    def _new_child(self):
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self) -> CounterChild:
+        return CounterChild()
+
+    def inc(self, n: int = 1) -> None:
+        self.labels().inc(n)
+
+    def render(self) -> Iterable[str]:
+        for values, child in self.children():
+            yield f"{self.name}{_labels(self.labelnames, values)} {child.value()}"
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets_ns: Tuple[int, ...] = LATENCY_BUCKETS_NS,
+    ) -> None:
+        self.buckets_ns = buckets_ns
+        super().__init__(name, help, labelnames)
+
+    def _new_child(self) -> HistogramChild:
+        return HistogramChild(self.buckets_ns)
+
+    def observe_ns(self, ns: int) -> None:
+        self.labels().observe_ns(ns)
+
+    def render(self) -> Iterable[str]:
+        for values, child in self.children():
+            counts, sum_ns = child.snapshot()
+            cumulative = 0
+            for bound, n in zip(self.buckets_ns + (math.inf,), counts):
+                cumulative += n
+                le = "+Inf" if bound == math.inf else _float(bound / 1e9)
+                yield f"{self.name}_bucket{_labels(self.labelnames + ('le',), values + (le,))} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.labelnames, values)} {_float(sum_ns / 1e9)}"
+            yield f"{self.name}_count{_labels(self.labelnames, values)} {cumulative}"
+
+
+class GaugeFunc:
+    """Gauge (or externally maintained counter) read from a callback at scrape time."""
+
+    def __init__(self, name: str, help: str, fn: Callable[[], Optional[float]], kind: str = "gauge") -> None:
+        self.name = name
+        self.help = help
+        self.kind = kind
+        self._fn = fn
+
+    def render(self) -> Iterable[str]:
+        value = self._fn()
+        if value is not None:
+            yield f"{self.name} {_float(value)}"
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Histogram:
+        return self._register(Histogram(name, help, labelnames))
+
+    def gauge_func(self, name: str, help: str, fn: Callable[[], Optional[float]], kind: str = "gauge") -> GaugeFunc:
+        return self._register(GaugeFunc(name, help, fn, kind))
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for m in metrics:
+            lines.append(f"# HELP {m.name} {m.help}")
+            lines.append(f"# TYPE {m.name} {m.kind}")
+            lines.extend(m.render())
+        return "\n".join(lines) + "\n"
+
+    def _register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric already registered: {metric.name}")
+            self._metrics[metric.name] = metric
+        return metric
+
+
+def _labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{k}="{_escape(v)}"' for k, v in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _float(value: float) -> str:
+    if value == int(value) and abs(value) < 1e15:
+        return str(int(value))
+    return repr(float(value))
+
+
+# ----------------------------
+# Service metrics
+# ----------------------------
+
+REGISTRY = Registry()
+
+AUTHORIZE_STAGE_SECONDS = REGISTRY.histogram(
+    "authz_authorize_stage_seconds",
+    "Time spent in each stage of POST /v1/authorize.",
+    ("stage",),
+)
+STAGE_POLICY = AUTHORIZE_STAGE_SECONDS.labels("policy")
+STAGE_DECODE = AUTHORIZE_STAGE_SECONDS.labels("decode")
+STAGE_EVALUATE = AUTHORIZE_STAGE_SECONDS.labels("evaluate")
+STAGE_AUDIT = AUTHORIZE_STAGE_SECONDS.labels("audit")
+STAGE_ENCODE = AUTHORIZE_STAGE_SECONDS.labels("encode")
+
+DECISIONS_TOTAL = REGISTRY.counter(
+    "authz_decisions_total",
+    "Authorization decisions returned, by decision and reason.",
+    ("decision", "reason"),
+)
+
+POLICY_RELOADS_TOTAL = REGISTRY.counter(
+    "authz_policy_reloads_total",
+    "Policy snapshots published (initial load and every reload).",
+)
+POLICY_LOAD_FAILURES_TOTAL = REGISTRY.counter(
+    "authz_policy_load_failures_total",
+    "Policy loads that failed to read or validate the policy file.",
+)
+POLICY_REGISTRY_EVICTIONS_TOTAL = REGISTRY.counter(
+    "authz_policy_registry_evictions_total",
+    "Policies evicted from the multi-policy registry to stay within its limits.",
+)
+
+AUDIT_WRITE_SECONDS = REGISTRY.histogram(
+    "authz_audit_write_seconds",
+    "Time to write one group of audit records to storage.",
+)
+AUDIT_AGGREGATED_TOTAL = REGISTRY.counter(
+    "authz_audit_aggregated_total",
+    "Allow decisions recorded inside an aggregate audit record instead of a line of their own.",
+)
+
+
+def render_metrics() -> str:
+    return REGISTRY.render()
@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+import gc
+import hashlib
+import logging
+import os
+import pickle
+import stat
+import sys
+import tempfile
+from pathlib import Path
+from typing import Optional, Tuple
+
+from app.domain.compiled_policy import CompiledPolicy
+from app.domain.policy import Policy
+
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever Policy, PolicyRule, CompiledPolicy or RuleBucket change shape,
+# or compile_policy() changes what it builds: old entries then simply miss.
+SNAPSHOT_FORMAT = 2
+
+
+def content_digest(raw: bytes) -> str:
+    return hashlib.sha256(raw).hexdigest()
+
+
+class CompiledPolicyCache:
+    """
+    On-disk cache of validated and compiled policies, keyed by the SHA-256 of the
+    policy file's bytes.
+
+    Design notes:
+    - A hit skips JSON parsing, pydantic validation and compilation: it is the
+      exact (Policy, CompiledPolicy) pair a full load of those bytes produced.
+      Any change to the file changes the digest, so it is fully validated again.
+    - Entries are pickles, so the directory must only be writable by the
+      service (it is created 0700). Before reading or writing, the directory
+      and the entry must be owned by the service's user and not writable by
+      group or others; otherwise the cache is not used (logged), since anyone
+      able to write an entry could run code in every worker. Unreadable or
+      stale entries count as misses.
+    - Writes go to a temp file and are renamed into place, so workers sharing
+      the directory never read a partial entry. Only the newest max_entries
+      entries are kept.
+    """
+
+    def __init__(self, directory: Path, *, max_entries: int = 8) -> None:
+        self.directory = directory
+        self.max_entries = max_entries
+
+    def load(self, digest: str) -> Optional[Tuple[Policy, CompiledPolicy]]:
+        path = self._path(digest)
+        try:
+            if not _private(os.stat(self.directory), self.directory):
+                return None
+            with path.open("rb") as f:
+                if not _private(os.fstat(f.fileno()), path):
+                    return None
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            logger.warning("Cannot read compiled policy cache entry %s: %s", path, e)
+            return None
+
+        # Unpickling allocates one object per rule, predicate and bucket; pausing
+        # the cyclic GC avoids repeated collections over a graph that is all live.
+        gc_was_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            policy, compiled = pickle.loads(data)
+        except Exception as e:  # truncated or from an incompatible build
+            logger.warning("Discarding unreadable compiled policy cache entry %s: %s", path, e)
+            path.unlink(missing_ok=True)
+            return None
+        finally:
+            if gc_was_enabled:
+                gc.enable()
+
+        if not isinstance(policy, Policy) or not isinstance(compiled, CompiledPolicy):
+            return None
+        return policy, compiled
+
+    def store(self, digest: str, policy: Policy, compiled: CompiledPolicy) -> None:
+        """Best effort: a failed write only costs the next worker a full load."""
+        try:
+            self.directory.mkdir(mode=0o700, parents=True, exist_ok=True)
+            if not _private(os.stat(self.directory), self.directory):
+                return
+            data = pickle.dumps((policy, compiled), protocol=pickle.HIGHEST_PROTOCOL)
+            fd, tmp = tempfile.mkstemp(dir=self.directory, prefix=".tmp-")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(data)
+                os.replace(tmp, self._path(digest))
+            except BaseException:
+                Path(tmp).unlink(missing_ok=True)
+                raise
+            self._prune()
+        except OSError as e:
+            logger.warning("Cannot write compiled policy cache entry in %s: %s", self.directory, e)
+
+    def _path(self, digest: str) -> Path:
+        # Python version in the name: pickles of these classes are not promised
+        # to load across interpreter versions.
+        py = f"py{sys.version_info.major}{sys.version_info.minor}"
+        return self.directory / f"{digest}-f{SNAPSHOT_FORMAT}-{py}.pickle"
+
+    def _prune(self) -> None:
+        entries = []
+        for p in self.directory.glob("*.pickle"):
+            try:
+                entries.append((p.stat().st_mtime, p))
+            except FileNotFoundError:
+                continue  # pruned by another worker
+        entries.sort(reverse=True)
+        for _, p in entries[self.max_entries :]:
+            p.unlink(missing_ok=True)
+
+
+def _private(st: os.stat_result, path: Path) -> bool:
+    """Owned by this process's user and not writable by anyone else."""
+    getuid = getattr(os, "getuid", None)
+    if getuid is None:
+        logger.warning("Compiled policy cache disabled: ownership of %s cannot be checked here", path)
+        return False
+    if st.st_uid != getuid() or st.st_mode & (stat.S_IWGRP | stat.S_IWOTH):
+        logger.warning(
+            "Compiled policy cache not used: %s must be owned by uid %d and not group/other writable",
+            path,
+            getuid(),
+        )
+        return False
+    return True
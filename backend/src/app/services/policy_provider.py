@@ -1,79 +1,317 @@
 from __future__ import annotations
 
+import itertools
+import logging
 import os
-import time
-from dataclasses import dataclass
+import threading
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Optional
+from typing import Callable, Optional, Set, Tuple
 
+from app.domain.compiled_policy import CompiledPolicy, compile_policy
 from app.domain.policy import Policy
-from app.domain.policy_loader import PolicyLoadError, load_policy_from_file
+from app.domain.policy_loader import PolicyLoadError, load_policy_from_str
+from app.services.metrics import POLICY_LOAD_FAILURES_TOTAL, POLICY_RELOADS_TOTAL
+from app.services.policy_cache import CompiledPolicyCache, content_digest
+from app.services.policy_watcher import PolicyWatcher
+from app.settings import resolved_once
+
+
+logger = logging.getLogger(__name__)
+
+# Snapshot generations increase across every provider in the process, so a
+# larger generation always means a more recently published policy.
+_generations = itertools.count(1)
 
 
 class PolicyProviderError(RuntimeError):
     pass
 
 
+class PolicyNotFoundError(PolicyProviderError):
+    """The policy file does not exist."""
+
+
+@dataclass(frozen=True, slots=True)
+class PolicySnapshot:
+    """
+    Immutable view of the active policy.
+
+    A snapshot is only published after the policy has been fully loaded,
+    validated and compiled, and it is replaced as a whole. Callers that read a snapshot once
+    per decision get a consistent view even if a reload happens mid-request.
+    """
+    policy: Policy
+    compiled: CompiledPolicy
+    mtime: Optional[float]
+    generation: int
+    source_bytes: int = 0  # size of the policy file it was loaded from
+    file_key: Optional[Tuple[int, ...]] = None  # see _file_key()
+
+
 @dataclass
 class PolicyProvider:
     """
     Loads the active policy from a file path supplied via env var.
 
     Design notes:
-    - This is a provider, not a registry. v0 assumes a single active policy.
-    - Reload uses mtime checks (opt-in) to balance correctness and simplicity.
+    - One policy per provider: the single active policy (get_policy_provider()),
+      or one tenant's policy inside a PolicyRegistry.
+    - Reload runs on a PolicyWatcher thread (inotify, or polling every
+      min_mtime_interval_s), never on the request path. A file counts as changed
+      when its mtime_ns, size or inode differs, so same-second rewrites and
+      rename-into-place are both seen. A policy that fails to load keeps the
+      last good snapshot.
+    - With a snapshot_cache, a file whose bytes were already validated and
+      compiled (by this or another worker) is loaded from that cache instead.
     """
     policy_path: Path
     reload_enabled: bool = True
     min_mtime_interval_s: float = 0.5
+    watch: str = "auto"  # PolicyWatcher mode: auto|inotify|poll
+    debounce_s: float = 0.05
+    snapshot_cache: Optional[CompiledPolicyCache] = None
+    # Registry entries: the policy's id must match the name it was selected by,
+    # and the registry is told about each published snapshot.
+    expected_policy_id: Optional[str] = None
+    on_publish: Optional[Callable[[PolicySnapshot], None]] = field(default=None, repr=False)
 
-    _cached_policy: Optional[Policy] = None
-    _cached_mtime: Optional[float] = None
-    _last_stat_at: float = 0.0
+    _snapshot: Optional[PolicySnapshot] = field(default=None, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+    _watcher: Optional[PolicyWatcher] = field(default=None, repr=False)
 
     def get(self) -> Policy:
+        return self.snapshot().policy
+
+    def snapshot(self) -> PolicySnapshot:
+        snap = self._snapshot
+        if snap is not None:
+            return snap
+
+        # First use (or startup load failed): load synchronously, once.
+        with self._lock:
+            if self._snapshot is None:
+                self._publish(self._load_snapshot())
+            return self._snapshot
+
+    def published(self) -> Optional[PolicySnapshot]:
+        """The current snapshot without loading; None until the first load succeeds."""
+        return self._snapshot
+
+    def refresh(self) -> bool:
+        """
+        Reload the policy if the file changed. Returns True if a new snapshot
+        was published.
+
+        Raises PolicyProviderError if the file cannot be read or validated; the
+        previously published snapshot (if any) stays active.
+        """
+        key = _file_key(self._stat())
+        current = self._snapshot
+        if current is not None and current.file_key == key:
+            return False
+
+        with self._lock:
+            current = self._snapshot
+            if current is not None and current.file_key == key:
+                return False
+            self._publish(self._load_snapshot())
+            return True
+
+    def start(self) -> None:
+        """Start watching the policy file (no-op when reload is disabled)."""
+        if not self.reload_enabled or self._watcher is not None:
+            return
+        self._watcher = PolicyWatcher(
+            self.policy_path.parent,
+            self._on_change,
+            mode=self.watch,
+            poll_interval_s=self.min_mtime_interval_s,
+            debounce_s=self.debounce_s,
+        )
+        self._watcher.start()
+
+    def stop(self) -> None:
+        watcher = self._watcher
+        if watcher is not None:
+            watcher.stop()
+        self._watcher = None
+
+    # ----------------------------
+    # Internals
+    # ----------------------------
+
+    def _on_change(self, names: Optional[Set[str]]) -> None:
+        # Any entry of the directory may be the file or a link to it (e.g. a
+        # swapped ..data symlink), so every event gets a stat; refresh() only
+        # reloads when the file itself changed.
+        try:
+            self.refresh()
+        except PolicyProviderError as e:
+            logger.warning("Policy reload failed; keeping last good policy: %s", e)
+
+    def _publish(self, snap: PolicySnapshot) -> None:
+        # Callers hold self._lock. A single attribute store is atomic, so readers
+        # see either the old or the new snapshot, never a mix.
+        self._snapshot = snap
+        POLICY_RELOADS_TOTAL.inc()
+        if self.on_publish is not None:
+            self.on_publish(snap)
+
+    def _load_snapshot(self) -> PolicySnapshot:
         if not self.policy_path:
             raise PolicyProviderError("policy_path is required")
 
-        if not self.reload_enabled:
-            if self._cached_policy is None:
-                self._cached_policy = self._load()
-            return self._cached_policy
-
-        # Reload-enabled: use mtime checks with a small throttle
-        now = time.monotonic()
-        if (now - self._last_stat_at) < self.min_mtime_interval_s and self._cached_policy is not None:
-            return self._cached_policy
-        self._last_stat_at = now
+        # stat before read: if the file changes while we read it, the next
+        # refresh sees a different key and reloads again.
+        try:
+            st = self._stat()
+            policy, compiled, size = self._load()
+        except PolicyProviderError:
+            POLICY_LOAD_FAILURES_TOTAL.inc()
+            raise
+        return PolicySnapshot(
+            policy=policy,
+            compiled=compiled,
+            mtime=st.st_mtime,
+            generation=next(_generations),
+            source_bytes=size,
+            file_key=_file_key(st),
+        )
 
+    def _stat(self) -> os.stat_result:
         try:
-            mtime = self.policy_path.stat().st_mtime
+            return self.policy_path.stat()
+        except FileNotFoundError as e:
+            raise PolicyNotFoundError(f"Policy file not found: {self.policy_path}") from e
         except OSError as e:
             raise PolicyProviderError(f"Cannot stat policy file: {self.policy_path}") from e
 
-        if self._cached_policy is None or self._cached_mtime is None or mtime != self._cached_mtime:
-            self._cached_policy = self._load()
-            self._cached_mtime = mtime
+    def _load(self) -> Tuple[Policy, CompiledPolicy, int]:
+        try:
+            raw = self.policy_path.read_bytes()
+        except OSError as e:
+            raise PolicyProviderError(f"Could not read policy file: {self.policy_path}") from e
 
-        return self._cached_policy
+        cache = self.snapshot_cache
+        digest = content_digest(raw) if cache is not None else None
+        if cache is not None:
+            cached = cache.load(digest)
+            if cached is not None:
+                self._check_id(cached[0])
+                return (*cached, len(raw))
 
-    def _load(self) -> Policy:
         try:
-            return load_policy_from_file(self.policy_path)
+            policy = load_policy_from_str(raw.decode("utf-8"))
+        except UnicodeDecodeError as e:
+            raise PolicyProviderError(f"Failed to load policy from {self.policy_path}: not UTF-8: {e}") from e
         except PolicyLoadError as e:
             raise PolicyProviderError(f"Failed to load policy from {self.policy_path}: {e}") from e
+        self._check_id(policy)
+        compiled = compile_policy(policy)
 
+        if cache is not None:
+            cache.store(digest, policy, compiled)
+        return policy, compiled, len(raw)
 
-def policy_provider_from_env() -> PolicyProvider:
+    def _check_id(self, policy: Policy) -> None:
+        if self.expected_policy_id is not None and policy.id != self.expected_policy_id:
+            raise PolicyProviderError(
+                f"Policy file {self.policy_path} has id {policy.id!r}, expected {self.expected_policy_id!r}"
+            )
+
+
+def _file_key(st: os.stat_result) -> Tuple[int, ...]:
+    # mtime_ns alone misses rewrites within the filesystem's timestamp
+    # granularity; a rename-into-place always changes the inode.
+    return (st.st_mtime_ns, st.st_size, st.st_ino, st.st_dev)
+
+
+_Settings = Tuple[Path, bool, float, Optional[Path], str, float]
+
+
+@resolved_once
+def _settings_from_env() -> _Settings:
     path = os.getenv("AUTHZ_POLICY_PATH")
     if not path:
         raise PolicyProviderError("AUTHZ_POLICY_PATH must be set (path to policy JSON file)")
 
     reload_enabled = os.getenv("AUTHZ_POLICY_RELOAD", "1").strip() != "0"
     min_mtime_interval_s = float(os.getenv("AUTHZ_POLICY_MIN_MTIME_S", "0.5"))
+    cache_dir = os.getenv("AUTHZ_POLICY_CACHE_DIR", "").strip()
+    watch, debounce_s = watch_settings_from_env()
+    return Path(path), reload_enabled, min_mtime_interval_s, Path(cache_dir) if cache_dir else None, watch, debounce_s
+
+
+def watch_settings_from_env() -> Tuple[str, float]:
+    """(AUTHZ_POLICY_WATCH, AUTHZ_POLICY_DEBOUNCE_MS in seconds); shared with the policy registry."""
+    watch = os.getenv("AUTHZ_POLICY_WATCH", "auto").strip()
+    debounce_s = float(os.getenv("AUTHZ_POLICY_DEBOUNCE_MS", "50")) / 1000
+    return watch, debounce_s
+
+
+def policy_provider_from_env() -> PolicyProvider:
+    """Build a new (unstarted) provider from env. Most callers want get_policy_provider()."""
+    return _build_provider(_settings_from_env())
+
 
+_provider: Optional[PolicyProvider] = None
+_provider_settings: Optional[_Settings] = None
+_provider_lock = threading.Lock()
+
+
+def get_policy_provider() -> PolicyProvider:
+    """
+    Process-wide provider.
+
+    Built on first use and reused afterwards. Env is read once (see
+    app.settings); the provider is only rebuilt after reload_settings() picks
+    up a different configuration (which in practice only happens in tests).
+    """
+    global _provider, _provider_settings
+    settings = _settings_from_env()
+    if settings is _provider_settings:
+        return _provider
+
+    with _provider_lock:
+        if settings is not _provider_settings:
+            if _provider is None or _settings_of(_provider) != settings:
+                if _provider is not None:
+                    _provider.stop()
+                _provider = _build_provider(settings)
+                _provider.start()
+            _provider_settings = settings
+        return _provider
+
+
+def shutdown_policy_provider() -> None:
+    global _provider, _provider_settings
+    with _provider_lock:
+        if _provider is not None:
+            _provider.stop()
+        _provider = None
+        _provider_settings = None
+
+
+def _build_provider(settings: _Settings) -> PolicyProvider:
+    path, reload_enabled, min_mtime_interval_s, cache_dir, watch, debounce_s = settings
     return PolicyProvider(
-        policy_path=Path(path),
+        policy_path=path,
         reload_enabled=reload_enabled,
         min_mtime_interval_s=min_mtime_interval_s,
+        watch=watch,
+        debounce_s=debounce_s,
+        snapshot_cache=CompiledPolicyCache(cache_dir) if cache_dir is not None else None,
+    )
+
+
+def _settings_of(provider: PolicyProvider) -> _Settings:
+    cache = provider.snapshot_cache
+    return (
+        provider.policy_path,
+        provider.reload_enabled,
+        provider.min_mtime_interval_s,
+        cache.directory if cache is not None else None,
+        provider.watch,
+        provider.debounce_s,
     )
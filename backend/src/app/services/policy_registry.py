@@ -0,0 +1,383 @@
+from __future__ import annotations
+
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+from app.services.metrics import POLICY_REGISTRY_EVICTIONS_TOTAL
+from app.services.policy_cache import CompiledPolicyCache
+from app.services.policy_provider import (
+    PolicyNotFoundError,
+    PolicyProvider,
+    PolicyProviderError,
+    PolicySnapshot,
+    watch_settings_from_env,
+)
+from app.services.policy_watcher import PolicyWatcher
+from app.settings import resolved_once
+
+
+logger = logging.getLogger(__name__)
+
+# Policy ids double as file names, so they are restricted to a safe alphabet
+_POLICY_ID_RE = re.compile(r"^[A-Za-z0-9._-]{1,128}$")
+
+
+class PolicySelectionError(PolicyProviderError):
+    """The request did not name a usable policy id."""
+
+
+class UnknownPolicyError(PolicyProviderError):
+    """The request named a policy that does not exist."""
+
+
+class PolicyRegistry:
+    """
+    Many policies, one per tenant, loaded lazily from a directory.
+
+    Design notes:
+    - Policy `<id>` lives in `<directory>/<id>.json` and its `id` field must be
+      `<id>`. Each one gets its own PolicyProvider, so it is validated, compiled,
+      published and reloaded exactly like the single active policy.
+    - Loaded policies are kept in an LRU bounded both by count (max_entries) and
+      by the total size of their policy files (max_bytes, a proxy for compiled
+      size). Pinned ids are loaded at start() and never evicted.
+    - A policy only enters the LRU once it has loaded. Ids whose file does not
+      exist are rejected before anything is created, and a policy that is
+      still loading (or failed to) is kept aside, so requests naming unknown or
+      broken policies cannot evict loaded ones.
+    - An evicted policy is only dropped from the registry: requests holding one
+      of its snapshots finish with it, and the next request loads it again
+      (cheaply, with a snapshot_cache).
+    - One PolicyWatcher on the directory refreshes the loaded policies whose
+      files changed; a policy whose file was deleted is dropped, one that fails
+      to load keeps its last good snapshot.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        *,
+        max_entries: int = 256,
+        max_bytes: int = 64 * 1024 * 1024,
+        pinned: Iterable[str] = (),
+        default_policy_id: Optional[str] = None,
+        reload_enabled: bool = True,
+        min_mtime_interval_s: float = 0.5,
+        watch: str = "auto",
+        debounce_s: float = 0.05,
+        snapshot_cache: Optional[CompiledPolicyCache] = None,
+    ) -> None:
+        if max_entries <= 0:
+            raise ValueError("max_entries must be positive")
+        self.directory = directory
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.pinned: FrozenSet[str] = frozenset(_check_policy_id(p) for p in pinned)
+        self.default_policy_id = _check_policy_id(default_policy_id) if default_policy_id else None
+        self.reload_enabled = reload_enabled
+        self.min_mtime_interval_s = min_mtime_interval_s
+        self.watch = watch
+        self.debounce_s = debounce_s
+        self.snapshot_cache = snapshot_cache
+
+        self._lock = threading.Lock()
+        self._providers: "OrderedDict[str, PolicyProvider]" = OrderedDict()  # loaded
+        self._loading: Dict[str, PolicyProvider] = {}  # not loaded yet (pinned: or failed)
+        self._bytes: Dict[str, int] = {}  # source_bytes of each loaded policy
+        self._watcher: Optional[PolicyWatcher] = None
+
+        self.evictions = 0
+
+    def published(self, policy_id: Optional[str]) -> Optional[PolicySnapshot]:
+        """
+        The selected policy's snapshot without loading it; None if it is not
+        loaded yet (call snapshot() off the event loop).
+        """
+        policy_id = self.resolve(policy_id)
+        with self._lock:
+            provider = self._providers.get(policy_id)
+            if provider is None:
+                return None
+            self._providers.move_to_end(policy_id)
+        return provider.published()
+
+    def snapshot(self, policy_id: Optional[str]) -> PolicySnapshot:
+        """The selected policy's snapshot, loading it on first use."""
+        policy_id = self.resolve(policy_id)
+        provider = self._provider(policy_id)
+        if provider is None:
+            raise UnknownPolicyError(f"Unknown policy: {policy_id}")
+        try:
+            return provider.snapshot()
+        except PolicyNotFoundError as e:
+            self._discard(policy_id, provider)
+            raise UnknownPolicyError(f"Unknown policy: {policy_id}") from e
+        except PolicyProviderError:
+            self._discard(policy_id, provider)
+            raise
+
+    def resolve(self, policy_id: Optional[str]) -> str:
+        """The requested id, or the default; raises PolicySelectionError if neither is usable."""
+        if policy_id is None:
+            if self.default_policy_id is None:
+                raise PolicySelectionError("No policy id given and no default policy is configured")
+            return self.default_policy_id
+        return _check_policy_id(policy_id)
+
+    def start(self) -> None:
+        """Load pinned policies and start watching the directory."""
+        for policy_id in sorted(self.pinned):
+            try:
+                self.snapshot(policy_id)
+            except PolicyProviderError as e:
+                logger.warning("Pinned policy %s not loaded at startup: %s", policy_id, e)
+
+        if not self.reload_enabled or self._watcher is not None:
+            return
+        self._watcher = PolicyWatcher(
+            self.directory,
+            self._on_change,
+            mode=self.watch,
+            poll_interval_s=self.min_mtime_interval_s,
+            debounce_s=self.debounce_s,
+            name="authz-policy-registry-watch",
+        )
+        self._watcher.start()
+
+    def stop(self) -> None:
+        watcher = self._watcher
+        if watcher is not None:
+            watcher.stop()
+        self._watcher = None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            providers = list(self._providers.items())
+            total = sum(self._bytes.values())
+        policies: List[Dict[str, Any]] = []
+        for policy_id, provider in providers:
+            snap = provider.published()
+            policies.append(
+                {
+                    "policy_id": policy_id,
+                    "policy_version": snap.policy.version if snap is not None else None,
+                    "source_bytes": snap.source_bytes if snap is not None else 0,
+                    "pinned": policy_id in self.pinned,
+                }
+            )
+        return {
+            "size": len(providers),
+            "max_entries": self.max_entries,
+            "bytes": total,
+            "max_bytes": self.max_bytes,
+            "evictions": self.evictions,
+            "policies": policies,  # least recently used first
+        }
+
+    # ----------------------------
+    # Internals
+    # ----------------------------
+
+    def _provider(self, policy_id: str) -> Optional[PolicyProvider]:
+        """The id's provider; None if it is not loaded and has no policy file."""
+        with self._lock:
+            provider = self._providers.get(policy_id)
+            if provider is not None:
+                self._providers.move_to_end(policy_id)
+                return provider
+            provider = self._loading.get(policy_id)
+            if provider is not None:
+                return provider
+
+        # Pinned ids get a provider regardless, so that reload picks up their file
+        if policy_id not in self.pinned and not (self.directory / f"{policy_id}.json").exists():
+            return None
+        with self._lock:
+            provider = self._providers.get(policy_id) or self._loading.get(policy_id)
+            if provider is None:
+                provider = PolicyProvider(
+                    policy_path=self.directory / f"{policy_id}.json",
+                    reload_enabled=False,  # reloaded by this registry's watcher
+                    min_mtime_interval_s=self.min_mtime_interval_s,
+                    snapshot_cache=self.snapshot_cache,
+                    expected_policy_id=policy_id,
+                )
+                provider.on_publish = lambda snap, pid=policy_id, p=provider: self._published(pid, p, snap)
+                self._loading[policy_id] = provider
+            return provider
+
+    def _published(self, policy_id: str, provider: PolicyProvider, snap: PolicySnapshot) -> None:
+        with self._lock:
+            if self._loading.get(policy_id) is provider:
+                # First load: only now does it take an LRU slot
+                del self._loading[policy_id]
+                self._providers[policy_id] = provider
+            elif self._providers.get(policy_id) is not provider:
+                return  # evicted or dropped while loading
+            self._bytes[policy_id] = snap.source_bytes
+            self._evict()
+
+    def _evict(self) -> None:
+        # Caller holds self._lock. The most recently used entry always stays,
+        # even if it alone exceeds max_bytes.
+        total = sum(self._bytes.values())
+        candidates = [pid for pid in list(self._providers)[:-1] if pid not in self.pinned]
+        for policy_id in candidates:
+            if len(self._providers) <= self.max_entries and total <= self.max_bytes:
+                break
+            del self._providers[policy_id]
+            total -= self._bytes.pop(policy_id, 0)
+            self.evictions += 1
+            POLICY_REGISTRY_EVICTIONS_TOTAL.inc()
+
+    def _discard(self, policy_id: str, provider: PolicyProvider) -> None:
+        # A policy that failed its first load is forgotten (unless pinned, so
+        # that reload keeps retrying it)
+        if policy_id in self.pinned:
+            return
+        with self._lock:
+            if self._loading.get(policy_id) is provider:
+                del self._loading[policy_id]
+
+    def _on_change(self, names: Optional[Set[str]]) -> None:
+        # Only the named policies, unless an event cannot be tied to one
+        # (polling, overflow, or a name that is not <id>.json, e.g. a symlink swap)
+        ids: Optional[Set[str]] = None
+        if names is not None:
+            ids = {name[: -len(".json")] for name in names if name.endswith(".json")}
+            if len(ids) != len(names):
+                ids = None
+        self._refresh(ids)
+
+    def _refresh(self, ids: Optional[Set[str]] = None) -> None:
+        with self._lock:
+            providers = [
+                (pid, p)
+                for pid, p in (*self._providers.items(), *self._loading.items())
+                if ids is None or pid in ids
+            ]
+        for policy_id, provider in providers:
+            if provider.published() is None and policy_id not in self.pinned:
+                continue  # first load in progress (or failed) on a request path
+            try:
+                provider.refresh()
+            except PolicyNotFoundError:
+                if policy_id in self.pinned:
+                    logger.warning("Pinned policy file missing; keeping last good policy: %s", policy_id)
+                    continue
+                logger.info("Policy file removed; dropping policy %s", policy_id)
+                with self._lock:
+                    if self._providers.get(policy_id) is provider:
+                        del self._providers[policy_id]
+                        self._bytes.pop(policy_id, None)
+                    elif self._loading.get(policy_id) is provider:
+                        del self._loading[policy_id]
+            except PolicyProviderError as e:
+                logger.warning("Policy reload failed for %s; keeping last good policy: %s", policy_id, e)
+
+
+def _check_policy_id(policy_id: str) -> str:
+    if not _POLICY_ID_RE.match(policy_id):
+        raise PolicySelectionError(f"Invalid policy id: {policy_id!r}")
+    return policy_id
+
+
+_Settings = Tuple[Path, int, int, Tuple[str, ...], Optional[str], bool, float, str, float, Optional[Path]]
+
+
+@resolved_once
+def _settings_from_env() -> Optional[_Settings]:
+    directory = os.getenv("AUTHZ_POLICY_DIR", "").strip()
+    if not directory:
+        return None
+    max_entries = int(os.getenv("AUTHZ_POLICY_REGISTRY_SIZE", "256"))
+    max_bytes = int(float(os.getenv("AUTHZ_POLICY_REGISTRY_MAX_MB", "64")) * 1024 * 1024)
+    pinned = tuple(sorted(p.strip() for p in os.getenv("AUTHZ_POLICY_PINNED", "").split(",") if p.strip()))
+    default_policy_id = os.getenv("AUTHZ_DEFAULT_POLICY_ID", "").strip() or None
+    reload_enabled = os.getenv("AUTHZ_POLICY_RELOAD", "1").strip() != "0"
+    min_mtime_interval_s = float(os.getenv("AUTHZ_POLICY_MIN_MTIME_S", "0.5"))
+    watch, debounce_s = watch_settings_from_env()
+    cache_dir = os.getenv("AUTHZ_POLICY_CACHE_DIR", "").strip()
+    return (
+        Path(directory),
+        max_entries,
+        max_bytes,
+        pinned,
+        default_policy_id,
+        reload_enabled,
+        min_mtime_interval_s,
+        watch,
+        debounce_s,
+        Path(cache_dir) if cache_dir else None,
+    )
+
+
+_registry: Optional[PolicyRegistry] = None
+_registry_settings: Optional[_Settings] = None
+_registry_lock = threading.Lock()
+
+
+def get_policy_registry() -> Optional[PolicyRegistry]:
+    """
+    Process-wide registry, or None in single-policy mode.
+
+    Enabled by AUTHZ_POLICY_DIR; then AUTHZ_POLICY_PATH is not used. Env is read
+    once (see app.settings); the registry is only rebuilt after reload_settings()
+    picks up a different configuration (which in practice only happens in tests).
+    """
+    global _registry, _registry_settings
+    settings = _settings_from_env()
+    if settings is _registry_settings:
+        return _registry
+
+    with _registry_lock:
+        if settings != _registry_settings:
+            if _registry is not None:
+                _registry.stop()
+                _registry = None
+            if settings is not None:
+                _registry = _build_registry(settings)
+                _registry.start()
+        _registry_settings = settings
+        return _registry
+
+
+def _build_registry(settings: _Settings) -> PolicyRegistry:
+    (
+        directory,
+        max_entries,
+        max_bytes,
+        pinned,
+        default_policy_id,
+        reload_enabled,
+        interval,
+        watch,
+        debounce_s,
+        cache_dir,
+    ) = settings
+    return PolicyRegistry(
+        directory,
+        max_entries=max_entries,
+        max_bytes=max_bytes,
+        pinned=pinned,
+        default_policy_id=default_policy_id,
+        reload_enabled=reload_enabled,
+        min_mtime_interval_s=interval,
+        watch=watch,
+        debounce_s=debounce_s,
+        snapshot_cache=CompiledPolicyCache(cache_dir) if cache_dir is not None else None,
+    )
+
+
+def shutdown_policy_registry() -> None:
+    global _registry, _registry_settings
+    with _registry_lock:
+        if _registry is not None:
+            _registry.stop()
+        _registry = None
+        _registry_settings = None
@@ -0,0 +1,202 @@
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Optional, Set, Tuple
+
+
+logger = logging.getLogger(__name__)
+
+WATCH_MODES = ("auto", "inotify", "poll")
+
+# <sys/inotify.h>
+_IN_MODIFY = 0x00000002
+_IN_ATTRIB = 0x00000004
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_DELETE_SELF = 0x00000400
+_IN_MOVE_SELF = 0x00000800
+_IN_Q_OVERFLOW = 0x00004000
+_IN_IGNORED = 0x00008000
+_IN_NONBLOCK = os.O_NONBLOCK
+_IN_CLOEXEC = 0o2000000
+
+# Writes, rename-into-place (both ends) and deletes of anything in the directory
+_WATCH_MASK = (
+    _IN_MODIFY | _IN_ATTRIB | _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO
+    | _IN_CREATE | _IN_DELETE | _IN_DELETE_SELF | _IN_MOVE_SELF
+)
+_EVENT = struct.Struct("iIII")  # wd, mask, cookie, len; then len bytes of name
+
+# How often the inotify loop wakes up to notice stop() while idle
+_IDLE_WAKEUP_S = 0.25
+
+# Called with the names of changed directory entries, or None when they are
+# unknown (polling, or the kernel queue overflowed): check everything.
+ChangeCallback = Callable[[Optional[Set[str]]], None]
+
+
+class PolicyWatcher:
+    """
+    Background thread that reports changes to the files of one directory.
+
+    Design notes:
+    - inotify (Linux, through libc via ctypes) watches the directory rather than
+      the file, so atomic rename-into-place and symlink swaps are seen, not
+      only in-place writes.
+    - Events are debounced: on_change runs once a burst has been quiet for
+      debounce_s (or has lasted max_delay_s), so a writer's several syscalls
+      give one reload, of the finished file.
+    - Without inotify (other platforms, or the watch could not be set up) it
+      falls back to calling on_change(None) every poll_interval_s.
+    - on_change runs on the watcher thread and must not raise; it is where
+      the file is stat'ed, loaded and validated, never on a request path.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        on_change: ChangeCallback,
+        *,
+        mode: str = "auto",
+        poll_interval_s: float = 0.5,
+        debounce_s: float = 0.05,
+        name: str = "authz-policy-watch",
+    ) -> None:
+        if mode not in WATCH_MODES:
+            raise ValueError(f"watch mode must be one of {WATCH_MODES}, got {mode!r}")
+        self.directory = directory
+        self.on_change = on_change
+        self.mode = mode
+        self.poll_interval_s = max(poll_interval_s, 0.01)
+        self.debounce_s = debounce_s
+        self.max_delay_s = max(debounce_s * 10, 1.0)
+        self.name = name
+        self.backend: Optional[str] = None  # "inotify" or "poll" once started
+
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        fd = _inotify_watch(self.directory) if self.mode != "poll" else None
+        if fd is None and self.mode == "inotify":
+            logger.warning("inotify unavailable for %s; polling every %ss", self.directory, self.poll_interval_s)
+        self.backend = "inotify" if fd is not None else "poll"
+        self._thread = threading.Thread(target=self._run, args=(fd,), name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout=5)
+        self._thread = None
+
+    # ----------------------------
+    # Internals
+    # ----------------------------
+
+    def _run(self, fd: Optional[int]) -> None:
+        if fd is not None:
+            try:
+                if self._watch_inotify(fd):
+                    return
+            finally:
+                os.close(fd)
+            logger.warning("Watched directory %s went away; polling every %ss", self.directory, self.poll_interval_s)
+            self.backend = "poll"
+        while not self._stop.wait(self.poll_interval_s):
+            self._notify(None)
+
+    def _watch_inotify(self, fd: int) -> bool:
+        """Returns True when stopped, False if the watch was lost."""
+        poller = select.poll()
+        poller.register(fd, select.POLLIN)
+        pending: Set[str] = set()
+        unknown = False
+        first_event_at: Optional[float] = None
+
+        while not self._stop.is_set():
+            timeout = self.debounce_s if first_event_at is not None else _IDLE_WAKEUP_S
+            if poller.poll(timeout * 1000):
+                names, overflow, lost = _read_events(fd)
+                pending |= names
+                unknown = unknown or overflow
+                if lost:
+                    self._notify(None)
+                    return False
+                if first_event_at is None:
+                    first_event_at = time.monotonic()
+                if time.monotonic() - first_event_at < self.max_delay_s:
+                    continue
+            if first_event_at is not None:
+                self._notify(None if unknown else pending)
+                pending, unknown, first_event_at = set(), False, None
+        return True
+
+    def _notify(self, names: Optional[Set[str]]) -> None:
+        try:
+            self.on_change(names)
+        except Exception:
+            logger.exception("Policy change handler failed")
+
+
+def _inotify_watch(directory: Path) -> Optional[int]:
+    """An inotify fd watching directory, or None if inotify cannot be used."""
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        init1 = libc.inotify_init1
+        add_watch = libc.inotify_add_watch
+    except (OSError, AttributeError):
+        return None
+    add_watch.argtypes = (ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32)
+
+    fd = init1(_IN_NONBLOCK | _IN_CLOEXEC)
+    if fd < 0:
+        logger.warning("inotify_init1 failed: %s", os.strerror(ctypes.get_errno()))
+        return None
+    if add_watch(fd, os.fsencode(directory), _WATCH_MASK) < 0:
+        logger.warning("inotify_add_watch(%s) failed: %s", directory, os.strerror(ctypes.get_errno()))
+        os.close(fd)
+        return None
+    return fd
+
+
+def _read_events(fd: int) -> Tuple[Set[str], bool, bool]:
+    """Drain fd: (changed names, queue overflowed, watch lost)."""
+    names: Set[str] = set()
+    overflow = lost = False
+    while True:
+        try:
+            buf = os.read(fd, 64 * 1024)
+        except BlockingIOError:
+            break
+        offset = 0
+        while offset + _EVENT.size <= len(buf):
+            _, mask, _, length = _EVENT.unpack_from(buf, offset)
+            offset += _EVENT.size
+            name = buf[offset : offset + length].rstrip(b"\0")
+            offset += length
+            if mask & _IN_Q_OVERFLOW:
+                overflow = True
+            if mask & (_IN_DELETE_SELF | _IN_MOVE_SELF | _IN_IGNORED):
+                lost = True
+            if name:
+                names.add(os.fsdecode(name))
+    return names, overflow, lost
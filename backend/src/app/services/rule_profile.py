@@ -0,0 +1,322 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import random
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, TypeVar
+
+from app.domain.compiled_policy import CompiledPolicy
+from app.domain.evaluator import evaluate
+from app.domain.types import AuthorizationDecision, AuthorizationRequest
+from app.services.metrics import LATENCY_BUCKETS_NS, HistogramChild, Sharded
+from app.settings import resolved_once
+
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class _PolicyProfile:
+    """
+    Counters for one policy version.
+
+    Cells (per thread, see Sharded): one match count per rule id, then one
+    evaluation count per (action, resource_type) bucket, then the evaluations
+    that found no bucket, then the decisions served from the decision cache and
+    the decisions of /v1/authorize:actions and :filter. A rule's check count is
+    derived when reading: the evaluations of every bucket it is in.
+    """
+
+    __slots__ = (
+        "compiled",
+        "rule_ids",
+        "rule_slots",
+        "bucket_slots",
+        "unindexed_slot",
+        "cached_slot",
+        "actions_filter_slot",
+        "cells",
+        "latency",
+    )
+
+    def __init__(self, compiled: CompiledPolicy) -> None:
+        self.compiled = compiled
+        # Matches are only reported by id, so rules sharing an id share counters
+        self.rule_ids: List[str] = list(dict.fromkeys(r.id for r in compiled.rules))
+        self.rule_slots: Dict[str, int] = {rid: i for i, rid in enumerate(self.rule_ids)}
+        n = len(self.rule_ids)
+        self.bucket_slots: Dict[Tuple[str, str], int] = {key: n + i for i, key in enumerate(compiled.buckets)}
+        self.unindexed_slot = n + len(self.bucket_slots)
+        self.cached_slot = self.unindexed_slot + 1
+        self.actions_filter_slot = self.unindexed_slot + 2
+        self.cells = Sharded(self.unindexed_slot + 3)
+        self.latency = HistogramChild(LATENCY_BUCKETS_NS)
+
+    def observe(self, req: AuthorizationRequest, decision: AuthorizationDecision, ns: int) -> None:
+        shard = self.cells.shard()
+        shard[self.bucket_slots.get((req.action, req.resource.type), self.unindexed_slot)] += 1
+        rule_slots = self.rule_slots
+        for rid in decision.matched_rule_ids:
+            shard[rule_slots[rid]] += 1
+        self.latency.observe_ns(ns)
+
+    def count(self, decision: AuthorizationDecision, slot: int) -> None:
+        # A decision made without a timed evaluate(): its matches, and slot
+        shard = self.cells.shard()
+        shard[slot] += 1
+        rule_slots = self.rule_slots
+        for rid in decision.matched_rule_ids:
+            shard[rule_slots[rid]] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        totals = self.cells.totals()
+        n = len(self.rule_ids)
+        checks = [0] * n
+        checked = 0
+        for key, slot in self.bucket_slots.items():
+            evaluations = totals[slot]
+            if not evaluations:
+                continue
+            bucket = self.compiled.buckets[key]
+            checked += evaluations * len(bucket.rules)
+            for rid in dict.fromkeys(r.id for r in bucket.rules):
+                checks[self.rule_slots[rid]] += evaluations
+        evaluations = sum(totals[n : self.unindexed_slot + 1])
+
+        counts, sum_ns = self.latency.snapshot()
+        rules = [
+            {"id": rid, "position": i, "checks": checks[i], "matches": totals[i]}
+            for i, rid in enumerate(self.rule_ids)
+        ]
+        return {
+            "policy_id": self.compiled.id,
+            "policy_version": self.compiled.version,
+            "rules_total": len(self.compiled.rules),
+            "evaluations": evaluations,
+            "unindexed_evaluations": totals[self.unindexed_slot],
+            "cached_decisions": totals[self.cached_slot],
+            "actions_filter_decisions": totals[self.actions_filter_slot],
+            "mean_rules_checked": checked / evaluations if evaluations else 0.0,
+            "latency": _latency(counts, sum_ns),
+            "rules": rules,
+            "never_matched": [r["id"] for r in rules if not r["matches"]],
+        }
+
+
+class RuleProfiler:
+    """
+    Opt-in profile of policy evaluation: per-rule check and match counts and
+    an evaluation time histogram, per policy version.
+
+    Design notes:
+    - Wraps evaluate() rather than living in its loop: counts are derived from
+      the (action, resource_type) bucket the request selects and the matched
+      rule ids the decision reports, so the evaluator is unchanged and costs
+      nothing extra when profiling is off.
+    - A rule is "checked" when it is in the request's bucket, i.e. it is one of
+      the rules evaluate() has to decide on. mean_rules_checked growing with
+      the policy is the sign the buckets have become too coarse.
+    - "matches" counts the rule ids in matched_rule_ids. In short_circuit mode
+      that is only the deciding rule.
+    - Decisions served from the decision cache, and those of
+      /v1/authorize:actions and :filter (which do not go through evaluate()),
+      add to "matches" but not to evaluations, checks or latency; they are
+      counted apart as cached_decisions and actions_filter_decisions. Without
+      that, a rule only ever matched through the cache would look dead.
+    - Counters are per thread (no lock on the hot path). sample_rate < 1
+      profiles that fraction of evaluations; the counts are not scaled.
+    - At most max_policies versions are kept; the oldest is dropped first.
+    """
+
+    def __init__(
+        self,
+        *,
+        sample_rate: float = 1.0,
+        max_policies: int = 64,
+        dump_path: Optional[Path] = None,
+        clock: Callable[[], int] = time.perf_counter_ns,
+    ) -> None:
+        if not 0 < sample_rate <= 1:
+            raise ValueError("sample_rate must be in (0, 1]")
+        self.sample_rate = sample_rate
+        self.max_policies = max(max_policies, 1)
+        self.dump_path = dump_path
+        self._clock = clock
+        self._profiles: "OrderedDict[Tuple[str, str], _PolicyProfile]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def evaluate(self, req: AuthorizationRequest, policy: CompiledPolicy, mode: str) -> AuthorizationDecision:
+        if not self._sampled():
+            return evaluate(req, policy, mode)
+        profile = self._profile(policy)
+        t0 = self._clock()
+        decision = evaluate(req, policy, mode)
+        profile.observe(req, decision, self._clock() - t0)
+        return decision
+
+    def count_cached(self, policy: CompiledPolicy, decision: AuthorizationDecision) -> None:
+        """Count a decision served from the decision cache (see the class notes)."""
+        if self._sampled():
+            profile = self._profile(policy)
+            profile.count(decision, profile.cached_slot)
+
+    def count_decisions(self, policy: CompiledPolicy, decisions: Iterable[AuthorizationDecision]) -> None:
+        """Count the decisions of one /v1/authorize:actions call."""
+        profile = self._profile(policy)
+        for decision in decisions:
+            if self._sampled():
+                profile.count(decision, profile.actions_filter_slot)
+
+    def counting(
+        self, policy: CompiledPolicy, decide: Callable[[T], AuthorizationDecision]
+    ) -> Callable[[T], AuthorizationDecision]:
+        """Wrap a /v1/authorize:filter decide function so each decision it makes is counted."""
+        profile = self._profile(policy)
+
+        def counted(arg: T) -> AuthorizationDecision:
+            decision = decide(arg)
+            if self._sampled():
+                profile.count(decision, profile.actions_filter_slot)
+            return decision
+
+        return counted
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            profiles = list(self._profiles.values())
+        return {
+            "sample_rate": self.sample_rate,
+            "dump_path": str(self.dump_path) if self.dump_path is not None else None,
+            "policies": [p.stats() for p in profiles],
+        }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._profiles.clear()
+
+    def dump(self, path: Optional[Path] = None) -> Path:
+        """Write stats() as JSON to path (default dump_path), atomically."""
+        path = path or self.dump_path
+        if path is None:
+            raise ValueError("No rule profile dump path configured")
+        data = json.dumps({"created_at": time.time(), **self.stats()}, indent=2, sort_keys=True)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+        return path
+
+    def _sampled(self) -> bool:
+        return self.sample_rate >= 1 or random.random() < self.sample_rate
+
+    def _profile(self, policy: CompiledPolicy) -> _PolicyProfile:
+        key = (policy.id, policy.version)
+        profile = self._profiles.get(key)
+        if profile is not None and profile.compiled is policy:
+            return profile
+
+        with self._lock:
+            profile = self._profiles.get(key)
+            if profile is not None and profile.compiled is not policy:
+                if profile.compiled.rules == policy.rules:
+                    # Same version loaded again (registry eviction, cache): keep counting
+                    profile.compiled = policy
+                else:
+                    profile = None  # the version was reused for other rules: start over
+            if profile is None:
+                profile = self._profiles[key] = _PolicyProfile(policy)
+                self._profiles.move_to_end(key)
+                while len(self._profiles) > self.max_policies:
+                    self._profiles.popitem(last=False)
+            return profile
+
+
+def _latency(counts: List[int], sum_ns: int) -> Dict[str, Any]:
+    total = sum(counts)
+    bounds = LATENCY_BUCKETS_NS + (None,)
+
+    def quantile(q: float) -> Optional[int]:
+        # Upper bound of the bucket holding the q-quantile (None: above the last bound)
+        if not total:
+            return None
+        rank = q * total
+        cumulative = 0
+        for bound, n in zip(bounds, counts):
+            cumulative += n
+            if cumulative >= rank:
+                return bound
+        return None
+
+    return {
+        "count": total,
+        "sum_ns": sum_ns,
+        "mean_ns": sum_ns // total if total else 0,
+        "p50_ns": quantile(0.5),
+        "p99_ns": quantile(0.99),
+        "buckets": [[bound, n] for bound, n in zip(bounds, counts) if n],
+    }
+
+
+@resolved_once
+def _settings_from_env() -> Optional[Tuple[float, int, Optional[Path]]]:
+    if os.getenv("AUTHZ_RULE_PROFILE", "0").strip() in ("", "0"):
+        return None
+    sample_rate = float(os.getenv("AUTHZ_RULE_PROFILE_SAMPLE_RATE", "1"))
+    max_policies = int(os.getenv("AUTHZ_RULE_PROFILE_MAX_POLICIES", "64"))
+    dump_path = os.getenv("AUTHZ_RULE_PROFILE_PATH", "").strip()
+    return sample_rate, max_policies, Path(dump_path) if dump_path else None
+
+
+_profiler: Optional[RuleProfiler] = None
+_profiler_settings: Optional[Tuple[float, int, Optional[Path]]] = None
+_profiler_lock = threading.Lock()
+
+
+def get_rule_profiler() -> Optional[RuleProfiler]:
+    """
+    Process-wide rule profiler, or None if disabled.
+
+    Disabled unless AUTHZ_RULE_PROFILE=1. AUTHZ_RULE_PROFILE_SAMPLE_RATE
+    profiles a fraction of evaluations (default 1), AUTHZ_RULE_PROFILE_PATH is
+    where the profile is dumped on shutdown and on request. Env is read once
+    (see app.settings); afterwards this is a lookup.
+    """
+    global _profiler, _profiler_settings
+    settings = _settings_from_env()
+    if settings is _profiler_settings:
+        return _profiler
+
+    with _profiler_lock:
+        if settings != _profiler_settings:
+            if settings is None:
+                _profiler = None
+            else:
+                sample_rate, max_policies, dump_path = settings
+                _profiler = RuleProfiler(sample_rate=sample_rate, max_policies=max_policies, dump_path=dump_path)
+        _profiler_settings = settings
+        return _profiler
+
+
+def shutdown_rule_profiler() -> None:
+    """Dump the profile (if a dump path is configured) and forget it."""
+    global _profiler, _profiler_settings
+    with _profiler_lock:
+        profiler, _profiler = _profiler, None
+        _profiler_settings = None
+    if profiler is not None and profiler.dump_path is not None:
+        try:
+            profiler.dump()
+        except OSError as e:
+            logger.warning("Cannot write rule profile to %s: %s", profiler.dump_path, e)
@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import asyncio
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence
+
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine, make_url
+
+from app.db.audit_table import audit_decisions
+from app.domain.audit import AuditRecord
+
+
+class SqlAuditWriter:
+    """
+    AuditBatchWriter that inserts each batch into the audit_decisions table.
+
+    Design notes:
+    - One transaction and one multi-row INSERT per batch (SQLAlchemy's
+      "insertmanyvalues"), over a pooled connection. Pair with BufferedAuditSink
+      so decisions are grouped instead of costing one round trip each.
+    - Sync drivers (e.g. sqlite) use a regular Engine. Async drivers (the
+      project's postgresql+asyncpg) use an AsyncEngine driven by a private event
+      loop owned by the writer thread.
+    - The table is created by the alembic migration, not here.
+    """
+
+    def __init__(self, url: str, *, pool_size: int = 2) -> None:
+        self.url = url
+        self._is_async = make_url(url).get_dialect().is_async
+        self._engine: Optional[Engine] = None
+        self._async_engine: Any = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._pool_size = pool_size
+
+    def write_batch(self, records: Sequence[AuditRecord]) -> None:
+        rows = [_to_row(r) for r in records]
+        if self._is_async:
+            self._run(self._insert_async(rows))
+        else:
+            with self._sync_engine().begin() as conn:
+                conn.execute(audit_decisions.insert(), rows)
+
+    def sync(self) -> None:
+        # Every batch is its own committed transaction; nothing extra to flush.
+        pass
+
+    def close(self) -> None:
+        if self._engine is not None:
+            self._engine.dispose()
+            self._engine = None
+        if self._async_engine is not None:
+            self._run(self._async_engine.dispose())
+            self._async_engine = None
+        if self._loop is not None:
+            self._loop.close()
+            self._loop = None
+
+    # ----------------------------
+    # Internals
+    # ----------------------------
+
+    def _sync_engine(self) -> Engine:
+        if self._engine is None:
+            self._engine = create_engine(self.url, pool_pre_ping=True)
+        return self._engine
+
+    async def _insert_async(self, rows: List[Dict[str, Any]]) -> None:
+        if self._async_engine is None:
+            from sqlalchemy.ext.asyncio import create_async_engine
+
+            self._async_engine = create_async_engine(
+                self.url,
+                pool_size=self._pool_size,
+                pool_pre_ping=True,
+            )
+        async with self._async_engine.begin() as conn:
+            await conn.execute(audit_decisions.insert(), rows)
+
+    def _run(self, coro) -> Any:
+        if self._loop is None:
+            self._loop = asyncio.new_event_loop()
+        return self._loop.run_until_complete(coro)
+
+
+def _to_row(record: AuditRecord) -> Dict[str, Any]:
+    return {
+        "decision_id": record.decision_id,
+        "correlation_id": record.correlation_id,
+        "policy_id": record.policy_id,
+        "policy_version": record.policy_version,
+        "subject_id": record.subject_id,
+        "action": record.action,
+        "resource_type": record.resource_type,
+        "resource_id": record.resource_id,
+        "decision": record.decision,
+        "reason": record.reason,
+        "matched_rule_ids": list(record.matched_rule_ids),
+        "context": dict(record.context),
+        "created_at": datetime.fromisoformat(record.created_at.replace("Z", "+00:00")),
+        "subject_claims": dict(record.subject_claims) if record.subject_claims is not None else None,
+        "resource_attrs": dict(record.resource_attrs) if record.resource_attrs is not None else None,
+        "evaluation_mode": record.evaluation_mode,
+    }
@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+import functools
+import threading
+from typing import Any, Callable, Dict, TypeVar
+
+T = TypeVar("T")
+
+_resolved: Dict[Callable[[], Any], Any] = {}
+_lock = threading.Lock()
+
+
+def resolved_once(read: Callable[[], T]) -> Callable[[], T]:
+    """
+    Memoize a zero-argument settings reader (the *_settings_from_env() functions).
+
+    The first call reads env; later calls return that same object until
+    reload_settings(), so request paths never touch os.environ and the get_*()
+    singletons can tell "unchanged" by identity. A reader that raises is not
+    memoized and reads env again on the next call.
+    """
+
+    @functools.wraps(read)
+    def wrapper() -> T:
+        try:
+            return _resolved[read]
+        except KeyError:
+            pass
+        value = read()
+        with _lock:
+            return _resolved.setdefault(read, value)
+
+    return wrapper
+
+
+def reload_settings() -> None:
+    """
+    Forget every resolved setting; the next lookup reads env again.
+
+    Called at application startup. Tests that change env call it too: the
+    services built from the old settings are replaced on their next get_*().
+    """
+    with _lock:
+        _resolved.clear()
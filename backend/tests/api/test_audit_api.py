@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+from app.domain.audit import AuditRecord
+from app.main import app
+from app.services.audit_query import AuditQuery, AuditStore, get_audit_store
+from app.services import audit_query
+from app.services.audit_segments import SegmentedJsonlWriter, list_segments, seal_segment
+from app.services.audit_sink import JsonlAuditSink, encode_record
+
+
+def _record(i: int) -> AuditRecord:
+    return AuditRecord(
+        correlation_id=f"cid-{i // 10}",
+        decision_id=f"d{i:03d}",
+        policy_id="p1",
+        policy_version="v1" if i < 50 else "v2",
+        subject_id=f"user:{i % 4}",
+        action="read",
+        resource_type="report",
+        resource_id=None,
+        decision="allow",
+        reason="matched_allow",
+        matched_rule_ids=["r1"],
+        context={},
+        created_at=f"2026-01-27T00:{i // 60:02d}:{i % 60:02d}Z",
+    )
+
+
+def _page_all(client: TestClient, params: dict) -> list:
+    ids, cursor = [], None
+    while True:
+        r = client.get("/v1/audit/decisions", params={**params, **({"cursor": cursor} if cursor else {})})
+        assert r.status_code == 200, r.text
+        body = r.json()
+        ids.extend(x["decision_id"] for x in body["items"])
+        cursor = body.get("next_cursor")
+        if not cursor:
+            return ids
+
+
+def test_audit_query_over_segments(tmp_path: Path, monkeypatch):
+    audit_dir = tmp_path / "audit"
+    writer = SegmentedJsonlWriter(audit_dir, max_bytes=2048, block_bytes=512)
+    for i in range(0, 80, 8):
+        writer.write_batch([_record(j) for j in range(i, i + 8)])
+    writer.close()
+    # one more record in an unsealed, active segment
+    active = SegmentedJsonlWriter(audit_dir)
+    active.write_batch([_record(80)])
+
+    monkeypatch.setenv("AUTHZ_AUDIT_PATH", str(audit_dir))
+    monkeypatch.setenv("AUTHZ_AUDIT_BACKEND", "segments")
+    client = TestClient(app)
+
+    r = client.get("/v1/audit/decisions/d042")
+    assert r.status_code == 200
+    assert r.json()["correlation_id"] == "cid-4"
+    assert client.get("/v1/audit/decisions/d080").json()["policy_version"] == "v2"
+
+    r = client.get("/v1/audit/decisions/nope")
+    assert r.status_code == 404
+    assert r.json()["error"]["code"] == "audit_record_not_found"
+
+    expected = [f"d{i:03d}" for i in range(81) if i % 4 == 1]
+    assert _page_all(client, {"subject_id": "user:1", "limit": 3}) == expected
+
+    assert _page_all(client, {"policy_version": "v2", "subject_id": "user:0", "limit": 2}) == [
+        f"d{i:03d}" for i in range(52, 81, 4)
+    ]
+    assert _page_all(
+        client,
+        {"policy_version": "v1", "since": "2026-01-27T00:00:10Z", "until": "2026-01-27T00:00:13Z"},
+    ) == ["d010", "d011", "d012"]
+
+    r = client.get("/v1/audit/decisions")
+    assert r.status_code == 400
+    assert r.json()["error"]["code"] == "invalid_query"
+
+    # A cursor into the active segment survives the segment being compressed
+    active.write_batch([_record(84), _record(88)])
+    params = {"subject_id": "user:0", "since": "2026-01-27T00:01:20Z", "limit": 1}
+    first = client.get("/v1/audit/decisions", params=params).json()
+    assert [x["decision_id"] for x in first["items"]] == ["d080"]
+    active.close()  # seals and compresses it
+    rest = client.get("/v1/audit/decisions", params={**params, "limit": 5, "cursor": first["next_cursor"]})
+    assert [x["decision_id"] for x in rest.json()["items"]] == ["d084", "d088"]
+
+
+def test_audit_query_over_plain_jsonl_file(tmp_path: Path, monkeypatch):
+    audit_path = tmp_path / "audit.jsonl"
+    sink = JsonlAuditSink(audit_path)
+    sink.write_many([_record(i) for i in range(20)])
+
+    monkeypatch.setenv("AUTHZ_AUDIT_PATH", str(audit_path))
+    monkeypatch.delenv("AUTHZ_AUDIT_BACKEND", raising=False)
+    client = TestClient(app)
+
+    assert _page_all(client, {"correlation_id": "cid-1"}) == [f"d{i:03d}" for i in range(10, 20)]
+    store = get_audit_store()
+    store.wait_for_index(timeout=5)  # built in the background
+    assert (tmp_path / "audit.jsonl.idx").exists()
+
+    # Appended after the index was built: served from the unindexed tail
+    sink.write_many([_record(i) for i in range(21, 25)])
+    assert _page_all(client, {"correlation_id": "cid-2"}) == [f"d{i:03d}" for i in range(21, 25)]
+
+    # A cursor taken from the tail stays valid once the index covers it
+    first = client.get("/v1/audit/decisions", params={"correlation_id": "cid-2", "limit": 2}).json()
+    store.reindex_bytes = 0
+    store.query(AuditQuery(correlation_id="cid-2"))  # triggers the rebuild
+    store.wait_for_index(timeout=5)
+    rest = client.get("/v1/audit/decisions", params={"correlation_id": "cid-2", "cursor": first["next_cursor"]})
+    assert [x["decision_id"] for x in rest.json()["items"]] == ["d023", "d024"]
+
+
+def test_audit_store_bounds_open_indexes(tmp_path: Path):
+    audit_dir = tmp_path / "audit"
+    writer = SegmentedJsonlWriter(audit_dir, max_bytes=2048, block_bytes=512)
+    for i in range(0, 80, 8):
+        writer.write_batch([_record(j) for j in range(i, i + 8)])
+    writer.close()
+    segments = list_segments(audit_dir)
+    assert len(segments) > 2
+
+    store = AuditStore(audit_dir, max_open_indexes=2)
+    page = store.query(AuditQuery(subject_id="user:1", limit=100))
+    assert [x["decision_id"] for x in page.items] == [f"d{i:03d}" for i in range(80) if i % 4 == 1]
+    assert len(store._indexes) == 2
+
+    # A segment removed (e.g. by retention) takes its index with it
+    last = segments[-1]
+    assert store.get("d079")["decision_id"] == "d079"
+    assert last.index_path in store._indexes
+    last.data_path.unlink()
+    last.index_path.unlink()
+    assert store.get("d079") is None
+    assert last.index_path not in store._indexes
+    store.close()
+
+
+def test_audit_store_survives_a_segment_sealed_while_listed(tmp_path: Path, monkeypatch):
+    audit_dir = tmp_path / "audit"
+    writer = SegmentedJsonlWriter(audit_dir, max_bytes=2048, block_bytes=512)
+    writer.write_batch([_record(j) for j in range(8)])
+    writer.close()
+    sealed_seq = list_segments(audit_dir)[-1].seq
+
+    def unsealed_segment(seq: int, records) -> None:
+        path = audit_dir / f"audit-{seq:08d}.jsonl"
+        path.write_text("".join(encode_record(r) + "\n" for r in records), encoding="utf-8")
+
+    # The store lists a segment while it is plain .jsonl; the sealer replaces
+    # it with .gz + .idx before the store opens it
+    def list_then_seal(directory):
+        segments = list_segments(directory)
+        for segment in segments:
+            if not segment.sealed:
+                seal_segment(segment.data_path)
+        return segments
+
+    store = AuditStore(audit_dir)
+    monkeypatch.setattr(audit_query, "list_segments", list_then_seal)
+    unsealed_segment(sealed_seq + 1, [_record(j) for j in range(8, 16)])
+    assert store.get("d013")["decision_id"] == "d013"
+
+    unsealed_segment(sealed_seq + 2, [_record(j) for j in range(16, 24)])
+    page = store.query(AuditQuery(subject_id="user:1", limit=100))
+    assert [x["decision_id"] for x in page.items] == [f"d{i:03d}" for i in range(24) if i % 4 == 1]
+    store.close()
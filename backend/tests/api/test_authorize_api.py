@@ -6,6 +6,7 @@ import json
 from fastapi.testclient import TestClient
 
 from app.main import app
+from app.settings import reload_settings
 
 
 def test_authorize_endpoint_allow(tmp_path: Path, monkeypatch):
@@ -98,3 +99,507 @@ def test_authorize_writes_audit_when_enabled(tmp_path: Path, monkeypatch):
     assert obj["decision"] == "allow"
     assert obj["policy_id"] == "p1"
     assert obj["correlation_id"] == cid
+    # Inputs are only captured on request (AUTHZ_AUDIT_CAPTURE_INPUTS=1)
+    assert obj.get("subject_claims") is None
+
+
+def test_authorize_batch_reports_per_item_results(tmp_path: Path, monkeypatch):
+    policy_file = tmp_path / "policy.json"
+    policy_file.write_text(
+        """
+        {
+          "id": "p1",
+          "version": "v1",
+          "rules": [
+            {
+              "id": "r1",
+              "effect": "allow",
+              "actions": ["read"],
+              "resource_type": "report",
+              "subject_claims": {"role":"analyst"}
+            }
+          ]
+        }
+        """,
+        encoding="utf-8",
+    )
+    audit_path = tmp_path / "audit.jsonl"
+
+    monkeypatch.setenv("AUTHZ_POLICY_PATH", str(policy_file))
+    monkeypatch.setenv("AUTHZ_POLICY_RELOAD", "0")
+    monkeypatch.setenv("AUTHZ_AUDIT_PATH", str(audit_path))
+
+    client = TestClient(app)
+    item = {
+        "subject": {"id": "user:1", "claims": {"role": "analyst"}},
+        "action": "read",
+        "resource": {"type": "report", "id": "rpt:1"},
+    }
+    r = client.post(
+        "/v1/authorize:batch",
+        json={"items": [item, {"subject": {"id": "user:2"}}, {**item, "action": "write"}]},
+    )
+    assert r.status_code == 200
+    results = r.json()["results"]
+    assert [x["index"] for x in results] == [0, 1, 2]
+
+    assert results[0]["result"]["decision"] == "allow"
+    assert results[0]["result"]["matched_rule_ids"] == ["r1"]
+    assert "error" not in results[0]
+
+    assert results[1]["error"]["code"] == "invalid_request"
+    assert "result" not in results[1]
+
+    assert results[2]["result"]["decision"] == "deny"
+    assert results[2]["result"]["reason"] == "deny_by_default"
+
+    lines = [json.loads(line) for line in audit_path.read_text(encoding="utf-8").splitlines()]
+    assert [x["decision_id"] for x in lines] == [
+        results[0]["result"]["decision_id"],
+        results[2]["result"]["decision_id"],
+    ]
+    assert {x["correlation_id"] for x in lines} == {r.headers["X-Correlation-Id"]}
+
+
+def test_authorize_decision_cache_keeps_fresh_decision_ids(tmp_path: Path, monkeypatch):
+    policy_file = tmp_path / "policy.json"
+    policy_file.write_text(
+        '{"id": "p1", "version": "v1", "rules": ['
+        '{"id": "r1", "effect": "allow", "actions": ["read"], "resource_type": "report"}]}',
+        encoding="utf-8",
+    )
+    audit_path = tmp_path / "audit.jsonl"
+
+    monkeypatch.setenv("AUTHZ_POLICY_PATH", str(policy_file))
+    monkeypatch.setenv("AUTHZ_POLICY_RELOAD", "0")
+    monkeypatch.setenv("AUTHZ_AUDIT_PATH", str(audit_path))
+    monkeypatch.setenv("AUTHZ_DECISION_CACHE_SIZE", "16")
+
+    client = TestClient(app)
+    payload = {
+        "subject": {"id": "user:1", "claims": {}},
+        "action": "read",
+        "resource": {"type": "report"},
+    }
+    before = client.get("/v1/admin/decision-cache").json()
+    first = client.post("/v1/authorize", json=payload).json()
+    second = client.post("/v1/authorize", json=payload).json()
+    after = client.get("/v1/admin/decision-cache").json()
+
+    assert first["decision"] == second["decision"] == "allow"
+    assert first["decision_id"] != second["decision_id"]
+    assert after["hits"] == before["hits"] + 1
+
+    lines = audit_path.read_text(encoding="utf-8").splitlines()
+    assert [json.loads(x)["decision_id"] for x in lines] == [first["decision_id"], second["decision_id"]]
+
+
+def test_metrics_endpoint_reports_authorize_stages(tmp_path: Path, monkeypatch):
+    policy_file = tmp_path / "policy.json"
+    policy_file.write_text(
+        json.dumps(
+            {
+                "id": "p1",
+                "version": "v1",
+                "rules": [
+                    {"id": "r1", "effect": "allow", "actions": ["read"], "resource_type": "report"}
+                ],
+            }
+        ),
+        encoding="utf-8",
+    )
+    monkeypatch.setenv("AUTHZ_POLICY_PATH", str(policy_file))
+    monkeypatch.setenv("AUTHZ_POLICY_RELOAD", "0")
+    monkeypatch.delenv("AUTHZ_AUDIT_PATH", raising=False)
+
+    client = TestClient(app)
+    r = client.post(
+        "/v1/authorize",
+        json={
+            "subject": {"id": "user:1", "claims": {}},
+            "action": "read",
+            "resource": {"type": "report", "id": "rpt:1"},
+        },
+    )
+    assert r.status_code == 200
+
+    m = client.get("/metrics")
+    assert m.status_code == 200
+    assert m.headers["content-type"].startswith("text/plain; version=0.0.4")
+    for stage in ("policy", "decode", "evaluate", "audit", "encode"):
+        assert f'authz_authorize_stage_seconds_count{{stage="{stage}"}}' in m.text
+    assert 'authz_decisions_total{decision="allow",reason="matched_allow"}' in m.text
+    assert "authz_policy_reloads_total" in m.text
+    assert "authz_audit_queue_depth 0" in m.text
+
+
+def test_authorize_modes_return_the_same_decision_and_audit(tmp_path: Path, monkeypatch):
+    policy_file = tmp_path / "policy.json"
+    policy_file.write_text(
+        json.dumps(
+            {
+                "id": "p1",
+                "version": "v1",
+                "rules": [
+                    {"id": "r1", "effect": "allow", "actions": ["read"], "resource_type": "report"}
+                ],
+            }
+        ),
+        encoding="utf-8",
+    )
+    monkeypatch.setenv("AUTHZ_POLICY_PATH", str(policy_file))
+    monkeypatch.setenv("AUTHZ_POLICY_RELOAD", "0")
+
+    bodies = {}
+    for mode, audit_mode in (("threadpool", "sync"), ("async", "sync"), ("async", "buffered")):
+        audit_file = tmp_path / f"audit-{mode}-{audit_mode}.jsonl"
+        monkeypatch.setenv("AUTHZ_AUTHORIZE_MODE", mode)
+        monkeypatch.setenv("AUTHZ_AUDIT_PATH", str(audit_file))
+        monkeypatch.setenv("AUTHZ_AUDIT_MODE", audit_mode)
+
+        with TestClient(app) as client:  # lifespan shutdown drains the buffered sink
+            r = client.post(
+                "/v1/authorize",
+                json={
+                    "subject": {"id": "user:1", "claims": {}},
+                    "action": "read",
+                    "resource": {"type": "report", "id": "rpt:1"},
+                },
+            )
+        assert r.status_code == 200
+        body = r.json()
+        record = json.loads(audit_file.read_text(encoding="utf-8"))
+        assert record["decision_id"] == body.pop("decision_id")
+        bodies[(mode, audit_mode)] = body
+
+    assert len({json.dumps(b, sort_keys=True) for b in bodies.values()}) == 1
+
+
+def test_authorize_stream_ndjson(tmp_path: Path, monkeypatch):
+    policy_file = tmp_path / "policy.json"
+    policy_file.write_text(
+        json.dumps(
+            {
+                "id": "p1",
+                "version": "v1",
+                "rules": [
+                    {"id": "r1", "effect": "allow", "actions": ["read"], "resource_type": "report"}
+                ],
+            }
+        ),
+        encoding="utf-8",
+    )
+    audit_file = tmp_path / "audit.jsonl"
+    monkeypatch.setenv("AUTHZ_POLICY_PATH", str(policy_file))
+    monkeypatch.setenv("AUTHZ_POLICY_RELOAD", "0")
+    monkeypatch.setenv("AUTHZ_AUDIT_PATH", str(audit_file))
+    monkeypatch.setenv("AUTHZ_AUDIT_MODE", "sync")
+
+    def body(action: str) -> str:
+        return json.dumps(
+            {"subject": {"id": "user:1"}, "action": action, "resource": {"type": "report", "id": "rpt:1"}}
+        )
+
+    lines = [body("read"), "", "{not json", body("write"), "x" * (70 * 1024), body("read")]
+
+    def chunks():
+        data = ("\n".join(lines)).encode("utf-8")  # no trailing newline
+        for i in range(0, len(data), 1000):
+            yield data[i : i + 1000]
+
+    client = TestClient(app)
+    r = client.post("/v1/authorize:stream", content=chunks(), headers={"X-Correlation-Id": "bulk-1"})
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("application/x-ndjson")
+    out = [json.loads(line) for line in r.text.splitlines()]
+    assert [o["index"] for o in out] == [0, 1, 2, 3, 4]
+    assert out[0]["result"]["decision"] == "allow"
+    assert out[1]["error"]["code"] == "invalid_request"
+    assert out[2]["result"]["decision"] == "deny"
+    assert out[3]["error"]["details"] == {"size": 70 * 1024}
+    assert out[4]["result"]["decision"] == "allow"
+
+    records = [json.loads(line) for line in audit_file.read_text(encoding="utf-8").splitlines()]
+    assert [rec["decision_id"] for rec in records] == [out[i]["result"]["decision_id"] for i in (0, 2, 4)]
+    assert {rec["correlation_id"] for rec in records} == {"bulk-1"}
+
+    r = client.post("/v1/authorize:stream?audit=none", content=body("read") + "\n")
+    assert r.json()["result"]["decision"] == "allow"
+    assert len(audit_file.read_text(encoding="utf-8").splitlines()) == 3
+
+
+def test_authorize_short_circuit_mode_reports_deciding_rule(tmp_path: Path, monkeypatch):
+    policy_file = tmp_path / "policy.json"
+    policy_file.write_text(
+        json.dumps(
+            {
+                "id": "p1",
+                "version": "v1",
+                "rules": [
+                    {"id": "a1", "effect": "allow", "actions": ["read"], "resource_type": "report"},
+                    {"id": "a2", "effect": "allow", "actions": ["read"], "resource_type": "report"},
+                    {"id": "d1", "effect": "deny", "actions": ["read"], "resource_type": "report",
+                     "context_claims": {"env": "prod"}},
+                ],
+            }
+        ),
+        encoding="utf-8",
+    )
+    audit_path = tmp_path / "audit.jsonl"
+    monkeypatch.setenv("AUTHZ_POLICY_PATH", str(policy_file))
+    monkeypatch.setenv("AUTHZ_POLICY_RELOAD", "0")
+    monkeypatch.setenv("AUTHZ_AUDIT_PATH", str(audit_path))
+    monkeypatch.setenv("AUTHZ_AUDIT_MODE", "sync")
+    monkeypatch.setenv("AUTHZ_DECISION_CACHE_SIZE", "100")
+
+    client = TestClient(app)
+
+    def post(env, mode=None):
+        body = {
+            "subject": {"id": "user:1"},
+            "action": "read",
+            "resource": {"type": "report"},
+            "context": {"env": env},
+        }
+        if mode is not None:
+            body["evaluation_mode"] = mode
+        r = client.post("/v1/authorize", json=body)
+        assert r.status_code == 200
+        return r.json()
+
+    full = post("dev")
+    assert (full["evaluation_mode"], full["matched_rule_ids"]) == ("full", ["a1", "a2"])
+    # Same inputs, other mode: not served from the full-mode cache entry
+    short = post("dev", "short_circuit")
+    assert (short["evaluation_mode"], short["matched_rule_ids"]) == ("short_circuit", ["a1"])
+    denied = post("prod", "short_circuit")
+    assert (denied["decision"], denied["matched_rule_ids"]) == ("deny", ["d1"])
+
+    monkeypatch.setenv("AUTHZ_EVALUATION_MODE", "short_circuit")
+    reload_settings()
+    assert post("dev")["evaluation_mode"] == "short_circuit"
+    assert post("dev", "full")["evaluation_mode"] == "full"
+
+    records = [json.loads(line) for line in audit_path.read_text(encoding="utf-8").splitlines()]
+    assert [r["evaluation_mode"] for r in records] == ["full", "short_circuit", "short_circuit", "short_circuit", "full"]
+
+
+def test_authorize_selects_policy_from_registry(tmp_path: Path, monkeypatch):
+    from app.services.policy_registry import shutdown_policy_registry
+
+    for policy_id, version in (("acme", "v1"), ("globex", "v9")):
+        (tmp_path / f"{policy_id}.json").write_text(
+            json.dumps(
+                {
+                    "id": policy_id,
+                    "version": version,
+                    "rules": [{"id": "r1", "effect": "allow", "actions": ["read"], "resource_type": "report"}],
+                }
+            ),
+            encoding="utf-8",
+        )
+    audit_path = tmp_path / "audit.jsonl"
+    monkeypatch.setenv("AUTHZ_POLICY_DIR", str(tmp_path))
+    monkeypatch.setenv("AUTHZ_DEFAULT_POLICY_ID", "acme")
+    monkeypatch.setenv("AUTHZ_POLICY_RELOAD", "0")
+    monkeypatch.setenv("AUTHZ_AUDIT_PATH", str(audit_path))
+
+    body = {"subject": {"id": "user:1"}, "action": "read", "resource": {"type": "report"}}
+    client = TestClient(app)
+    try:
+        r = client.post("/v1/authorize", json=body)
+        assert (r.status_code, r.json()["policy_id"]) == (200, "acme")
+
+        r = client.post("/v1/authorize", json=body, headers={"X-Policy-Id": "globex"})
+        assert (r.json()["policy_id"], r.json()["policy_version"]) == ("globex", "v9")
+
+        r = client.post("/v1/authorize", json={**body, "policy_id": "globex"}, headers={"X-Policy-Id": "acme"})
+        assert r.json()["policy_id"] == "globex"
+
+        r = client.post("/v1/authorize", json={**body, "policy_id": "nope"})
+        assert (r.status_code, r.json()["error"]["code"]) == (404, "policy_not_found")
+
+        r = client.post("/v1/authorize", json={**body, "policy_id": "../acme"})
+        assert (r.status_code, r.json()["error"]["code"]) == (400, "invalid_policy_selection")
+
+        r = client.post(
+            "/v1/authorize:batch",
+            json={"items": [body, {**body, "policy_id": "acme"}]},
+            headers={"X-Policy-Id": "globex"},
+        )
+        results = r.json()["results"]
+        assert results[0]["result"]["policy_id"] == "globex"
+        assert results[1]["error"]["code"] == "policy_mismatch"
+
+        records = [json.loads(line) for line in audit_path.read_text(encoding="utf-8").splitlines()]
+        assert [(rec["policy_id"], rec["policy_version"]) for rec in records] == [
+            ("acme", "v1"),
+            ("globex", "v9"),
+            ("globex", "v9"),
+            ("globex", "v9"),
+        ]
+    finally:
+        shutdown_policy_registry()
+
+
+def test_authorize_actions_lists_allowed_actions(tmp_path: Path, monkeypatch):
+    policy_file = tmp_path / "policy.json"
+    policy_file.write_text(
+        json.dumps(
+            {
+                "id": "p1",
+                "version": "v1",
+                "rules": [
+                    {"id": "r1", "effect": "allow", "actions": ["read", "list"], "resource_type": "report"},
+                    {"id": "r2", "effect": "allow", "actions": ["write", "delete"], "resource_type": "report",
+                     "subject_claims": {"role": "editor"}},
+                    {"id": "r3", "effect": "deny", "actions": ["delete"], "resource_type": "report",
+                     "context_claims": {"env": "prod"}},
+                ],
+            }
+        ),
+        encoding="utf-8",
+    )
+    audit_path = tmp_path / "audit.jsonl"
+    monkeypatch.setenv("AUTHZ_POLICY_PATH", str(policy_file))
+    monkeypatch.setenv("AUTHZ_POLICY_RELOAD", "0")
+    monkeypatch.setenv("AUTHZ_AUDIT_PATH", str(audit_path))
+
+    client = TestClient(app)
+    r = client.post(
+        "/v1/authorize:actions",
+        json={
+            "subject": {"id": "user:1", "claims": {"role": "editor"}},
+            "resource": {"type": "report", "id": "rpt:1"},
+            "context": {"env": "prod"},
+        },
+    )
+    assert r.status_code == 200
+    assert r.json() == {
+        "policy_id": "p1",
+        "policy_version": "v1",
+        "actions": [
+            {"action": "read", "matched_rule_ids": ["r1"]},
+            {"action": "list", "matched_rule_ids": ["r1"]},
+            {"action": "write", "matched_rule_ids": ["r2"]},
+        ],
+    }
+    assert not audit_path.exists()
+
+    r = client.post("/v1/authorize:actions", json={"subject": {"id": "user:1"}, "resource": {"type": "invoice"}})
+    assert r.json()["actions"] == []
+
+    r = client.post("/v1/authorize:actions", json={"subject": {"id": "user:1"}, "resource": {"type": "report"}, "policy_id": "p2"})
+    assert (r.status_code, r.json()["error"]["code"]) == (404, "policy_not_found")
+
+
+def test_authorize_filter_returns_allowed_resource_ids(tmp_path: Path, monkeypatch):
+    policy_file = tmp_path / "policy.json"
+    policy_file.write_text(
+        json.dumps(
+            {
+                "id": "p1",
+                "version": "v1",
+                "rules": [
+                    {"id": "r1", "effect": "allow", "actions": ["read"], "resource_type": "report",
+                     "subject_claims": {"role": "analyst"}, "resource_attrs": {"team": "a"}},
+                    {"id": "r2", "effect": "deny", "actions": ["read"], "resource_type": "report",
+                     "resource_attrs": {"archived": True}},
+                ],
+            }
+        ),
+        encoding="utf-8",
+    )
+    monkeypatch.setenv("AUTHZ_POLICY_PATH", str(policy_file))
+    monkeypatch.setenv("AUTHZ_POLICY_RELOAD", "0")
+
+    resources = [
+        {"id": f"rpt:{i}", "attrs": {"team": "a" if i % 2 else "b", "archived": i % 5 == 0}} for i in range(1200)
+    ]
+    body = {
+        "subject": {"id": "user:1", "claims": {"role": "analyst"}},
+        "action": "read",
+        "resource_type": "report",
+        "resources": resources,
+    }
+    expected = [r["id"] for r in resources if r["attrs"]["team"] == "a" and not r["attrs"]["archived"]]
+
+    client = TestClient(app)
+    r = client.post("/v1/authorize:filter", json=body)
+    assert r.status_code == 200
+    assert r.json() == {"policy_id": "p1", "policy_version": "v1", "allowed": expected}
+
+    r = client.post("/v1/authorize:filter", params={"stream": "true"}, json=body)
+    assert r.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in r.text.splitlines()]
+    assert lines[0] == {"policy_id": "p1", "policy_version": "v1"}
+    assert len(lines) == 1 + 3  # groups of STREAM_GROUP_SIZE resources
+    assert [i for line in lines[1:] for i in line["allowed"]] == expected
+
+    r = client.post("/v1/authorize:filter", json={**body, "subject": {"id": "user:2"}})
+    assert r.json()["allowed"] == []
+
+
+def test_rule_profile_admin_endpoints(tmp_path: Path, monkeypatch):
+    policy_file = tmp_path / "policy.json"
+    policy_file.write_text(
+        json.dumps(
+            {
+                "id": "p1",
+                "version": "v1",
+                "rules": [
+                    {"id": "r1", "effect": "allow", "actions": ["read"], "resource_type": "report"},
+                    {"id": "r2", "effect": "deny", "actions": ["read"], "resource_type": "invoice"},
+                ],
+            }
+        ),
+        encoding="utf-8",
+    )
+    dump_path = tmp_path / "rule-profile.json"
+    monkeypatch.setenv("AUTHZ_POLICY_PATH", str(policy_file))
+    monkeypatch.setenv("AUTHZ_POLICY_RELOAD", "0")
+    monkeypatch.delenv("AUTHZ_AUDIT_PATH", raising=False)
+    monkeypatch.setenv("AUTHZ_RULE_PROFILE", "1")
+    monkeypatch.setenv("AUTHZ_RULE_PROFILE_PATH", str(dump_path))
+
+    with TestClient(app) as client:
+        client.delete("/v1/admin/rule-profile")
+        payload = {"subject": {"id": "user:1", "claims": {}}, "action": "read", "resource": {"type": "report"}}
+        for _ in range(3):
+            assert client.post("/v1/authorize", json=payload).json()["decision"] == "allow"
+
+        profile = client.get("/v1/admin/rule-profile").json()
+        assert profile["enabled"] is True
+        [policy] = profile["policies"]
+        assert policy["evaluations"] == 3
+        assert [(r["id"], r["checks"], r["matches"]) for r in policy["rules"]] == [("r1", 3, 3), ("r2", 0, 0)]
+        assert policy["never_matched"] == ["r2"]
+
+        r = client.post("/v1/admin/rule-profile:dump")
+        assert r.status_code == 200 and r.json()["path"] == str(dump_path)
+        assert json.loads(dump_path.read_text(encoding="utf-8"))["policies"][0]["evaluations"] == 3
+        dump_path.unlink()
+
+    # Written again on shutdown
+    assert json.loads(dump_path.read_text(encoding="utf-8"))["policies"][0]["evaluations"] == 3
+
+    # Decision cache hits and :actions / :filter decisions count their matches too
+    monkeypatch.setenv("AUTHZ_DECISION_CACHE_SIZE", "100")
+    with TestClient(app) as client:
+        for _ in range(3):
+            assert client.post("/v1/authorize", json=payload).json()["decision"] == "allow"
+        client.post("/v1/authorize:actions", json={"subject": {"id": "user:1"}, "resource": {"type": "invoice"}})
+        client.post(
+            "/v1/authorize:filter",
+            json={"subject": {"id": "user:1"}, "action": "read", "resource_type": "report", "resources": [{"id": "a"}]},
+        )
+        [policy] = client.get("/v1/admin/rule-profile").json()["policies"]
+        assert (policy["evaluations"], policy["cached_decisions"], policy["actions_filter_decisions"]) == (1, 2, 2)
+        assert [(r["id"], r["checks"], r["matches"]) for r in policy["rules"]] == [("r1", 1, 4), ("r2", 0, 1)]
+    monkeypatch.delenv("AUTHZ_DECISION_CACHE_SIZE")
+
+    monkeypatch.delenv("AUTHZ_RULE_PROFILE")
+    reload_settings()
+    client = TestClient(app)
+    assert client.get("/v1/admin/rule-profile").json() == {"enabled": False}
+    assert client.post("/v1/admin/rule-profile:dump").json()["error"]["code"] == "rule_profile_unavailable"
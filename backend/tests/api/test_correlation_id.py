@@ -14,3 +14,16 @@ def test_correlation_id_generated_when_missing():
     assert r.status_code == 200
     assert "X-Correlation-Id" in r.headers
     assert len(r.headers["X-Correlation-Id"]) > 0
+
+def test_correlation_id_is_trimmed_and_bounded():
+    client = TestClient(app)
+    r = client.get("/healthz", headers={"X-Correlation-Id": "  " + "a" * 200 + "  "})
+    assert r.status_code == 200
+    assert r.headers.get("X-Correlation-Id") == "a" * 128
+
+def test_correlation_id_reaches_error_body():
+    client = TestClient(app)
+    r = client.get("/v1/audit/decisions/missing", headers={"X-Correlation-Id": "cid-err"})
+    assert r.headers.get("X-Correlation-Id") == "cid-err"
+    assert r.headers.get_list("X-Correlation-Id") == ["cid-err"]
+    assert r.json()["error"]["correlation_id"] == "cid-err"
@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import pytest
+from fastapi.testclient import TestClient
+from pydantic import ValidationError
+
+from app.api.decoding import decode_authorize_request, from_model
+from app.main import app
+from app.schemas.authorize import AuthorizeRequest
+
+
+def _body(**overrides):
+    body = {
+        "subject": {"id": "user:1", "claims": {"role": "analyst", "groups": ["a", "b"]}},
+        "action": "read",
+        "resource": {"type": "report", "id": "rpt:1", "attrs": {"owner": "user:1"}},
+        "context": {"env": "prod"},
+    }
+    body.update(overrides)
+    return body
+
+
+CASES = [
+    _body(),
+    _body(evaluation_mode="short_circuit", policy_id="acme"),
+    _body(evaluation_mode=None, policy_id=None),
+    {"subject": {"id": "u"}, "action": "read", "resource": {"type": "report"}},
+    _body(resource={"type": "report", "id": None}),
+    # Everything below is rejected by AuthorizeRequest
+    _body(extra=1),
+    _body(subject={"id": "u", "claims": {}, "name": "x"}),
+    _body(resource={"type": "report", "owner": "x"}),
+    _body(subject={"id": 1}),
+    _body(subject={"id": "u", "claims": None}),
+    _body(resource={"type": "report", "attrs": []}),
+    _body(context=None),
+    _body(action=None),
+    _body(evaluation_mode="fast"),
+    _body(policy_id=7),
+    {"subject": {"id": "u"}, "action": "read"},
+    [],
+    None,
+]
+
+
+@pytest.mark.parametrize("obj", CASES)
+def test_direct_decoding_matches_pydantic_validation(obj):
+    decoded = decode_authorize_request(obj)
+    try:
+        model = AuthorizeRequest.model_validate(obj)
+    except ValidationError:
+        assert decoded is None
+    else:
+        assert decoded == from_model(model)
+
+
+def test_direct_decoding_does_not_copy_claims():
+    obj = _body()
+    decoded = decode_authorize_request(obj)
+    assert decoded.request.subject.claims is obj["subject"]["claims"]
+
+
+def test_authorize_invalid_bodies_keep_fastapi_errors(monkeypatch):
+    monkeypatch.delenv("AUTHZ_POLICY_PATH", raising=False)
+    client = TestClient(app)
+
+    r = client.post("/v1/authorize", json=_body(subject={"id": "u", "nickname": "x"}))
+    assert r.status_code == 422
+    assert r.json()["detail"][0]["type"] == "extra_forbidden"
+    assert r.json()["detail"][0]["loc"] == ["body", "subject", "nickname"]
+
+    r = client.post("/v1/authorize", content=b"{not json", headers={"content-type": "application/json"})
+    assert r.status_code == 422
+    assert r.json()["detail"][0]["type"] == "json_invalid"
+
+    # A valid body that is not sent as JSON is still refused
+    r = client.post("/v1/authorize", content=b'{"action": "read"}', headers={"content-type": "text/plain"})
+    assert r.status_code == 422
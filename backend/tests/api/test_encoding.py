@@ -0,0 +1,35 @@
+from __future__ import annotations
+
+from fastapi.responses import JSONResponse
+
+from app.api.authorize import _response_body
+from app.api.encoding import dumps, dumps_fast
+from app.domain.compiled_policy import compile_policy
+from app.domain.policy import Policy
+from app.domain.types import AuthorizationDecision
+from app.schemas.authorize import AuthorizeResponse
+
+
+def test_response_body_is_byte_compatible_with_response_model():
+    policy = compile_policy(Policy(id="pólicy-1", version='v"1\\', rules=[]))
+    decision = AuthorizationDecision(decision="allow", reason="matched_allow", matched_rule_ids=("r1", "règle\n2"))
+
+    via_model = JSONResponse(
+        content=AuthorizeResponse(
+            decision=decision.decision,
+            reason=decision.reason,
+            decision_id="d-1",
+            policy_id=policy.id,
+            policy_version=policy.version,
+            matched_rule_ids=list(decision.matched_rule_ids),
+            evaluation_mode="full",
+        ).model_dump(mode="json")
+    ).body
+
+    body = _response_body(policy, decision, "d-1", "full")
+    assert dumps(body) == via_model
+    assert dumps_fast(body) == via_model
+
+
+def test_dumps_fast_falls_back_for_values_orjson_rejects():
+    assert dumps_fast([2**70]) == b"[1180591620717411303424]"
@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+import pytest
+
+from app.cli.replay import main, run_replay
+from app.domain.audit import AuditRecord
+from app.services.audit_sink import encode_record
+
+
+def _record(decision_id: str, role: str, decision: str, rules, **inputs) -> AuditRecord:
+    return AuditRecord(
+        correlation_id="cid-1",
+        decision_id=decision_id,
+        policy_id="p1",
+        policy_version="v1",
+        subject_id="user:1",
+        action="read",
+        resource_type="report",
+        resource_id="rpt:1",
+        decision=decision,
+        reason="matched_allow" if decision == "allow" else "deny_by_default",
+        matched_rule_ids=rules,
+        context={},
+        created_at="2026-01-27T00:00:00Z",
+        **({"subject_claims": {"role": role}, "resource_attrs": {}} if inputs.get("exact", True) else {}),
+    )
+
+
+def test_replay_reports_flips_against_candidate_policy(tmp_path: Path, capsys):
+    audit = tmp_path / "audit.jsonl"
+    lines = [
+        encode_record(_record("d1", "analyst", "allow", ["r1"])),  # stays allowed
+        encode_record(_record("d2", "intern", "allow", ["r1"])),  # candidate denies interns
+        encode_record(_record("d3", "admin", "deny", [])),  # candidate allows admins
+        encode_record(_record("d4", "analyst", "allow", ["r1"], exact=False)),  # no claims recorded
+        "not json",
+    ]
+    audit.write_text("\n".join(lines) + "\n" + '{"torn": ', encoding="utf-8")
+
+    candidate = tmp_path / "candidate.json"
+    candidate.write_text(
+        json.dumps(
+            {
+                "id": "p1",
+                "version": "v2",
+                "rules": [
+                    {"id": "r1", "effect": "allow", "actions": ["read"], "resource_type": "report",
+                     "subject_claims": {"role": "analyst"}},
+                    {"id": "r2", "effect": "allow", "actions": ["read"], "resource_type": "report",
+                     "subject_claims": {"role": "admin"}},
+                ],
+            }
+        ),
+        encoding="utf-8",
+    )
+
+    report = run_replay(audit, candidate, workers=1, chunk_bytes=64)
+    assert (report.records, report.replayed, report.invalid, report.inexact) == (5, 3, 1, 1)
+    assert (report.unchanged, report.allow_to_deny, report.deny_to_allow) == (1, 1, 1)
+    assert report.rules_gained == {"r2": 1}
+    assert report.rules_lost == {"r1": 1}
+    assert report.samples["allow_to_deny"][0]["decision_id"] == "d2"
+    assert report.samples["deny_to_allow"][0]["after"]["matched_rule_ids"] == ["r2"]
+
+    out = tmp_path / "impact.json"
+    assert main(["--audit", str(audit), "--policy", str(candidate), "--workers", "2", "--out", str(out)]) == 0
+    pooled = json.loads(out.read_text(encoding="utf-8"))
+    assert pooled["candidate"] == {"policy_id": "p1", "policy_version": "v2"}
+    assert {k: pooled[k] for k in ("records", "allow_to_deny", "deny_to_allow", "unchanged")} == {
+        "records": 5,
+        "allow_to_deny": 1,
+        "deny_to_allow": 1,
+        "unchanged": 1,
+    }
+    assert "1 allow->deny" in capsys.readouterr().err
+
+    # Replayed with empty claims, d4 flips: reported apart from the policy's flips
+    report = run_replay(audit, candidate, workers=1, include_inexact=True)
+    assert (report.replayed, report.allow_to_deny, report.deny_to_allow, report.unchanged) == (4, 1, 1, 1)
+    assert report.inexact_changes == {"allow_to_deny": 1}
+    assert main(["--audit", str(audit), "--policy", str(candidate), "--workers", "1", "--include-inexact",
+                 "--out", str(out)]) == 0
+    assert json.loads(out.read_text(encoding="utf-8"))["inexact_changes"] == {
+        "unchanged": 0, "allow_to_deny": 1, "deny_to_allow": 0, "rules_changed": 0
+    }
+    assert "not reliable): 1 allow->deny" in capsys.readouterr().err
+
+    broken = tmp_path / "broken.json"
+    broken.write_text('{"id": "p1"', encoding="utf-8")
+    with pytest.raises(SystemExit) as exc:
+        main(["--audit", str(audit), "--policy", str(broken)])
+    assert exc.value.code == 2
+    assert "invalid candidate policy" in capsys.readouterr().err
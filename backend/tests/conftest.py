@@ -0,0 +1,12 @@
+import pytest
+
+from app.settings import reload_settings
+
+
+@pytest.fixture(autouse=True)
+def _fresh_settings():
+    # Settings are read from env once per process; each test sets its own env
+    # (monkeypatch.setenv) before the first lookup, so start from nothing.
+    reload_settings()
+    yield
+    reload_settings()
@@ -1,4 +1,5 @@
-from app.domain.evaluator import evaluate
+from app.domain.compiled_policy import compile_policy
+from app.domain.evaluator import FULL, SHORT_CIRCUIT, evaluate, evaluate_actions, resource_filter
 from app.domain.policy import Policy, PolicyRule
 from app.domain.types import AuthorizationRequest, Resource, Subject
 
@@ -94,3 +95,227 @@ def test_subset_match_resource_attrs():
     dec = evaluate(_req(resource_attrs={"classification": "cui", "owner": "team-a"}), policy)
     assert dec.decision == "allow"
     assert dec.matched_rule_ids == ["r1"]
+
+
+def test_compiled_policy_matches_linear_scan():
+    policy = Policy(
+        id="p1",
+        version="v1",
+        rules=[
+            PolicyRule(id="a1", effect="allow", actions=["read", "write"], resource_type="report"),
+            PolicyRule(id="x1", effect="allow", actions=["read"], resource_type="invoice"),
+            PolicyRule(
+                id="d1",
+                effect="deny",
+                actions=["write"],
+                resource_type="report",
+                context_claims={"env": "prod"},
+            ),
+            PolicyRule(id="a2", effect="allow", actions=["write", "write"], resource_type="report"),
+            PolicyRule(id="bad", effect="maybe", actions=["read"], resource_type="report"),
+        ],
+    )
+    compiled = compile_policy(policy)
+    assert [r.id for r in compiled.candidates_for("write", "report")] == ["a1", "d1", "a2"]
+
+    for req in [
+        _req(action="read"),
+        _req(action="write"),
+        _req(action="write", context={"env": "prod"}),
+        _req(action="read", resource_type="invoice"),
+        _req(action="delete"),
+    ]:
+        assert evaluate(req, compiled) == evaluate(req, policy)
+
+    dec = evaluate(_req(action="write", context={"env": "prod"}), compiled)
+    assert dec.decision == "deny"
+    assert dec.matched_rule_ids == ["a1", "d1", "a2"]
+
+
+def test_compiled_predicate_index_matches_linear_scan():
+    policy = Policy(
+        id="p1",
+        version="v1",
+        rules=[
+            PolicyRule(
+                id="analyst",
+                effect="allow",
+                actions=["read"],
+                resource_type="report",
+                subject_claims={"role": "analyst"},
+            ),
+            PolicyRule(
+                id="analyst-cui",
+                effect="allow",
+                actions=["read"],
+                resource_type="report",
+                subject_claims={"role": "analyst", "team": "a"},
+                resource_attrs={"classification": "cui"},
+            ),
+            PolicyRule(
+                id="prod-deny",
+                effect="deny",
+                actions=["read"],
+                resource_type="report",
+                context_claims={"env": "prod"},
+            ),
+            PolicyRule(
+                id="groups",
+                effect="allow",
+                actions=["read"],
+                resource_type="report",
+                subject_claims={"groups": ["x", "y"]},  # unhashable: residual check
+            ),
+            PolicyRule(
+                id="level-1",
+                effect="allow",
+                actions=["read"],
+                resource_type="report",
+                subject_claims={"level": 1},
+            ),
+        ],
+    )
+    compiled = compile_policy(policy)
+
+    for req in [
+        _req(),
+        _req(subject_claims={"role": "analyst"}),
+        _req(subject_claims={"role": "analyst", "team": "a"}, resource_attrs={"classification": "cui"}),
+        _req(subject_claims={"role": "analyst", "team": "b"}, resource_attrs={"classification": "cui"}),
+        _req(subject_claims={"role": "analyst"}, context={"env": "prod"}),
+        _req(subject_claims={"groups": ["x", "y"]}),
+        _req(subject_claims={"groups": ["x"]}),
+        _req(subject_claims={"role": ["analyst"]}),
+        _req(subject_claims={"level": 1.0}),
+        _req(subject_claims={"level": "1"}),
+    ]:
+        assert evaluate(req, compiled) == evaluate(req, policy), req
+
+        # Short-circuit: same outcome, only the deciding rule
+        full = evaluate(req, policy, FULL)
+        expected_ids = list(full.matched_rule_ids)
+        if full.reason == "explicit_deny":
+            expected_ids = [next(r.id for r in policy.rules if r.id in expected_ids and r.effect == "deny")]
+        expected_ids = expected_ids[:1]
+        for p in (policy, compiled):
+            short = evaluate(req, p, SHORT_CIRCUIT)
+            assert (short.decision, short.reason) == (full.decision, full.reason), req
+            assert list(short.matched_rule_ids) == expected_ids, req
+
+
+def test_evaluate_actions_matches_per_action_evaluation():
+    policy = Policy(
+        id="p1",
+        version="v1",
+        rules=[
+            PolicyRule(id="read", effect="allow", actions=["read", "list"], resource_type="report"),
+            PolicyRule(
+                id="edit",
+                effect="allow",
+                actions=["write", "delete", "write"],
+                resource_type="report",
+                subject_claims={"role": "editor"},
+            ),
+            PolicyRule(
+                id="no-prod-delete",
+                effect="deny",
+                actions=["delete"],
+                resource_type="report",
+                context_claims={"env": "prod"},
+            ),
+            PolicyRule(
+                id="locked",
+                effect="deny",
+                actions=["write"],
+                resource_type="report",
+                resource_attrs={"locked": True},
+            ),
+            PolicyRule(id="tags", effect="allow", actions=["tag"], resource_type="report", subject_claims={"g": ["x"]}),
+            PolicyRule(id="invoice", effect="allow", actions=["pay"], resource_type="invoice"),
+            PolicyRule(id="bad", effect="maybe", actions=["read"], resource_type="report"),
+        ],
+    )
+    compiled = compile_policy(policy)
+    actions = ("read", "list", "write", "delete", "tag", "pay", "archive")
+
+    for req in [
+        _req(),
+        _req(subject_claims={"role": "editor"}),
+        _req(subject_claims={"role": "editor", "g": ["x"]}, context={"env": "prod"}),
+        _req(subject_claims={"role": "editor"}, resource_attrs={"locked": True}),
+        _req(resource_type="invoice"),
+        _req(resource_type="unknown"),
+    ]:
+        for p in (policy, compiled):
+            decisions = evaluate_actions(req.subject, req.resource, req.context, p)
+            for action in actions:
+                expected = evaluate(_req_with_action(req, action), policy)
+                if expected.reason == "deny_by_default":
+                    assert action not in decisions
+                else:
+                    assert decisions[action] == expected, (action, req)
+
+    decisions = evaluate_actions(
+        Subject(id="user:1", claims={"role": "editor"}), Resource(type="report"), {"env": "prod"}, compiled
+    )
+    assert list(decisions) == ["read", "list", "write", "delete"]
+    assert decisions["delete"].decision == "deny"
+    assert decisions["delete"].matched_rule_ids == ["edit", "no-prod-delete"]
+
+
+def _req_with_action(req: AuthorizationRequest, action: str) -> AuthorizationRequest:
+    return AuthorizationRequest(subject=req.subject, action=action, resource=req.resource, context=req.context)
+
+
+def test_resource_filter_matches_per_resource_evaluation():
+    policy = Policy(
+        id="p1",
+        version="v1",
+        rules=[
+            PolicyRule(id="own", effect="allow", actions=["read"], resource_type="report", resource_attrs={"owner": "u1"}),
+            PolicyRule(
+                id="public",
+                effect="allow",
+                actions=["read"],
+                resource_type="report",
+                resource_attrs={"visibility": "public"},
+            ),
+            PolicyRule(
+                id="team",
+                effect="allow",
+                actions=["read"],
+                resource_type="report",
+                subject_claims={"team": "a"},
+                resource_attrs={"team": "a"},
+            ),
+            PolicyRule(
+                id="secret",
+                effect="deny",
+                actions=["read"],
+                resource_type="report",
+                resource_attrs={"labels": ["secret"]},  # unhashable: residual check
+            ),
+            PolicyRule(id="prod", effect="deny", actions=["read"], resource_type="report", context_claims={"env": "prod"}),
+        ],
+    )
+    compiled = compile_policy(policy)
+    resources = [
+        None,
+        {},
+        {"owner": "u1"},
+        {"owner": "u2", "visibility": "public"},
+        {"team": "a"},
+        {"team": "a", "owner": "u1", "labels": ["secret"]},
+        {"visibility": "public", "labels": ["x"]},
+        {"owner": None},
+    ]
+
+    for claims, context in (({}, {}), ({"team": "a"}, {}), ({"team": "a"}, {"env": "prod"})):
+        for p in (policy, compiled):
+            decide = resource_filter(Subject(id="user:1", claims=claims), "read", "report", context, p)
+            for attrs in resources + resources:  # second pass is served from the memo
+                req = _req(subject_claims=claims, resource_attrs=attrs, context=context)
+                assert decide(attrs) == evaluate(req, policy), (claims, context, attrs)
+
+    decide = resource_filter(Subject(id="user:1", claims={}), "write", "report", {}, compiled)
+    assert decide({"owner": "u1"}).reason == "deny_by_default"
@@ -0,0 +1,233 @@
+from __future__ import annotations
+
+import dataclasses
+import json
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from app.cli.replay import run_replay
+from app.domain.audit import AuditRecord
+from app.services.audit_aggregate import AggregatingAuditSink, expand_aggregate
+from app.services.audit_query import AuditStore
+from app.services.audit_segments import SegmentedJsonlWriter, lookup
+from app.services.audit_sink import AuditSinkError, DirectAuditSink, JsonlAuditSink, encode_record
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 100.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _record(i: int, **changes) -> AuditRecord:
+    record = AuditRecord(
+        correlation_id=f"cid-{i}",
+        decision_id=f"d{i}",
+        policy_id="p1",
+        policy_version="v1",
+        subject_id="user:1",
+        action="read",
+        resource_type="report",
+        resource_id="rpt:1",
+        decision="allow",
+        reason="matched_allow",
+        matched_rule_ids=["r1"],
+        context={"env": "dev"},
+        created_at=f"2026-01-27T00:00:{i:02d}.{i * 1000:06d}Z",
+        subject_claims={"role": "analyst"},
+        resource_attrs={},
+    )
+    return dataclasses.replace(record, **changes)
+
+
+def _lines(path: Path):
+    return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+
+
+def test_identical_allows_collapse_into_one_aggregate(tmp_path: Path):
+    path = tmp_path / "audit.jsonl"
+    clock = _Clock()
+    sink = AggregatingAuditSink(JsonlAuditSink(path), window_s=10, clock=clock)
+
+    records = [_record(i) for i in range(1, 5)]
+    sink.write(records[0])
+    assert sink.write_nowait(records[1])  # collapsed: no I/O
+    sink.write_many([records[2], _record(5, decision="deny", reason="no_match"), _record(6, subject_id="user:2")])
+    sink.write(records[3])
+    assert sink.pending() == 3
+    sink.close()
+
+    lines = _lines(path)
+    assert [x.get("decision_id") for x in lines] == ["d1", "d5", "d6", None]
+    aggregate = lines[-1]
+    assert aggregate["kind"] == "aggregate"
+    assert aggregate["count"] == 3
+    assert aggregate["first_at"] == records[1].created_at and aggregate["last_at"] == records[3].created_at
+    assert [o[:2] for o in aggregate["occurrences"]] == [["d2", "cid-2"], ["d3", "cid-3"], ["d4", "cid-4"]]
+
+    # Expansion gives back exactly the lines the decisions would have had
+    assert expand_aggregate(aggregate) == [json.loads(encode_record(r)) for r in records[1:]]
+
+
+def test_window_end_writes_aggregate_and_reopens(tmp_path: Path):
+    path = tmp_path / "audit.jsonl"
+    clock = _Clock()
+    sink = AggregatingAuditSink(JsonlAuditSink(path), window_s=10, clock=clock)
+
+    sink.write(_record(1))
+    sink.write(_record(2))
+    clock.now += 10
+    sink.write(_record(3))  # window over: verbatim again
+    sink.write(_record(4))
+    sink.close()
+
+    # The first aggregate is written by the background thread, so it may land
+    # before or after d3
+    lines = _lines(path)
+    assert [x["decision_id"] for x in lines if "decision_id" in x] == ["d1", "d3"]
+    assert [o[0] for x in lines if "occurrences" in x for o in x["occurrences"]] == ["d2", "d4"]
+
+
+def test_opener_declined_by_write_nowait_is_written_once(tmp_path: Path):
+    path = tmp_path / "audit.jsonl"
+    sink = AggregatingAuditSink(JsonlAuditSink(path), window_s=10, clock=_Clock())
+
+    assert not sink.write_nowait(_record(1))  # JsonlAuditSink always declines
+    sink.write(_record(1))
+    sink.close()
+
+    assert [x["decision_id"] for x in _lines(path)] == ["d1"]
+
+
+def test_max_keys_ends_the_oldest_window(tmp_path: Path):
+    path = tmp_path / "audit.jsonl"
+    sink = AggregatingAuditSink(JsonlAuditSink(path), window_s=10, max_keys=1, clock=_Clock())
+
+    sink.write(_record(1))
+    sink.write(_record(2))
+    sink.write(_record(3, resource_id="rpt:2"))  # ends the first window
+    sink.close()
+
+    lines = _lines(path)
+    assert [x["decision_id"] for x in lines if "decision_id" in x] == ["d1", "d3"]
+    assert [o[0] for x in lines if "occurrences" in x for o in x["occurrences"]] == ["d2"]
+
+
+def test_failed_aggregate_write_is_retried(tmp_path: Path):
+    path = tmp_path / "audit.jsonl"
+
+    class FlakyInner(JsonlAuditSink):
+        failures = 1
+
+        def write_many(self, records):
+            if self.failures and any(getattr(r, "kind", None) == "aggregate" for r in records):
+                self.failures -= 1
+                raise OSError("disk full")
+            super().write_many(records)
+
+    clock = _Clock()
+    sink = AggregatingAuditSink(FlakyInner(path), window_s=10, retry_s=0, clock=clock)
+    sink.write(_record(1))
+    sink.write(_record(2))
+    clock.now += 10
+    sink.write(_record(3))  # ends the first window; its aggregate write fails once
+    sink.write(_record(4))
+    sink.close()
+
+    lines = _lines(path)
+    assert sorted(o[0] for x in lines if "occurrences" in x for o in x["occurrences"]) == ["d2", "d4"]
+
+
+def test_pending_decisions_are_capped_and_not_collapsed_while_retrying(tmp_path: Path):
+    class DownInner(JsonlAuditSink):
+        down = False
+
+        def __init__(self, path: Path) -> None:
+            super().__init__(path)
+            self.failed = threading.Event()
+
+        def write_many(self, records):
+            if self.down:
+                self.failed.set()
+                raise OSError("disk full")
+            super().write_many(records)
+
+        def write(self, record):
+            if self.down:
+                raise AuditSinkError("disk full")
+            super().write(record)
+
+    # At most max_pending collapsed decisions; later ones are written as is
+    path = tmp_path / "capped.jsonl"
+    sink = AggregatingAuditSink(DownInner(path), window_s=10, max_pending=2, clock=_Clock())
+    for i in range(1, 5):
+        sink.write(_record(i))  # d1 opens the window, d2 and d3 fill the cap
+    assert sink.pending() == 2
+    assert [x["decision_id"] for x in _lines(path)] == ["d1", "d4"]
+    sink.close()
+    assert sink.pending() == 0
+
+    # While a failed aggregate write waits for its retry, nothing is collapsed:
+    # records go to the inner sink and fail (or succeed) there
+    path = tmp_path / "retrying.jsonl"
+    clock = _Clock()
+    inner = DownInner(path)
+    sink = AggregatingAuditSink(inner, window_s=10, retry_s=60, clock=clock)
+    sink.write(_record(1))
+    sink.write(_record(2))
+    inner.down = True
+    clock.now += 10
+    with pytest.raises(AuditSinkError):
+        sink.write(_record(3))  # ends the first window; its aggregate write fails
+    assert inner.failed.wait(timeout=5)
+    deadline = time.monotonic() + 5
+    while not sink._retrying and time.monotonic() < deadline:  # set just after the failure
+        time.sleep(0.001)
+    inner.down = False
+    sink.write(_record(4))
+    assert sink.pending() == 1
+    sink.close()
+
+    lines = _lines(path)
+    assert [x["decision_id"] for x in lines if "decision_id" in x] == ["d1", "d4"]
+    assert [o[0] for x in lines if "occurrences" in x for o in x["occurrences"]] == ["d2"]
+
+
+def test_readers_and_replay_expand_aggregates(tmp_path: Path):
+    directory = tmp_path / "segments"
+    writer = SegmentedJsonlWriter(directory, block_bytes=256)
+    sink = AggregatingAuditSink(DirectAuditSink(writer), window_s=10, clock=_Clock())
+    sink.write_many([_record(i) for i in range(1, 6)])
+    sink.close()  # seals the segment, so lookups go through its index
+
+    expected = json.loads(encode_record(_record(4)))
+    assert lookup(directory, "decision_id", "d4") == [expected]
+    assert lookup(directory, "correlation_id", "cid-4") == [expected]
+    assert len(lookup(directory, "subject_id", "user:1")) == 5
+
+    store = AuditStore(directory)
+    try:
+        assert store.get("d4") == expected
+    finally:
+        store.close()
+
+    policy = tmp_path / "policy.json"
+    policy.write_text(
+        json.dumps(
+            {
+                "id": "p1",
+                "version": "v2",
+                "rules": [{"id": "r2", "effect": "allow", "actions": ["write"], "resource_type": "report"}],
+            }
+        ),
+        encoding="utf-8",
+    )
+    report = run_replay(directory, policy, workers=1)
+    assert (report.records, report.replayed, report.allow_to_deny) == (5, 5, 5)
+    assert report.rules_lost == {"r1": 5}
+    assert [s["decision_id"] for s in report.samples["allow_to_deny"]] == ["d1", "d2"]
@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import gzip
+import json
+from pathlib import Path
+
+from app.domain.audit import AuditRecord
+from app.services.audit_segments import (
+    SegmentIndex,
+    SegmentedJsonlWriter,
+    list_segments,
+    lookup,
+)
+
+
+def _record(i: int) -> AuditRecord:
+    return AuditRecord(
+        correlation_id=f"cid-{i // 3}",
+        decision_id=f"d{i}",
+        policy_id="p1",
+        policy_version="v1",
+        subject_id=f"user:{i % 5}",
+        action="read",
+        resource_type="report",
+        resource_id=f"rpt:{i}",
+        decision="allow",
+        reason="matched_allow",
+        matched_rule_ids=["r1"],
+        context={},
+        created_at=f"2026-01-27T00:00:{i % 60:02d}Z",
+    )
+
+
+def test_segmented_writer_rotates_compresses_and_indexes(tmp_path: Path):
+    writer = SegmentedJsonlWriter(tmp_path, max_bytes=4096, block_bytes=1024)
+    for i in range(0, 200, 10):
+        writer.write_batch([_record(j) for j in range(i, i + 10)])
+    writer.close()
+
+    segments = list_segments(tmp_path)
+    assert len(segments) > 1
+    assert all(s.sealed and s.compressed for s in segments)
+    assert not list(tmp_path.glob("*.jsonl"))
+
+    # Compressed segments are still plain gzip for operators
+    lines = [line for s in segments for line in gzip.open(s.data_path, "rt", encoding="utf-8")]
+    assert [json.loads(x)["decision_id"] for x in lines] == [f"d{i}" for i in range(200)]
+
+    index = SegmentIndex(segments[0].index_path)
+    assert index.count > 0
+    assert index.first_us <= index.last_us
+    index.close()
+
+    assert [r["decision_id"] for r in lookup(tmp_path, "decision_id", "d123")] == ["d123"]
+    assert [r["decision_id"] for r in lookup(tmp_path, "correlation_id", "cid-10")] == ["d30", "d31", "d32"]
+    assert len(lookup(tmp_path, "subject_id", "user:2")) == 40
+    assert lookup(tmp_path, "decision_id", "missing") == []
+
+
+def test_segment_lookup_covers_active_and_crashed_segments(tmp_path: Path):
+    writer = SegmentedJsonlWriter(tmp_path, compress=False)
+    writer.write_batch([_record(0), _record(1)])
+    # Active (unsealed) segment is scanned
+    assert [r["decision_id"] for r in lookup(tmp_path, "decision_id", "d1")] == ["d1"]
+
+    # Simulate a crash: a new writer seals the leftover segment on first write
+    restarted = SegmentedJsonlWriter(tmp_path, compress=False)
+    restarted.write_batch([_record(2)])
+    restarted.close()
+
+    segments = list_segments(tmp_path)
+    assert [s.seq for s in segments] == [1, 2]
+    assert all(s.sealed for s in segments)
+    assert [r["decision_id"] for r in lookup(tmp_path, "decision_id", "d1")] == ["d1"]
+    assert [r["decision_id"] for r in lookup(tmp_path, "decision_id", "d2")] == ["d2"]
@@ -1,10 +1,13 @@
 from __future__ import annotations
 
 import json
+import threading
 from pathlib import Path
 
-from app.domain.audit import AuditRecord
-from app.services.audit_sink import JsonlAuditSink
+import pytest
+
+from app.domain.audit import AuditAggregate, AuditRecord
+from app.services.audit_sink import AuditSinkError, BufferedAuditSink, JsonlAuditSink, JsonlFileWriter
 
 
 def test_jsonl_audit_sink_appends_one_line(tmp_path: Path):
@@ -33,3 +36,231 @@ def test_jsonl_audit_sink_appends_one_line(tmp_path: Path):
     obj = json.loads(lines[0])
     assert obj["decision_id"] == "d1"
     assert obj["decision"] == "allow"
+
+
+def _record(decision_id: str) -> AuditRecord:
+    return AuditRecord(
+        correlation_id="cid-1",
+        decision_id=decision_id,
+        policy_id="p1",
+        policy_version="v1",
+        subject_id="user:1",
+        action="read",
+        resource_type="report",
+        resource_id="rpt:1",
+        decision="allow",
+        reason="matched_allow",
+        matched_rule_ids=["r1"],
+        context={},
+        created_at="2026-01-27T00:00:00Z",
+    )
+
+
+def test_buffered_audit_sink_writes_all_records_in_order(tmp_path: Path):
+    path = tmp_path / "audit.jsonl"
+    sink = BufferedAuditSink(JsonlFileWriter(path), batch_size=4, durability="batch")
+
+    sink.write(_record("d0"))
+    sink.write_many([_record(f"d{i}") for i in range(1, 10)])
+    assert sink.flush(timeout=5)
+    sink.close()
+
+    ids = [json.loads(line)["decision_id"] for line in path.read_text(encoding="utf-8").splitlines()]
+    assert ids == [f"d{i}" for i in range(10)]
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class _BlockedWriter:
+    def __init__(self) -> None:
+        self.started = threading.Event()  # the writer thread has taken a group
+        self.release = threading.Event()
+        self.written: list = []
+
+    def write_batch(self, records):
+        self.started.set()
+        self.release.wait(timeout=5)
+        self.written.extend(records)
+
+    def sync(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def test_buffered_audit_sink_backpressure_fail_and_drop():
+    writer = _BlockedWriter()
+    sink = BufferedAuditSink(writer, queue_size=1, batch_size=1, backpressure="fail")
+    sink.write(_record("d0"))  # taken by the (blocked) writer thread
+    assert writer.started.wait(timeout=5)
+    sink.write(_record("d1"))  # fills the queue
+    with pytest.raises(AuditSinkError):
+        sink.write(_record("d2"))
+    writer.release.set()
+    sink.close()
+
+    writer = _BlockedWriter()
+    sink = BufferedAuditSink(writer, queue_size=1, batch_size=1, backpressure="drop")
+    sink.write(_record("d0"))
+    assert writer.started.wait(timeout=5)
+    sink.write(_record("d1"))
+    sink.write(_record("d2"))
+    assert sink.dropped == 1
+    writer.release.set()
+    sink.close()
+    assert [r.decision_id for r in writer.written] == ["d0", "d1"]
+
+
+def test_buffered_audit_sink_write_many_is_all_or_nothing():
+    writer = _BlockedWriter()
+    sink = BufferedAuditSink(writer, queue_size=3, batch_size=1, backpressure="fail")
+    sink.write(_record("d0"))
+    assert writer.started.wait(timeout=5)
+    sink.write(_record("d1"))
+    with pytest.raises(AuditSinkError):
+        sink.write_many([_record("d2"), _record("d3"), _record("d4")])  # room for two
+    assert sink.queue_depth() == 1
+    sink.write_many([_record("d5"), _record("d6")])
+    writer.release.set()
+    sink.close()
+    assert [r.decision_id for r in writer.written] == ["d0", "d1", "d5", "d6"]
+
+    writer = _BlockedWriter()
+    sink = BufferedAuditSink(writer, queue_size=2, batch_size=1, backpressure="drop")
+    sink.write(_record("d0"))
+    assert writer.started.wait(timeout=5)
+    sink.write(_record("d1"))
+    sink.write_many([_record("d2"), _record("d3")])
+    assert sink.dropped == 2
+    writer.release.set()
+    sink.close()
+    assert [r.decision_id for r in writer.written] == ["d0", "d1"]
+
+
+def test_write_nowait_defers_to_blocking_write_only_when_needed(tmp_path: Path):
+    assert JsonlAuditSink(tmp_path / "audit.jsonl").write_nowait(_record("d0")) is False
+
+    writer = _BlockedWriter()
+    sink = BufferedAuditSink(writer, queue_size=1, batch_size=1, backpressure="block")
+    assert sink.write_nowait(_record("d0")) is True
+    assert writer.started.wait(timeout=5)
+    assert sink.write_nowait(_record("d1")) is True  # fills the queue
+    assert sink.write_nowait(_record("d2")) is False  # write() would block
+    writer.release.set()
+    sink.close()
+    assert [r.decision_id for r in writer.written] == ["d0", "d1"]
+
+
+class _FlakyWriter(_BlockedWriter):
+    """Fails the first `failures` writes, and any write including a decision id in `bad`."""
+
+    def __init__(self, failures: int = 0, bad=()) -> None:
+        super().__init__()
+        self.failures = failures
+        self.bad = set(bad)
+
+    def write_batch(self, records):
+        if self.failures:
+            self.failures -= 1
+            raise OSError("connection reset")
+        if any(r.decision_id in self.bad for r in records):
+            raise ValueError("value too long")
+        self.written.extend(records)
+
+
+def test_buffered_audit_sink_retries_and_recovers_from_writer_failure():
+    # One transient failure: retried, nothing surfaces
+    writer = _FlakyWriter(failures=1)
+    sink = BufferedAuditSink(writer, retry_backoff_s=0)
+    sink.write(_record("d0"))
+    assert sink.flush(timeout=5)
+    sink.write(_record("d1"))
+    sink.close()
+    assert [r.decision_id for r in writer.written] == ["d0", "d1"]
+
+    # Storage down for longer than the retries: writes fail during the
+    # cooldown, then are accepted again and the first success clears the error
+    clock = FakeClock()
+    writer = _FlakyWriter(failures=3)
+    sink = BufferedAuditSink(writer, max_attempts=3, retry_backoff_s=0, cooldown_s=1.0, clock=clock)
+    sink.write(_record("d0"))
+    assert sink.flush(timeout=5)
+    assert sink.lost == 1
+    with pytest.raises(AuditSinkError):
+        sink.write(_record("d1"))
+    clock.now += 1.0
+    sink.write(_record("d2"))
+    assert sink.flush(timeout=5)
+    sink.write(_record("d3"))
+    sink.close()
+    assert [r.decision_id for r in writer.written] == ["d2", "d3"]
+
+
+def test_buffered_audit_sink_rejects_only_the_record_storage_refuses():
+    writer = _FlakyWriter(bad={"d1"})
+    sink = BufferedAuditSink(writer, batch_size=3, flush_interval_s=5, retry_backoff_s=0)
+    sink.write_many([_record(f"d{i}") for i in range(3)])  # one group
+    assert sink.flush(timeout=10)
+    sink.write(_record("d3"))
+    sink.close()
+
+    assert sink.rejected == 1
+    assert [r.decision_id for r in writer.written] == ["d0", "d2", "d3"]
+
+
+class _NoAggregatesWriter(_FlakyWriter):
+    def write_batch(self, records):
+        if any(isinstance(r, AuditAggregate) for r in records):
+            raise ValueError("unsupported record kind")
+        super().write_batch(records)
+
+
+def test_buffered_audit_sink_rejects_an_aggregate_in_a_mixed_group():
+    r = _record("d1")
+    aggregate = AuditAggregate(
+        policy_id=r.policy_id,
+        policy_version=r.policy_version,
+        subject_id=r.subject_id,
+        action=r.action,
+        resource_type=r.resource_type,
+        resource_id=r.resource_id,
+        decision=r.decision,
+        reason=r.reason,
+        matched_rule_ids=r.matched_rule_ids,
+        context=r.context,
+        count=1,
+        first_at=r.created_at,
+        last_at=r.created_at,
+        occurrences=[("d2", "cid-2", 0)],
+    )
+    writer = _NoAggregatesWriter()
+    sink = BufferedAuditSink(writer, batch_size=3, flush_interval_s=5, retry_backoff_s=0)
+    sink.write_many([_record("d0"), aggregate, r])  # one group
+    assert sink.flush(timeout=10)
+    assert sink.rejected == 1
+
+    # The writer thread is still running
+    sink.write(_record("d3"))
+    sink.close()
+    assert [r.decision_id for r in writer.written] == ["d0", "d1", "d3"]
+
+
+def test_buffered_audit_sink_survives_unexpected_writer_errors(monkeypatch):
+    writer = _FlakyWriter()
+    sink = BufferedAuditSink(writer, retry_backoff_s=0)
+    monkeypatch.setattr(sink, "_write_group", lambda records: 1 / 0)
+    sink.write(_record("d0"))
+    assert sink.flush(timeout=5)
+    assert sink.lost == 1
+
+    monkeypatch.undo()
+    sink.write(_record("d1"))
+    sink.close()
+    assert [r.decision_id for r in writer.written] == ["d1"]
@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+from app.domain.compiled_policy import compile_policy
+from app.domain.policy import Policy
+from app.domain.types import AuthorizationDecision, AuthorizationRequest, Resource, Subject
+from app.services.decision_cache import DecisionCache, decision_cache_key, get_decision_cache
+from app.settings import reload_settings
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+ALLOW = AuthorizationDecision(decision="allow", reason="matched_allow", matched_rule_ids=["r1"])
+
+
+def _req(subject_id="user:1", claims=None, context=None):
+    return AuthorizationRequest(
+        subject=Subject(id=subject_id, claims=claims or {"role": "analyst"}),
+        action="read",
+        resource=Resource(type="report", id="rpt:1", attrs={}),
+        context=context or {},
+    )
+
+
+def test_decision_cache_key_ignores_ids_but_not_inputs():
+    policy = compile_policy(Policy(id="p1", version="v1", rules=[]))
+    assert decision_cache_key(_req(subject_id="a"), policy) == decision_cache_key(_req(subject_id="b"), policy)
+    assert decision_cache_key(_req(), policy) != decision_cache_key(_req(context={"env": "prod"}), policy)
+
+    other_version = compile_policy(Policy(id="p1", version="v2", rules=[]))
+    assert decision_cache_key(_req(), policy) != decision_cache_key(_req(), other_version)
+
+
+def test_decision_cache_lru_eviction_and_ttl():
+    clock = FakeClock()
+    cache = DecisionCache(max_entries=2, ttl_s=10, clock=clock)
+
+    cache.put(1, b"a", ALLOW)
+    cache.put(1, b"b", ALLOW)
+    assert cache.get(1, b"a") is not None  # a is now most recent
+    cache.put(1, b"c", ALLOW)  # evicts b
+
+    assert cache.get(1, b"b") is None
+    assert cache.get(1, b"c").matched_rule_ids == ("r1",)
+
+    clock.now = 11
+    assert cache.get(1, b"a") is None
+
+    stats = cache.stats()
+    assert stats["hits"] == 2
+    assert stats["misses"] == 2
+    assert stats["evictions"] == 1
+    assert stats["expirations"] == 1
+
+
+def test_decision_cache_invalidated_by_newer_generation():
+    cache = DecisionCache(max_entries=10, ttl_s=60)
+    cache.put(1, b"a", ALLOW)
+
+    assert cache.get(2, b"a") is None
+    assert cache.stats()["invalidations"] == 1
+
+    # A request still on the old snapshot bypasses the cache
+    cache.put(1, b"a", ALLOW)
+    assert cache.get(1, b"a") is None
+    assert cache.stats()["size"] == 0
+
+
+def test_decision_cache_generations_are_per_scope():
+    cache = DecisionCache(max_entries=10, ttl_s=60)
+    cache.put(1, b"a", ALLOW, scope="tenant-a")
+    cache.put(2, b"b", ALLOW, scope="tenant-b")
+
+    # tenant-b's newer generation does not invalidate tenant-a
+    assert cache.get(1, b"a", scope="tenant-a") is not None
+
+    assert cache.get(3, b"a", scope="tenant-a") is None
+    assert cache.get(2, b"b", scope="tenant-b") is not None
+    assert cache.stats()["invalidations"] == 1
+
+
+def test_decision_cache_settings_are_read_once(monkeypatch):
+    monkeypatch.setenv("AUTHZ_DECISION_CACHE_SIZE", "10")
+    cache = get_decision_cache()
+    assert cache is not None and cache.max_entries == 10
+
+    # Env changes are not seen per call, only after reload_settings()
+    monkeypatch.setenv("AUTHZ_DECISION_CACHE_SIZE", "20")
+    assert get_decision_cache() is cache
+
+    reload_settings()
+    monkeypatch.setenv("AUTHZ_DECISION_CACHE_SIZE", "10")
+    assert get_decision_cache() is cache  # same configuration: entries are kept
+
+    reload_settings()
+    monkeypatch.setenv("AUTHZ_DECISION_CACHE_SIZE", "0")
+    assert get_decision_cache() is None
@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+import threading
+
+from app.services.metrics import Registry
+
+
+def test_histogram_renders_cumulative_buckets_in_seconds():
+    reg = Registry()
+    h = reg.histogram("stage_seconds", "Stage latency.", ("stage",))
+    child = h.labels("evaluate")
+    child.observe_ns(800)            # <= 1us
+    child.observe_ns(3_000)          # <= 5us
+    child.observe_ns(20_000_000_000) # beyond the largest bucket
+
+    text = reg.render()
+    assert "# TYPE stage_seconds histogram" in text
+    assert 'stage_seconds_bucket{stage="evaluate",le="1e-06"} 1' in text
+    assert 'stage_seconds_bucket{stage="evaluate",le="5e-06"} 2' in text
+    assert 'stage_seconds_bucket{stage="evaluate",le="10"} 2' in text
+    assert 'stage_seconds_bucket{stage="evaluate",le="+Inf"} 3' in text
+    assert 'stage_seconds_count{stage="evaluate"} 3' in text
+    assert 'stage_seconds_sum{stage="evaluate"} 20.0000038' in text
+
+
+def test_counters_sum_per_thread_shards():
+    reg = Registry()
+    c = reg.counter("decisions_total", "Decisions.", ("decision", "reason"))
+    unlabeled = reg.counter("reloads_total", "Reloads.")
+    allow = c.labels("allow", "matched_allow")
+
+    def work():
+        for _ in range(1000):
+            allow.inc()
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    text = reg.render()
+    assert 'decisions_total{decision="allow",reason="matched_allow"} 4000' in text
+    assert "reloads_total 0" in text
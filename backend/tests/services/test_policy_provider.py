@@ -5,7 +5,13 @@ from pathlib import Path
 
 import pytest
 
-from app.services.policy_provider import PolicyProviderError, policy_provider_from_env
+from app.services.policy_provider import (
+    PolicyProvider,
+    PolicyProviderError,
+    get_policy_provider,
+    policy_provider_from_env,
+    shutdown_policy_provider,
+)
 
 
 def test_policy_provider_requires_env_var(monkeypatch):
@@ -43,3 +49,120 @@ def test_policy_provider_loads_policy(tmp_path: Path, monkeypatch):
     assert policy.version == "v1"
     assert len(policy.rules) == 1
     assert policy.rules[0].id == "r1"
+
+
+def _policy_json(version: str) -> str:
+    return (
+        '{"id": "p1", "version": "%s", "rules": ['
+        '{"id": "r1", "effect": "allow", "actions": ["read"], "resource_type": "report"}]}'
+    ) % version
+
+
+def _bump_mtime(path: Path) -> None:
+    st = path.stat()
+    os.utime(path, (st.st_atime, st.st_mtime + 10))
+
+
+def test_policy_provider_refresh_publishes_new_snapshot(tmp_path: Path):
+    policy_file = tmp_path / "policy.json"
+    policy_file.write_text(_policy_json("v1"), encoding="utf-8")
+
+    provider = PolicyProvider(policy_path=policy_file)
+    first = provider.snapshot()
+    assert first.policy.version == "v1"
+    assert provider.refresh() is False
+
+    policy_file.write_text(_policy_json("v2"), encoding="utf-8")
+    _bump_mtime(policy_file)
+    assert provider.refresh() is True
+
+    second = provider.snapshot()
+    assert second.policy.version == "v2"
+    assert second.generation > first.generation
+    # The old snapshot is untouched for requests still holding it
+    assert first.policy.version == "v1"
+
+
+def test_policy_provider_keeps_last_good_policy_on_invalid_reload(tmp_path: Path):
+    policy_file = tmp_path / "policy.json"
+    policy_file.write_text(_policy_json("v1"), encoding="utf-8")
+
+    provider = PolicyProvider(policy_path=policy_file)
+    assert provider.get().version == "v1"
+
+    policy_file.write_text('{"id": "p1", "version": "v2", "rules": [{"id": "r1"}]}', encoding="utf-8")
+    _bump_mtime(policy_file)
+    with pytest.raises(PolicyProviderError):
+        provider.refresh()
+
+    assert provider.get().version == "v1"
+
+
+def test_get_policy_provider_is_process_wide(tmp_path: Path, monkeypatch):
+    policy_file = tmp_path / "policy.json"
+    policy_file.write_text(_policy_json("v1"), encoding="utf-8")
+
+    monkeypatch.setenv("AUTHZ_POLICY_PATH", str(policy_file))
+    monkeypatch.setenv("AUTHZ_POLICY_RELOAD", "0")
+    try:
+        provider = get_policy_provider()
+        assert get_policy_provider() is provider
+        assert provider.get() is get_policy_provider().get()
+    finally:
+        shutdown_policy_provider()
+
+
+def test_compiled_snapshot_cache_skips_validation_for_unchanged_file(tmp_path: Path, monkeypatch):
+    import app.services.policy_provider as provider_module
+    from app.services.policy_cache import CompiledPolicyCache
+
+    policy_file = tmp_path / "policy.json"
+    policy_file.write_text(
+        '{"id": "p1", "version": "v1", "rules": [{"id": "r1", "effect": "allow", "actions": ["read"], "resource_type": "report"}]}',
+        encoding="utf-8",
+    )
+    cache_dir = tmp_path / "cache"
+
+    first = PolicyProvider(policy_path=policy_file, reload_enabled=False, snapshot_cache=CompiledPolicyCache(cache_dir))
+    assert first.snapshot().policy.version == "v1"
+    assert len(list(cache_dir.glob("*.pickle"))) == 1
+
+    # Another worker: same bytes, so no parsing or validation at all
+    def fail(raw):
+        raise AssertionError("policy was validated again")
+
+    monkeypatch.setattr(provider_module, "load_policy_from_str", fail)
+    second = PolicyProvider(policy_path=policy_file, reload_enabled=False, snapshot_cache=CompiledPolicyCache(cache_dir))
+    snap = second.snapshot()
+    assert snap.policy == first.snapshot().policy
+    assert snap.compiled.bucket_for("read", "report").rules[0].id == "r1"
+
+    # Changed bytes: full validation again
+    monkeypatch.undo()
+    policy_file.write_text('{"id": "p1", "version": "v2", "rules": [{"id": "r1"}]}', encoding="utf-8")
+    with pytest.raises(PolicyProviderError):
+        PolicyProvider(policy_path=policy_file, reload_enabled=False, snapshot_cache=CompiledPolicyCache(cache_dir)).snapshot()
+
+
+def test_compiled_snapshot_cache_is_not_used_from_a_shared_directory(tmp_path: Path):
+    from app.domain.compiled_policy import compile_policy
+    from app.domain.policy_loader import load_policy_from_str
+    from app.services.policy_cache import CompiledPolicyCache, content_digest
+
+    raw = b'{"id": "p1", "version": "v1", "rules": []}'
+    policy = load_policy_from_str(raw.decode("utf-8"))
+    cache = CompiledPolicyCache(tmp_path / "cache")
+    cache.store(content_digest(raw), policy, compile_policy(policy))
+    assert cache.load(content_digest(raw)) is not None
+
+    # Anyone who can write here could plant a pickle: neither read nor written
+    os.chmod(cache.directory, 0o777)
+    assert cache.load(content_digest(raw)) is None
+    other = b'{"id": "p1", "version": "v2", "rules": []}'
+    cache.store(content_digest(other), policy, compile_policy(policy))
+    assert len(list(cache.directory.glob("*.pickle"))) == 1
+
+    os.chmod(cache.directory, 0o700)
+    for entry in cache.directory.glob("*.pickle"):
+        os.chmod(entry, 0o666)
+    assert cache.load(content_digest(raw)) is None
@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+
+from app.services.policy_registry import (
+    PolicyRegistry,
+    PolicySelectionError,
+    UnknownPolicyError,
+)
+
+
+def _write_policy(directory: Path, policy_id: str, version: str = "v1", padding: int = 0) -> None:
+    (directory / f"{policy_id}.json").write_text(
+        '{"id": "%s", "version": "%s", "rules": ['
+        '{"id": "r1", "effect": "allow", "actions": ["read"], "resource_type": "report"}]}%s'
+        % (policy_id, version, " " * padding),
+        encoding="utf-8",
+    )
+
+
+def test_registry_loads_policies_lazily_by_id(tmp_path: Path):
+    _write_policy(tmp_path, "acme")
+    _write_policy(tmp_path, "globex", version="v7")
+    registry = PolicyRegistry(tmp_path, reload_enabled=False)
+
+    assert registry.published("acme") is None  # not loaded yet
+    assert registry.snapshot("acme").policy.id == "acme"
+    assert registry.snapshot("globex").policy.version == "v7"
+    assert registry.published("acme") is not None
+    assert registry.stats()["size"] == 2
+
+
+def test_registry_selection_errors(tmp_path: Path):
+    _write_policy(tmp_path, "acme")
+    (tmp_path / "other.json").write_text((tmp_path / "acme.json").read_text(), encoding="utf-8")
+    registry = PolicyRegistry(tmp_path, reload_enabled=False)
+
+    with pytest.raises(PolicySelectionError):
+        registry.snapshot(None)  # no default configured
+    with pytest.raises(PolicySelectionError):
+        registry.snapshot("../acme")
+    with pytest.raises(UnknownPolicyError):
+        registry.snapshot("missing")
+    with pytest.raises(Exception, match="expected 'other'"):
+        registry.snapshot("other")  # file's id does not match its name
+
+    # Failed loads do not hold LRU slots
+    assert registry.stats()["size"] == 0
+
+
+def test_registry_default_policy(tmp_path: Path):
+    _write_policy(tmp_path, "acme")
+    registry = PolicyRegistry(tmp_path, reload_enabled=False, default_policy_id="acme")
+    assert registry.snapshot(None).policy.id == "acme"
+
+
+def test_registry_evicts_lru_by_count_and_keeps_pinned(tmp_path: Path):
+    for policy_id in ("hot", "a", "b", "c"):
+        _write_policy(tmp_path, policy_id)
+    registry = PolicyRegistry(tmp_path, max_entries=2, pinned=["hot"], reload_enabled=False)
+    registry.start()
+
+    registry.snapshot("a")
+    registry.snapshot("b")  # evicts a, never hot
+    ids = [p["policy_id"] for p in registry.stats()["policies"]]
+    assert ids == ["hot", "b"]
+
+    registry.snapshot("c")
+    registry.snapshot("b")  # b is most recently used
+    ids = [p["policy_id"] for p in registry.stats()["policies"]]
+    assert ids == ["hot", "b"]
+    assert registry.stats()["evictions"] == 3  # a, then b for c, then c for b
+
+
+def test_registry_unknown_or_broken_ids_do_not_evict_loaded_policies(tmp_path: Path):
+    _write_policy(tmp_path, "hot")
+    _write_policy(tmp_path, "warm")
+    (tmp_path / "broken.json").write_text("{", encoding="utf-8")
+    registry = PolicyRegistry(tmp_path, max_entries=2, reload_enabled=False)
+    registry.snapshot("hot")
+    registry.snapshot("warm")
+
+    for i in range(10):
+        with pytest.raises(UnknownPolicyError):
+            registry.snapshot(f"bogus-{i}")
+        assert registry.published(f"bogus-{i}") is None
+    with pytest.raises(Exception):
+        registry.snapshot("broken")
+
+    stats = registry.stats()
+    assert [p["policy_id"] for p in stats["policies"]] == ["hot", "warm"]
+    assert stats["evictions"] == 0
+
+
+def test_registry_evicts_by_total_policy_size(tmp_path: Path):
+    for policy_id in ("a", "b", "c"):
+        _write_policy(tmp_path, policy_id, padding=1000)
+    size = (tmp_path / "a.json").stat().st_size
+    registry = PolicyRegistry(tmp_path, max_bytes=2 * size, reload_enabled=False)
+
+    for policy_id in ("a", "b", "c"):
+        registry.snapshot(policy_id)
+
+    stats = registry.stats()
+    assert [p["policy_id"] for p in stats["policies"]] == ["b", "c"]
+    assert stats["bytes"] == 2 * size
+
+
+def test_registry_reloads_changed_policies_and_drops_deleted_ones(tmp_path: Path):
+    import os
+
+    _write_policy(tmp_path, "acme")
+    _write_policy(tmp_path, "globex")
+    registry = PolicyRegistry(tmp_path, reload_enabled=False)
+    registry.snapshot("acme")
+    registry.snapshot("globex")
+
+    _write_policy(tmp_path, "acme", version="v2")
+    st = (tmp_path / "acme.json").stat()
+    os.utime(tmp_path / "acme.json", (st.st_atime, st.st_mtime + 5))
+    (tmp_path / "globex.json").unlink()
+
+    registry._refresh()
+
+    assert registry.published("acme").policy.version == "v2"
+    assert [p["policy_id"] for p in registry.stats()["policies"]] == ["acme"]
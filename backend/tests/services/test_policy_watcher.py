@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from app.services.policy_provider import PolicyProvider
+from app.services.policy_watcher import PolicyWatcher
+
+
+def _policy_json(version: str) -> str:
+    return (
+        '{"id": "p1", "version": "%s", "rules": ['
+        '{"id": "r1", "effect": "allow", "actions": ["read"], "resource_type": "report"}]}'
+    ) % version
+
+
+def _wait_for(predicate, timeout_s: float = 5.0) -> bool:
+    deadline = time.monotonic() + timeout_s
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_inotify_watcher_debounces_a_burst_into_one_call(tmp_path: Path):
+    calls = []
+    done = threading.Event()
+
+    def on_change(names):
+        calls.append(names)
+        done.set()
+
+    watcher = PolicyWatcher(tmp_path, on_change, mode="inotify", debounce_s=0.1)
+    watcher.start()
+    try:
+        if watcher.backend != "inotify":
+            pytest.skip("inotify not available")
+        for i in range(5):
+            (tmp_path / "a.json").write_text(str(i), encoding="utf-8")
+        os.replace(tmp_path / "a.json", tmp_path / "b.json")
+        assert done.wait(5)
+        time.sleep(0.3)
+    finally:
+        watcher.stop()
+
+    assert calls == [{"a.json", "b.json"}]
+
+
+def test_poll_watcher_reports_unknown_changes(tmp_path: Path):
+    calls = []
+    watcher = PolicyWatcher(tmp_path, calls.append, mode="poll", poll_interval_s=0.01)
+    watcher.start()
+    try:
+        assert watcher.backend == "poll"
+        assert _wait_for(lambda: len(calls) >= 2)
+    finally:
+        watcher.stop()
+    assert calls[0] is None
+
+
+def test_refresh_sees_rewrite_with_unchanged_mtime(tmp_path: Path):
+    policy_file = tmp_path / "policy.json"
+    policy_file.write_text(_policy_json("v1"), encoding="utf-8")
+    provider = PolicyProvider(policy_path=policy_file, reload_enabled=False)
+    mtime_ns = policy_file.stat().st_mtime_ns
+    assert provider.snapshot().policy.version == "v1"
+
+    policy_file.write_text(_policy_json("v22"), encoding="utf-8")
+    os.utime(policy_file, ns=(mtime_ns, mtime_ns))
+    assert provider.refresh() is True
+    assert provider.snapshot().policy.version == "v22"
+
+
+@pytest.mark.parametrize("watch", ["auto", "poll"])
+def test_provider_publishes_renamed_into_place_policy(tmp_path: Path, watch: str):
+    policy_file = tmp_path / "policy.json"
+    policy_file.write_text(_policy_json("v1"), encoding="utf-8")
+    provider = PolicyProvider(policy_path=policy_file, watch=watch, min_mtime_interval_s=0.02, debounce_s=0.01)
+    assert provider.snapshot().policy.version == "v1"
+    provider.start()
+    try:
+        staged = tmp_path / ".policy.json.tmp"
+        staged.write_text(_policy_json("v2"), encoding="utf-8")
+        os.replace(staged, policy_file)
+        assert _wait_for(lambda: provider.published().policy.version == "v2")
+
+        # An invalid file keeps the last good policy
+        staged.write_text('{"id": "p1", "version": "v3", "rules": [{"id": "r1"}]}', encoding="utf-8")
+        os.replace(staged, policy_file)
+        time.sleep(0.2)
+        assert provider.published().policy.version == "v2"
+    finally:
+        provider.stop()
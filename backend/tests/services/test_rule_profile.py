@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import json
+import threading
+from pathlib import Path
+
+from app.domain.compiled_policy import compile_policy
+from app.domain.evaluator import SHORT_CIRCUIT, evaluate
+from app.domain.policy import Policy, PolicyRule
+from app.domain.types import AuthorizationRequest, Resource, Subject
+from app.services.rule_profile import RuleProfiler
+
+
+def _policy(version: str = "v1", rules=None) -> Policy:
+    return Policy(
+        id="p1",
+        version=version,
+        rules=rules
+        or [
+            PolicyRule(id="r1", effect="allow", actions=["read"], resource_type="report", subject_claims={"role": "analyst"}),
+            PolicyRule(id="r2", effect="deny", actions=["read"], resource_type="report", context_claims={"env": "prod"}),
+            PolicyRule(id="r3", effect="allow", actions=["write"], resource_type="report"),
+        ],
+    )
+
+
+def _req(action: str = "read", role: str = "analyst", env: str = "dev", resource_type: str = "report"):
+    return AuthorizationRequest(
+        subject=Subject(id="user:1", claims={"role": role}),
+        action=action,
+        resource=Resource(type=resource_type, id="rpt:1", attrs={}),
+        context={"env": env},
+    )
+
+
+def _rules(stats):
+    return {r["id"]: (r["checks"], r["matches"]) for r in stats["rules"]}
+
+
+def test_profile_counts_checks_matches_and_latency_per_version():
+    profiler = RuleProfiler()
+    compiled = compile_policy(_policy())
+
+    assert profiler.evaluate(_req(), compiled, "full").decision == "allow"
+    assert profiler.evaluate(_req(env="prod"), compiled, "full").decision == "deny"
+    assert profiler.evaluate(_req(role="guest"), compiled, SHORT_CIRCUIT).decision == "deny"
+    profiler.evaluate(_req(resource_type="invoice"), compiled, "full")
+
+    [stats] = profiler.stats()["policies"]
+    assert (stats["policy_id"], stats["policy_version"]) == ("p1", "v1")
+    assert (stats["evaluations"], stats["unindexed_evaluations"]) == (4, 1)
+    assert _rules(stats) == {"r1": (3, 2), "r2": (3, 1), "r3": (0, 0)}
+    assert stats["never_matched"] == ["r3"]
+    assert stats["mean_rules_checked"] == 6 / 4
+    assert stats["latency"]["count"] == 4 and stats["latency"]["p99_ns"] is not None
+
+    # A reload of the same version keeps counting; other rules under the same
+    # version start over
+    profiler.evaluate(_req(action="write"), compile_policy(_policy()), "full")
+    assert _rules(profiler.stats()["policies"][0])["r3"] == (1, 1)
+    profiler.evaluate(_req(action="write"), compile_policy(_policy(rules=_policy().rules[2:])), "full")
+    assert _rules(profiler.stats()["policies"][0]) == {"r3": (1, 1)}
+
+
+def test_profile_counts_untimed_decisions_apart_from_evaluations():
+    profiler = RuleProfiler()
+    compiled = compile_policy(_policy())
+    allow = profiler.evaluate(_req(), compiled, "full")
+
+    profiler.count_cached(compiled, allow)
+    profiler.count_cached(compiled, allow)
+    profiler.count_decisions(compiled, [allow, profiler.evaluate(_req(action="write"), compiled, "full")])
+    decide = profiler.counting(compiled, lambda env: evaluate(_req(env=env), compiled, "full"))
+    assert decide("prod").decision == "deny"
+
+    [stats] = profiler.stats()["policies"]
+    # Matches include every decision; checks and latency only timed evaluations
+    assert (stats["evaluations"], stats["cached_decisions"], stats["actions_filter_decisions"]) == (2, 2, 3)
+    assert _rules(stats) == {"r1": (1, 5), "r2": (1, 1), "r3": (1, 2)}
+    assert stats["never_matched"] == []
+    assert stats["latency"]["count"] == 2
+
+
+def test_profile_aggregates_threads_and_dumps_json(tmp_path: Path):
+    path = tmp_path / "profile" / "rules.json"
+    profiler = RuleProfiler(max_policies=1, dump_path=path)
+    compiled = compile_policy(_policy())
+
+    def work() -> None:
+        for _ in range(500):
+            profiler.evaluate(_req(), compiled, "full")
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert profiler.dump() == path
+    [stats] = json.loads(path.read_text(encoding="utf-8"))["policies"]
+    assert stats["evaluations"] == 2000
+    assert _rules(stats)["r1"] == (2000, 2000)
+
+    profiler.evaluate(_req(), compile_policy(_policy(version="v2")), "full")
+    assert [p["policy_version"] for p in profiler.stats()["policies"]] == ["v2"]
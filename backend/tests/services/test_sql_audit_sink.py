@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import create_engine, select
+
+from app.db.audit_table import audit_decisions
+from app.domain.audit import AuditRecord
+from app.services.audit_sink import BufferedAuditSink
+from app.services.sql_audit_sink import SqlAuditWriter
+
+BACKEND_DIR = Path(__file__).resolve().parents[2]
+
+
+def _record(decision_id: str) -> AuditRecord:
+    return AuditRecord(
+        correlation_id="cid-1",
+        decision_id=decision_id,
+        policy_id="p1",
+        policy_version="v1",
+        subject_id="user:1",
+        action="read",
+        resource_type="report",
+        resource_id=None,
+        decision="allow",
+        reason="matched_allow",
+        matched_rule_ids=["r1"],
+        context={"env": "dev"},
+        created_at="2026-01-27T00:00:00Z",
+    )
+
+
+def test_sql_audit_sink_bulk_inserts_into_migrated_table(tmp_path: Path, monkeypatch):
+    url = f"sqlite:///{tmp_path / 'audit.db'}"
+    monkeypatch.setenv("AUTHZ_AUDIT_DB_URL", url)
+    command.upgrade(Config(str(BACKEND_DIR / "alembic.ini")), "head")
+
+    sink = BufferedAuditSink(SqlAuditWriter(url), batch_size=50)
+    sink.write_many([_record(f"d{i}") for i in range(120)])
+    assert sink.flush(timeout=10)
+    sink.close()
+
+    engine = create_engine(url)
+    with engine.connect() as conn:
+        rows = conn.execute(select(audit_decisions).order_by(audit_decisions.c.id)).mappings().all()
+    engine.dispose()
+
+    assert [r["decision_id"] for r in rows] == [f"d{i}" for i in range(120)]
+    assert rows[0]["matched_rule_ids"] == ["r1"]
+    assert rows[0]["context"] == {"env": "dev"}
+    assert rows[0]["resource_id"] is None
@@ -78,9 +78,11 @@ if [[ -f "$AUDIT_PATH" ]]; then
   echo "Last 3 audit lines:"
   tail -n 3 "$AUDIT_PATH"
   echo
-  echo "Correlation ID lookups:"
-  grep "$CID_ALLOW" "$AUDIT_PATH" || true
-  grep "$CID_DENY" "$AUDIT_PATH" || true
+  echo "Correlation ID lookups (via /v1/audit/decisions):"
+  curl -sS "$API_BASE_URL/v1/audit/decisions?correlation_id=$CID_ALLOW" || true
+  echo
+  curl -sS "$API_BASE_URL/v1/audit/decisions?correlation_id=$CID_DENY" || true
+  echo
 else
   echo "Audit file not found at: $AUDIT_PATH"
   echo "Did you start the server with AUTHZ_AUDIT_PATH set?"